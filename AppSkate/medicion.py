@@ -0,0 +1,83 @@
+"""
+Medición de una petición: consultas SQL, render de plantillas y tiempo propio de la vista.
+
+    with Medicion() as m:
+        response = get_response(request)
+    m.consultas, m.sql_ms, m.plantilla_ms, m.vista_ms, m.total_ms
+
+Las plantillas se miden envolviendo (una sola vez, al primer uso) el render del
+backend de Django; fuera de una Medicion activa el costo es leer una ContextVar.
+Las mediciones pueden anidarse (benchmark_rutas alrededor del middleware).
+El SQL que se ejecuta durante el render (cargas perezosas desde la plantilla)
+se cuenta como SQL, no como plantilla, para que las tres partes sumen el total.
+"""
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.db import connections
+from django.template.backends.django import Template as PlantillaDjango
+
+# Mediciones activas en este contexto (pueden anidarse: benchmark + middleware)
+_mediciones_activas = ContextVar('mediciones_activas', default=())
+_render_original = None
+
+
+def _render_medido(self, context=None, request=None):
+    mediciones = [m for m in _mediciones_activas.get() if not m._en_plantilla]
+    if not mediciones:
+        return _render_original(self, context, request)
+    sql_antes = [m.sql_ms for m in mediciones]
+    for m in mediciones:
+        m._en_plantilla = True
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context, request)
+    finally:
+        duracion = (time.perf_counter() - inicio) * 1000
+        for m, antes in zip(mediciones, sql_antes):
+            m._en_plantilla = False
+            m.plantilla_ms += duracion - (m.sql_ms - antes)
+
+
+def instalar_medicion_plantillas():
+    global _render_original
+    if _render_original is None:
+        _render_original = PlantillaDjango.render
+        PlantillaDjango.render = _render_medido
+
+
+class Medicion:
+    def __init__(self):
+        self.consultas = 0
+        self.sql_ms = 0.0
+        self.plantilla_ms = 0.0
+        self.total_ms = 0.0
+        self._en_plantilla = False
+
+    @property
+    def vista_ms(self):
+        return max(self.total_ms - self.sql_ms - self.plantilla_ms, 0.0)
+
+    def _ejecutar(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_ms += (time.perf_counter() - inicio) * 1000
+            self.consultas += 1
+
+    def __enter__(self):
+        instalar_medicion_plantillas()
+        self._pila = ExitStack()
+        for alias in connections:
+            self._pila.enter_context(connections[alias].execute_wrapper(self._ejecutar))
+        self._token = _mediciones_activas.set(_mediciones_activas.get() + (self,))
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.total_ms = (time.perf_counter() - self._inicio) * 1000
+        _mediciones_activas.reset(self._token)
+        self._pila.close()
+        return False
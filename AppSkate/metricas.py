@@ -0,0 +1,377 @@
+"""
+Métricas de la aplicación (contadores e histogramas) en formato Prometheus.
+
+    PEDIDOS = contador('skateshop_pedidos_total', 'Pedidos creados.')
+    PEDIDOS.inc()
+    LATENCIA = histograma('skateshop_webpay_segundos', 'Llamadas a Webpay.', etiquetas=('operacion',))
+    with LATENCIA.medir(operacion='commit'):
+        ...
+
+Registrar un valor solo toca un diccionario en memoria (unos pocos
+microsegundos). Con varios workers, cada proceso vuelca sus totales a
+METRICAS_DIRECTORIO como mucho cada METRICAS_INTERVALO segundos (lo hace
+MetricasMiddleware al terminar una petición) y GET /metrics suma los archivos
+de todos los procesos. Los contadores son acumulativos desde que se creó el
+directorio: se vacía al desplegar, igual que con el modo multiproceso de
+prometheus_client.
+
+Solo escriben archivo los procesos que sirven peticiones: un manage.py u otro
+proceso sin MetricasMiddleware no deja nada al salir. Los comandos que recorren
+las vistas con el Client de Django (warm_caches, benchmark_rutas) lo hacen
+dentro de `with registro.pausado():`, así que tampoco cuentan ni vuelcan. Los archivos
+`{pid}-{id}.json` de procesos que ya terminaron (workers reciclados) se suman
+en TERMINADOS y se borran al agregar, así que el directorio no crece con cada
+reinicio y los contadores no retroceden. El pid se comprueba en esta máquina:
+el directorio no se comparte entre servidores.
+"""
+import atexit
+import glob
+import hmac
+import json
+import math
+import os
+import re
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import HttpResponse
+
+CUBETAS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ARCHIVO_PROCESO = re.compile(r'(\d+)-[0-9a-f]+\.json')
+TERMINADOS = 'terminados.json'
+CANDADO_SEGUNDOS = 60  # Un candado más viejo quedó de un proceso que murió compactando
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.series = {}  # tupla de valores de etiquetas -> valor
+        self._candado = threading.Lock()
+
+    def _clave(self, valores):
+        if len(valores) != len(self.etiquetas):
+            raise ValueError(f"{self.nombre} espera las etiquetas {self.etiquetas}")
+        return tuple(str(valores[e]) for e in self.etiquetas)
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def inc(self, valor=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with self._candado:
+            self.series[clave] = self.series.get(clave, 0) + valor
+
+    @staticmethod
+    def sumar(a, b):
+        return a + b
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.cubetas = tuple(sorted(cubetas))
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        # Cuentas por cubeta (no acumuladas) + la de +Inf, la suma y el total
+        posicion = bisect_left(self.cubetas, valor)
+        with self._candado:
+            serie = self.series.get(clave)
+            if serie is None:
+                serie = self.series[clave] = [[0] * (len(self.cubetas) + 1), 0.0, 0]
+            serie[0][posicion] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    @staticmethod
+    def sumar(a, b):
+        return [[x + y for x, y in zip(a[0], b[0])], a[1] + b[1], a[2] + b[2]]
+
+
+class Registro:
+    def __init__(self):
+        self.metricas = {}
+        self._candado = threading.Lock()
+        self._proceso = None
+        self._ultimo_volcado = 0.0
+        self._pausas = 0
+
+    def obtener(self, clase, nombre, *args, **kwargs):
+        """Devuelve la métrica ya registrada con ese nombre o la crea."""
+        with self._candado:
+            metrica = self.metricas.get(nombre)
+            if metrica is None:
+                metrica = self.metricas[nombre] = clase(nombre, *args, **kwargs)
+            elif not isinstance(metrica, clase):
+                raise ValueError(f"{nombre} ya está registrada como {metrica.tipo}")
+            return metrica
+
+    @contextmanager
+    def pausado(self):
+        """Peticiones internas del proceso: MetricasMiddleware no las registra y nada se vuelca."""
+        with self._candado:
+            self._pausas += 1
+        try:
+            yield
+        finally:
+            with self._candado:
+                self._pausas -= 1
+
+    @property
+    def en_pausa(self):
+        return self._pausas > 0
+
+    # -- Varios procesos ------------------------------------------------
+
+    def _archivo_propio(self, directorio):
+        pid = os.getpid()
+        if self._proceso is None or self._proceso[0] != pid:
+            if self._proceso is not None:
+                # Proceso hijo de un fork: lo heredado ya lo cuenta el padre
+                for metrica in self.metricas.values():
+                    metrica.series.clear()
+            self._proceso = (pid, os.path.join(directorio, f'{pid}-{uuid.uuid4().hex[:8]}.json'))
+        return self._proceso[1]
+
+    def volcar(self, directorio=None):
+        """Escribe los totales de este proceso en su archivo (reemplazo atómico)."""
+        directorio = directorio or getattr(settings, 'METRICAS_DIRECTORIO', None)
+        if not directorio or self.en_pausa:
+            return
+        archivo = self._archivo_propio(directorio)
+        datos = {}
+        for metrica in list(self.metricas.values()):
+            with metrica._candado:
+                series = [[list(clave), valor] for clave, valor in metrica.series.items()]
+            datos[metrica.nombre] = series
+        os.makedirs(directorio, exist_ok=True)
+        temporal = f'{archivo}.tmp'
+        with open(temporal, 'w') as f:
+            json.dump(datos, f)
+        os.replace(temporal, archivo)
+        self._ultimo_volcado = time.monotonic()
+
+    def volcar_si_corresponde(self):
+        intervalo = getattr(settings, 'METRICAS_INTERVALO', 1.0)
+        if time.monotonic() - self._ultimo_volcado >= intervalo:
+            self.volcar()
+
+    def volcar_al_salir(self):
+        # Solo si el proceso ya volcó (un worker con MetricasMiddleware)
+        if self._proceso is not None and self._proceso[0] == os.getpid():
+            self.volcar()
+
+    def compactar(self, directorio):
+        """Suma en TERMINADOS los archivos de procesos que ya no existen y los borra."""
+        archivos = glob.glob(os.path.join(directorio, '*.json'))
+        muertos = [
+            archivo for archivo in archivos
+            if (coincidencia := ARCHIVO_PROCESO.fullmatch(os.path.basename(archivo)))
+            and not _proceso_vivo(int(coincidencia.group(1)))
+        ]
+        if not muertos:
+            return
+
+        candado = os.path.join(directorio, 'terminados.lock')
+        try:
+            os.close(os.open(candado, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(candado) > CANDADO_SEGUNDOS:
+                    os.remove(candado)
+            except OSError:
+                pass
+            return  # Otro proceso está compactando
+        try:
+            incluidos, acumulado = _leer_terminados(directorio)
+            sumados = []
+            for archivo in muertos:
+                nombre = os.path.basename(archivo)
+                if nombre not in incluidos:
+                    try:
+                        with open(archivo) as f:
+                            datos = json.load(f)
+                    except (OSError, ValueError):
+                        continue
+                    for metrica, series in datos.items():
+                        destino = acumulado.setdefault(metrica, {})
+                        for clave, valor in series:
+                            clave = tuple(clave)
+                            destino[clave] = _sumar_valores(destino[clave], valor) if clave in destino else valor
+                sumados.append(nombre)
+
+            # Se escribe antes de borrar y con la lista de archivos incluidos: quien
+            # agregue mientras tanto no cuenta dos veces los que aún no se borraron
+            temporal = os.path.join(directorio, f'{TERMINADOS}.{os.getpid()}.tmp')
+            with open(temporal, 'w') as f:
+                json.dump({
+                    'incluidos': sumados,
+                    'metricas': {
+                        metrica: [[list(clave), valor] for clave, valor in series.items()]
+                        for metrica, series in acumulado.items()
+                    },
+                }, f)
+            os.replace(temporal, os.path.join(directorio, TERMINADOS))
+            for nombre in sumados:
+                try:
+                    os.remove(os.path.join(directorio, nombre))
+                except FileNotFoundError:
+                    pass
+        finally:
+            os.remove(candado)
+
+    def agregar(self, directorio=None):
+        """{nombre: {clave: valor}} sumando este proceso y los archivos de los demás."""
+        directorio = directorio or getattr(settings, 'METRICAS_DIRECTORIO', None)
+        totales = {}
+        for metrica in list(self.metricas.values()):
+            with metrica._candado:
+                totales[metrica.nombre] = {
+                    clave: [list(valor[0]), valor[1], valor[2]] if metrica.tipo == 'histogram' else valor
+                    for clave, valor in metrica.series.items()
+                }
+        if not directorio:
+            return totales
+
+        self.compactar(directorio)
+        incluidos, terminados = _leer_terminados(directorio)
+        conjuntos = [{nombre: list(series.items()) for nombre, series in terminados.items()}]
+        propio = self._proceso[1] if self._proceso and self._proceso[0] == os.getpid() else None
+        for archivo in glob.glob(os.path.join(directorio, '*.json')):
+            if archivo == propio or os.path.basename(archivo) in incluidos | {TERMINADOS}:
+                continue
+            try:
+                with open(archivo) as f:
+                    conjuntos.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # borrado o reemplazado mientras se leía
+        for datos in conjuntos:
+            for nombre, series in datos.items():
+                metrica = self.metricas.get(nombre)
+                if metrica is None:
+                    continue
+                acumulado = totales.setdefault(nombre, {})
+                for clave, valor in series:
+                    clave = tuple(clave)
+                    acumulado[clave] = metrica.sumar(acumulado[clave], valor) if clave in acumulado else valor
+        return totales
+
+    def exponer(self, directorio=None):
+        """Texto en el formato de exposición de Prometheus (versión 0.0.4)."""
+        totales = self.agregar(directorio)
+        lineas = []
+        for nombre in sorted(self.metricas):
+            metrica = self.metricas[nombre]
+            lineas.append(f'# HELP {nombre} {_escapar_ayuda(metrica.ayuda)}')
+            lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+            for clave, valor in sorted(totales.get(nombre, {}).items()):
+                pares = list(zip(metrica.etiquetas, clave))
+                if metrica.tipo == 'counter':
+                    lineas.append(f'{nombre}{_etiquetas(pares)} {_numero(valor)}')
+                    continue
+                cuentas, suma, total = valor
+                acumulado = 0
+                for limite, cuenta in zip(metrica.cubetas + (math.inf,), cuentas):
+                    acumulado += cuenta
+                    le = '+Inf' if limite == math.inf else _numero(limite)
+                    lineas.append(f'{nombre}_bucket{_etiquetas(pares + [("le", le)])} {acumulado}')
+                lineas.append(f'{nombre}_sum{_etiquetas(pares)} {_numero(suma)}')
+                lineas.append(f'{nombre}_count{_etiquetas(pares)} {total}')
+        return '\n'.join(lineas) + '\n'
+
+    def reiniciar(self):
+        """Vacía los valores en memoria (para los tests)."""
+        for metrica in self.metricas.values():
+            with metrica._candado:
+                metrica.series.clear()
+
+
+def _proceso_vivo(pid):
+    if os.name != 'posix':
+        return True  # En Windows os.kill(pid, 0) termina el proceso en vez de consultarlo
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Existe, pero es de otro usuario
+    return True
+
+
+def _sumar_valores(a, b):
+    return Histograma.sumar(a, b) if isinstance(a, list) else a + b
+
+
+def _leer_terminados(directorio):
+    """(archivos ya sumados, {nombre: {clave: valor}}) de TERMINADOS."""
+    try:
+        with open(os.path.join(directorio, TERMINADOS)) as f:
+            datos = json.load(f)
+    except (OSError, ValueError):
+        return set(), {}
+    return set(datos['incluidos']), {
+        nombre: {tuple(clave): valor for clave, valor in series}
+        for nombre, series in datos['metricas'].items()
+    }
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) and not float(valor).is_integer() else str(int(valor))
+
+
+def _escapar_ayuda(texto):
+    return texto.replace('\\', r'\\').replace('\n', r'\n')
+
+
+def _etiquetas(pares):
+    if not pares:
+        return ''
+    valores = (v.replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n') for _, v in pares)
+    return '{' + ','.join(f'{e}="{v}"' for (e, _), v in zip(pares, valores)) + '}'
+
+
+registro = Registro()
+atexit.register(registro.volcar_al_salir)
+
+
+def contador(nombre, ayuda, etiquetas=()):
+    return registro.obtener(Contador, nombre, ayuda, etiquetas)
+
+
+def histograma(nombre, ayuda, etiquetas=(), cubetas=CUBETAS_SEGUNDOS):
+    return registro.obtener(Histograma, nombre, ayuda, etiquetas, cubetas)
+
+
+def vista_metricas(request):
+    """
+    GET /metrics. Acepta `Authorization: Bearer <METRICAS_TOKEN>` (para el
+    scraper) o una sesión de superusuario.
+    """
+    token = getattr(settings, 'METRICAS_TOKEN', '')
+    autorizacion = request.headers.get('Authorization', '')
+    por_token = bool(token) and hmac.compare_digest(autorizacion.encode(), f'Bearer {token}'.encode())
+    if not por_token and not request.user.is_superuser:
+        respuesta = HttpResponse('No autorizado.\n', status=401, content_type='text/plain')
+        respuesta['WWW-Authenticate'] = 'Bearer realm="metrics"'
+        return respuesta
+    return HttpResponse(registro.exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,118 @@
+"""
+Middleware de medición por petición.
+
+Agrega la cabecera Server-Timing (SQL, plantillas, vista y total; ver
+AppSkate/medicion.py) y perfila con cProfile una fracción de las peticiones
+(PERFIL_MUESTREO), guardando cada volcado en PERFIL_DIRECTORIO. Los volcados
+se agregan con: python manage.py reporte_perfiles
+
+NMasUnoMiddleware aplica el detector de AppSkate/nmasuno.py a cada petición.
+MetricasMiddleware cuenta peticiones y latencia por vista (AppSkate/metricas.py).
+"""
+import cProfile
+import logging
+import os
+import random
+import re
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import metricas
+from .medicion import Medicion
+from .nmasuno import ConsultasRepetidas, detectar_n_mas_uno
+
+logger = logging.getLogger('skateshop.nmasuno')
+
+PETICIONES = metricas.contador(
+    'skateshop_peticiones_total', 'Peticiones HTTP atendidas.', etiquetas=('vista', 'metodo', 'estado'),
+)
+LATENCIA = metricas.histograma(
+    'skateshop_peticion_segundos', 'Duración de las peticiones HTTP.', etiquetas=('vista',),
+)
+
+
+def server_timing(m):
+    return ', '.join([
+        f'sql;dur={m.sql_ms:.1f};desc="{m.consultas} consultas"',
+        f'tpl;dur={m.plantilla_ms:.1f}',
+        f'vista;dur={m.vista_ms:.1f}',
+        f'total;dur={m.total_ms:.1f}',
+    ])
+
+
+class MedicionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'PERFIL_MUESTREO', 0.0)
+        self.directorio = getattr(settings, 'PERFIL_DIRECTORIO', None)
+        self.cabecera = getattr(settings, 'SERVER_TIMING', True)
+
+    def __call__(self, request):
+        perfil = None
+        if self.muestreo and self.directorio and random.random() < self.muestreo:
+            perfil = cProfile.Profile()
+
+        with Medicion() as m:
+            if perfil:
+                perfil.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    perfil.disable()
+            else:
+                response = self.get_response(request)
+
+        if self.cabecera:
+            response['Server-Timing'] = server_timing(m)
+        if perfil:
+            self.guardar(perfil, request)
+        return response
+
+    def guardar(self, perfil, request):
+        coincidencia = getattr(request, 'resolver_match', None)
+        ruta = coincidencia.view_name if coincidencia else 'sin-ruta'
+        ruta = re.sub(r'[^\w.-]', '_', ruta)
+        os.makedirs(self.directorio, exist_ok=True)
+        nombre = f"{ruta}--{int(time.time() * 1000)}-{os.getpid()}.prof"
+        perfil.dump_stats(os.path.join(self.directorio, nombre))
+
+
+class NMasUnoMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.modo = getattr(settings, 'N_MAS_UNO', None)
+        if self.modo not in ('registrar', 'error'):
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        with detectar_n_mas_uno() as detector:
+            response = self.get_response(request)
+
+        if detector.repetidas():
+            mensaje = detector.describir(f"{request.method} {request.path}")
+            if self.modo == 'error':
+                raise ConsultasRepetidas(mensaje)
+            logger.warning(mensaje)
+        return response
+
+
+class MetricasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        duracion = time.perf_counter() - inicio
+        if metricas.registro.en_pausa:
+            return response  # Peticiones internas de un comando, no tráfico real
+
+        # Se etiqueta por nombre de vista (no por URL) para acotar las series
+        coincidencia = getattr(request, 'resolver_match', None)
+        vista = coincidencia.view_name if coincidencia else 'sin-ruta'
+        PETICIONES.inc(vista=vista, metodo=request.method, estado=response.status_code)
+        LATENCIA.observar(duracion, vista=vista)
+        metricas.registro.volcar_si_corresponde()
+        return response
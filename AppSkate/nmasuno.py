@@ -0,0 +1,106 @@
+"""
+Detector de consultas N+1.
+
+Agrupa las consultas de una petición por su forma (el SQL con los parámetros
+como %s y las listas IN colapsadas) y reporta las formas que se repiten más de
+N_MAS_UNO_UMBRAL veces, junto con la plantilla y la línea de código del
+proyecto que las disparó. El origen solo se calcula al cruzar el umbral, así
+que el costo normal es normalizar el SQL y sumar en un Counter.
+
+NMasUnoMiddleware (AppSkate/middleware.py) registra un warning en producción
+y lanza ConsultasRepetidas en los tests (N_MAS_UNO = 'registrar' | 'error').
+Los bucles por lotes legítimos se excluyen con `with ignorar_n_mas_uno():`.
+"""
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+_ignorando = ContextVar('ignorando_n_mas_uno', default=False)
+
+_LISTA_IN = re.compile(r'\bIN \((?:%s, )*%s\)')
+_ESPACIOS = re.compile(r'\s+')
+# Marcos propios de la medición que no cuentan como origen de la consulta
+_INSTRUMENTACION = {
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), nombre)
+    for nombre in ('nmasuno.py', 'medicion.py', 'middleware.py')
+}
+
+
+class ConsultasRepetidas(Exception):
+    pass
+
+
+def forma_sql(sql):
+    return _ESPACIOS.sub(' ', _LISTA_IN.sub('IN (...)', sql)).strip()
+
+
+def origen_consulta():
+    """'plantilla.html:linea · archivo.py:linea en funcion' de la consulta en curso."""
+    plantilla = None
+    codigo = None
+    raiz = str(settings.BASE_DIR)
+    frame = sys._getframe(2)
+    while frame is not None and not (plantilla and codigo):
+        archivo = frame.f_code.co_filename
+        if plantilla is None and archivo.endswith(os.path.join('django', 'template', 'base.py')):
+            nodo = frame.f_locals.get('self')
+            origen = getattr(nodo, 'origin', None)
+            token = getattr(nodo, 'token', None)
+            if origen is not None and token is not None:
+                plantilla = f"{origen.template_name}:{token.lineno}"
+        elif (
+            codigo is None and archivo.startswith(raiz) and archivo not in _INSTRUMENTACION
+            and 'site-packages' not in archivo and f'{os.sep}venv{os.sep}' not in archivo
+        ):
+            codigo = f"{os.path.relpath(archivo, raiz)}:{frame.f_lineno} en {frame.f_code.co_name}"
+        frame = frame.f_back
+    return ' · '.join(p for p in (plantilla, codigo) if p) or 'origen desconocido'
+
+
+class DetectorNMasUno:
+    def __init__(self, umbral):
+        self.umbral = umbral
+        self.conteo = Counter()
+        self.origenes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not _ignorando.get():
+            forma = forma_sql(sql)
+            self.conteo[forma] += 1
+            if self.conteo[forma] == self.umbral + 1:
+                self.origenes[forma] = origen_consulta()
+        return execute(sql, params, many, context)
+
+    def repetidas(self):
+        """[(forma, veces, origen)] de las formas que superaron el umbral."""
+        return [(forma, self.conteo[forma], origen) for forma, origen in self.origenes.items()]
+
+    def describir(self, contexto):
+        lineas = [f"Consultas N+1 en {contexto}:"]
+        for forma, veces, origen in self.repetidas():
+            lineas.append(f"  {veces}x desde {origen}\n      {forma[:300]}")
+        return '\n'.join(lineas)
+
+
+@contextmanager
+def detectar_n_mas_uno(umbral=None):
+    detector = DetectorNMasUno(umbral if umbral is not None else getattr(settings, 'N_MAS_UNO_UMBRAL', 5))
+    with ExitStack() as pila:
+        for alias in connections:
+            pila.enter_context(connections[alias].execute_wrapper(detector))
+        yield detector
+
+
+@contextmanager
+def ignorar_n_mas_uno():
+    token = _ignorando.set(True)
+    try:
+        yield
+    finally:
+        _ignorando.reset(token)
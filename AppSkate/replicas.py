@@ -0,0 +1,104 @@
+"""
+Lecturas en réplicas.
+
+Las vistas marcadas con @lee_de_replica (catálogo, detalle de producto,
+comunidad) leen de una de las BASES_REPLICA en las peticiones GET/HEAD. Todo
+lo demás va a `default`:
+
+- las escrituras, select_for_update() (Django lo resuelve con db_for_write)
+  y cualquier lectura dentro de un transaction.atomic();
+- las sesiones, que se crean y se leen en la misma petición;
+- el cliente que escribió hace menos de REPLICA_FIJAR_SEGUNDOS: ReplicasMiddleware
+  deja la cookie COOKIE_PRIMARIA tras cualquier escritura para que vea sus propios
+  cambios aunque la réplica vaya atrasada;
+- lo que se genera dentro de `with leer_de_primaria():`, como las páginas que
+  cache_anonima va a guardar: una réplica atrasada dejaría en la caché datos
+  viejos bajo la versión nueva del catálogo.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+COOKIE_PRIMARIA = 'primaria'
+SIEMPRE_PRIMARIA = {'sessions'}
+
+_leer_de_replica = ContextVar('leer_de_replica', default=False)
+_forzar_primaria = ContextVar('forzar_primaria', default=False)
+# Lista mutable creada por el middleware: el router la marca al escribir
+_escrituras = ContextVar('escrituras', default=None)
+
+
+def _en_transaccion():
+    # Los atomic() con los que TestCase envuelve cada test no cuentan
+    return any(not getattr(bloque, '_from_testcase', False) for bloque in connections[DEFAULT_DB_ALIAS].atomic_blocks)
+
+
+class RouterReplicas:
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'BASES_REPLICA', [])
+        if not replicas or not _leer_de_replica.get():
+            return None
+        if model._meta.app_label in SIEMPRE_PRIMARIA or _en_transaccion():
+            return None
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        escrituras = _escrituras.get()
+        if escrituras is not None and model._meta.app_label not in SIEMPRE_PRIMARIA:
+            escrituras.append(model._meta.label)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas tienen los mismos datos que la primaria
+        bases = {DEFAULT_DB_ALIAS, *getattr(settings, 'BASES_REPLICA', [])}
+        if obj1._state.db in bases and obj2._state.db in bases:
+            return True
+        return None
+
+
+@contextmanager
+def leer_de_primaria():
+    """Las vistas @lee_de_replica llamadas dentro del bloque leen de la primaria."""
+    token = _forzar_primaria.set(True)
+    try:
+        yield
+    finally:
+        _forzar_primaria.reset(token)
+
+
+def lee_de_replica(vista):
+    """Las peticiones GET/HEAD de la vista leen de una réplica (salvo cliente fijado)."""
+    @wraps(vista)
+    def envoltura(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or COOKIE_PRIMARIA in request.COOKIES or _forzar_primaria.get():
+            return vista(request, *args, **kwargs)
+        token = _leer_de_replica.set(True)
+        try:
+            return vista(request, *args, **kwargs)
+        finally:
+            _leer_de_replica.reset(token)
+    return envoltura
+
+
+class ReplicasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        escrituras = []
+        token = _escrituras.set(escrituras)
+        try:
+            response = self.get_response(request)
+        finally:
+            _escrituras.reset(token)
+
+        if escrituras and getattr(settings, 'BASES_REPLICA', []):
+            response.set_cookie(
+                COOKIE_PRIMARIA, '1', max_age=getattr(settings, 'REPLICA_FIJAR_SEGUNDOS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
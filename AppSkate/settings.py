@@ -6,21 +6,38 @@ Generated by 'django-admin startproject' using Django 5.2.8.
 
 from pathlib import Path
 import os
+import sys
+
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
+# Perfil de entorno: 'dev' (SQLite local), 'test' (SQLite en memoria) o 'prod' (MySQL).
+# Todo lo específico de producción se lee de variables de entorno. `manage.py test`
+# usa el perfil 'test' salvo que SKATESHOP_ENTORNO diga otra cosa.
+EJECUTANDO_TESTS = sys.argv[1:2] == ['test']
+ENTORNO = os.environ.get('SKATESHOP_ENTORNO', 'test' if EJECUTANDO_TESTS else 'dev')
+if ENTORNO not in ('dev', 'test', 'prod'):
+    raise ImproperlyConfigured(f"SKATESHOP_ENTORNO desconocido: {ENTORNO!r} (usa dev, test o prod).")
+
+def entorno_bool(nombre, defecto=False):
+    return os.environ.get(nombre, str(defecto)).lower() in ('1', 'true', 'si', 'sí', 'yes')
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-9a3lg0rp^y#9)!ri$#b!!i8(jhnr-k5p@y!ymh#%v9u#6ns^r4'
+# La clave de desarrollo está en el repositorio: producción no arranca sin una propia.
+if ENTORNO == 'prod' and not os.environ.get('DJANGO_SECRET_KEY'):
+    raise ImproperlyConfigured("En producción DJANGO_SECRET_KEY es obligatoria.")
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-9a3lg0rp^y#9)!ri$#b!!i8(jhnr-k5p@y!ymh#%v9u#6ns^r4',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = entorno_bool('DJANGO_DEBUG', ENTORNO == 'dev')
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [h for h in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if h]
 
 
 INSTALLED_APPS = [
@@ -35,6 +52,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'AppSkate.middleware.MetricasMiddleware',
+    'AppSkate.middleware.MedicionMiddleware',
+    'AppSkate.middleware.NMasUnoMiddleware',
+    'AppSkate.replicas.ReplicasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,6 +77,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'SkateApp.cache_paginas.carrito',
             ],
         },
     },
@@ -67,19 +89,85 @@ WSGI_APPLICATION = 'AppSkate.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'skateshop_db',
-        'USER': 'root',
-        'PASSWORD': '',
-        'HOST': '127.0.0.1',
-        'PORT': '3306',
-        'OPTIONS': {
+if ENTORNO == 'prod':
+    DB_MOTOR = os.environ.get('DB_MOTOR', 'mysql')
+    DATABASES = {
+        'default': {
+            'ENGINE': f'django.db.backends.{DB_MOTOR}',
+            'NAME': os.environ.get('DB_NAME', 'skateshop_db'),
+            'USER': os.environ.get('DB_USER', 'root'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', '127.0.0.1'),
+            'PORT': os.environ.get('DB_PORT', '3306' if DB_MOTOR == 'mysql' else '5432'),
+            # Conexiones persistentes: se reutilizan entre peticiones del mismo worker
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 300)),
+            # Antes de reutilizar una conexión se comprueba que siga viva
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if DB_MOTOR == 'mysql':
+        DATABASES['default']['OPTIONS'] = {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
-        },
+            'charset': 'utf8mb4',
+            'isolation_level': 'read committed',
+            'connect_timeout': int(os.environ.get('DB_CONNECT_TIMEOUT', 5)),
+        }
+    # Pool nativo de Django: solo PostgreSQL (psycopg 3). En MySQL se usa
+    # CONN_MAX_AGE, o un proxy externo (ProxySQL) si hiciera falta un pool real.
+    DB_POOL = entorno_bool('DB_POOL')
+    if DB_POOL and DB_MOTOR == 'postgresql':
+        DATABASES['default']['CONN_MAX_AGE'] = 0  # Django exige 0 cuando hay pool
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+        }
+    # Réplicas de lectura: DB_REPLICA_HOSTS=10.0.0.2,10.0.0.3 (mismas credenciales)
+    for numero, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+        DATABASES[f'replica{numero}'] = {
+            **DATABASES['default'],
+            'HOST': host.strip(),
+            'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+            'TEST': {'MIRROR': 'default'},
+        }
+else:
+    DB_POOL = False
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3' if ENTORNO == 'dev' else ':memory:',
+            'CONN_MAX_AGE': 60 if ENTORNO == 'dev' else 0,
+        }
+    }
+    # En desarrollo, una copia de db.sqlite3 hace de réplica: DB_REPLICA_SQLITE=replica.sqlite3.
+    # En los tests existe siempre, vacía e independiente; ReplicasTests la activa.
+    if ENTORNO == 'test' or os.environ.get('DB_REPLICA_SQLITE'):
+        DATABASES['replica'] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:' if ENTORNO == 'test' else BASE_DIR / os.environ['DB_REPLICA_SQLITE'],
+            'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        }
+
+# Lecturas de las vistas marcadas con @lee_de_replica (AppSkate/replicas.py). Tras
+# escribir, el cliente lee de la primaria durante REPLICA_FIJAR_SEGUNDOS.
+DATABASE_ROUTERS = ['AppSkate.replicas.RouterReplicas']
+BASES_REPLICA = [alias for alias in DATABASES if alias != 'default' and ENTORNO != 'test']
+REPLICA_FIJAR_SEGUNDOS = int(os.environ.get('REPLICA_FIJAR_SEGUNDOS', 10))
+
+# Caché compartida entre procesos en producción (sesiones, límites de login, catálogo)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
 
 
 # Password validation
@@ -138,4 +226,47 @@ LOGIN_URL = '/login/'
 
 LOGIN_REDIRECT_URL = '/'
 
-LOGOUT_REDIRECT_URL = '/'
\ No newline at end of file
+LOGOUT_REDIRECT_URL = '/'
+
+# Sesiones: se leen desde la caché y solo se escriben en la base de datos cuando
+# su contenido cambia (ver SkateApp/sesiones.py). Con varios procesos, la caché
+# debe ser compartida (Redis/Memcached) para que todos vean el mismo carrito.
+# Las vencidas se eliminan con: python manage.py limpiar_sesiones
+SESSION_ENGINE = 'SkateApp.sesiones'
+
+# Límite de intentos de login por IP (SkateApp/limites.py). Detrás del proxy inverso
+# REMOTE_ADDR es el del proxy: se usa esta cabecera (p. ej. X-Forwarded-For), tomando
+# la entrada que añadió el último de los IP_PROXIES_CONFIABLES proxies propios.
+IP_CABECERA = os.environ.get('SKATESHOP_IP_HEADER', '')
+IP_PROXIES_CONFIABLES = int(os.environ.get('SKATESHOP_PROXIES_CONFIABLES', 1))
+
+# Medición por petición (AppSkate/middleware.py): cabecera Server-Timing y una
+# fracción de peticiones perfiladas con cProfile (0 = sin perfilar).
+SERVER_TIMING = entorno_bool('SERVER_TIMING', True)
+PERFIL_MUESTREO = float(os.environ.get('PERFIL_MUESTREO', 0))
+PERFIL_DIRECTORIO = os.environ.get('PERFIL_DIRECTORIO', os.path.join(BASE_DIR, 'perfiles'))
+
+# Detector de consultas N+1 (AppSkate/nmasuno.py): mientras corre la suite de tests
+# (con cualquier perfil) falla la petición; fuera de ella deja un warning en el logger
+# 'skateshop.nmasuno'.
+N_MAS_UNO = os.environ.get('N_MAS_UNO', 'error' if ENTORNO == 'test' or EJECUTANDO_TESTS else 'registrar')
+N_MAS_UNO_UMBRAL = int(os.environ.get('N_MAS_UNO_UMBRAL', 5))
+
+# Métricas en formato Prometheus en GET /metrics (AppSkate/metricas.py). Cada worker
+# vuelca sus totales al directorio como mucho cada METRICAS_INTERVALO segundos;
+# vaciarlo al desplegar (los archivos de workers terminados se compactan solos).
+# Sin directorio solo se ve el proceso que atiende /metrics.
+METRICAS_DIRECTORIO = os.environ.get('METRICAS_DIRECTORIO', None if ENTORNO == 'test' else os.path.join(BASE_DIR, 'metricas'))
+METRICAS_INTERVALO = float(os.environ.get('METRICAS_INTERVALO', 1))
+METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN', '')
+
+# Páginas completas en caché para anónimos (SkateApp/cache_paginas.py). En los tests
+# está desactivada para que cada test vea sus propios datos.
+PAGINAS_CACHE_SEGUNDOS = int(os.environ.get('PAGINAS_CACHE_SEGUNDOS', 0 if ENTORNO == 'test' else 300))
+PAGINAS_MAX_AGE = int(os.environ.get('PAGINAS_MAX_AGE', 60))  # Cache-Control para navegadores y proxies
+
+# Instantánea JSON del catálogo para filtrar en el navegador (SkateApp/instantanea.py).
+# Sin directorio (tests) catalogo.html funciona solo con el servidor.
+INSTANTANEA_DIRECTORIO = os.environ.get(
+    'INSTANTANEA_DIRECTORIO', None if ENTORNO == 'test' else os.path.join(MEDIA_ROOT, 'catalogo'),
+)
@@ -21,8 +21,11 @@ from django.urls import path, include
 from django.conf import settings             
 from django.conf.urls.static import static
 
+from .metricas import vista_metricas
+
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', vista_metricas, name='metricas'),
     path('', include('SkateApp.urls')), 
     
 ]
@@ -1,8 +1,19 @@
+import io
+
 from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
 from .models import (
     Usuario, Direccion, Categoria, Producto, 
-    Pedido, DetallePedido, Post, Comentario, Reseña, Noticia
+    Pedido, DetallePedido, PedidoHistorico, Post, Comentario, Reseña, Noticia, AjusteMasivo
 )
+from .paginacion import PaginadorConteoEstimado
+from .catalogo_io import detectar_formato, exportar_catalogo, importar_catalogo, leer_filas
+from .pedidos_io import exportar_pedidos
+from .forms import ImportarCatalogoForm
 
 class DetallePedidoInline(admin.TabularInline):
     model = DetallePedido
@@ -19,8 +30,37 @@ class PedidoAdmin(admin.ModelAdmin):
     
     inlines = [DetallePedidoInline]
     ordering = ('-fecha',)
+
+    # Usuario y dirección en el mismo JOIN: direccion_completa no consulta por fila
+    list_select_related = ('usuario', 'usuario__direccion')
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
     
     readonly_fields = ('direccion_completa',)
+    actions = ['exportar_csv', 'exportar_jsonl']
+
+    def _exportar(self, queryset, formato):
+        respuesta = StreamingHttpResponse(
+            exportar_pedidos(queryset, formato),
+            content_type='text/csv' if formato == 'csv' else 'application/x-ndjson',
+        )
+        respuesta['Content-Disposition'] = f'attachment; filename="pedidos.{formato}"'
+        return respuesta
+
+    def change_view(self, request, object_id, form_url='', extra_context=None):
+        # Enlaces antiguos a un pedido que ya se archivó: se abre su ficha archivada
+        if (object_id.isdigit() and not Pedido.objects.filter(pk=object_id).exists()
+                and PedidoHistorico.objects.filter(pk=object_id).exists()):
+            return redirect(reverse('admin:SkateApp_pedidohistorico_change', args=[object_id]))
+        return super().change_view(request, object_id, form_url, extra_context)
+
+    @admin.action(description="Exportar pedidos seleccionados (CSV)")
+    def exportar_csv(self, request, queryset):
+        return self._exportar(queryset, 'csv')
+
+    @admin.action(description="Exportar pedidos seleccionados (JSONL)")
+    def exportar_jsonl(self, request, queryset):
+        return self._exportar(queryset, 'jsonl')
 
     def mostrar_total(self, obj):
         return f"${obj.total:,.0f}".replace(",", ".")
@@ -38,12 +78,52 @@ class PedidoAdmin(admin.ModelAdmin):
     
     direccion_completa.short_description = 'Dirección de Envío'
 
+@admin.register(PedidoHistorico)
+class PedidoHistoricoAdmin(admin.ModelAdmin):
+    """Pedidos movidos por archivar_pedidos: solo lectura."""
+    list_display = ('id', 'usuario', 'mostrar_total', 'estado', 'fecha', 'archivado')
+    list_filter = ('estado', 'fecha')
+    search_fields = ('usuario__username', 'id')
+    ordering = ('-fecha',)
+    list_select_related = ('usuario',)
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
+    fields = ('id', 'usuario', 'fecha', 'estado', 'total', 'codigo_seguimiento', 'archivado', 'mostrar_lineas')
+    readonly_fields = fields
+
+    mostrar_total = PedidoAdmin.mostrar_total
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        # El JSON de las líneas solo se lee en la ficha, no en el listado
+        return queryset if request.resolver_match.url_name.endswith('_change') else queryset.defer('detalles')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def mostrar_lineas(self, obj):
+        filas = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td>{}</td><td>${}</td></tr>',
+            ((l['producto_id'], l['nombre'], l['cantidad'], l['precio_unitario']) for l in obj.lineas),
+        )
+        return format_html(
+            '<table><tr><th>Producto</th><th>Nombre</th><th>Cantidad</th><th>Precio unitario</th></tr>{}</table>',
+            filas,
+        )
+    mostrar_lineas.short_description = 'Productos'
+
 # 3. Administración de DIRECCIONES
 @admin.register(Direccion)
 class DireccionAdmin(admin.ModelAdmin):
     list_display = ('calle', 'comuna', 'region', 'usuario_asociado')
     list_filter = ('region', 'comuna')
     search_fields = ('calle', 'usuario_perfil__username')
+    list_select_related = ('usuario_perfil',)
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
 
     def usuario_asociado(self, obj):
         try:
@@ -58,11 +138,61 @@ class ProductoAdmin(admin.ModelAdmin):
     list_filter = ('categorias',)
     search_fields = ('nombre',)
     list_editable = ('stock', 'precio') 
+    paginator = PaginadorConteoEstimado
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related('categorias')
+
+    def get_urls(self):
+        urls = [
+            path('importar/', self.admin_site.admin_view(self.importar_view), name='SkateApp_producto_importar'),
+            path('exportar/<str:formato>/', self.admin_site.admin_view(self.exportar_view), name='SkateApp_producto_exportar'),
+        ]
+        return urls + super().get_urls()
+
+    def importar_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+
+        resultado = None
+        if request.method == 'POST':
+            form = ImportarCatalogoForm(request.POST, request.FILES)
+            if form.is_valid():
+                subido = form.cleaned_data['archivo']
+                formato = form.cleaned_data['formato'] or detectar_formato(subido.name)
+                archivo = io.TextIOWrapper(subido.file, encoding='utf-8-sig', newline='')
+                resultado = importar_catalogo(leer_filas(archivo, formato))
+        else:
+            form = ImportarCatalogoForm()
+
+        return render(request, 'admin/SkateApp/producto/importar.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar catálogo',
+            'form': form,
+            'resultado': resultado,
+        })
+
+    def exportar_view(self, request, formato):
+        if not self.has_view_permission(request) or formato not in ('csv', 'jsonl'):
+            raise PermissionDenied
+
+        tipo = 'text/csv' if formato == 'csv' else 'application/x-ndjson'
+        response = StreamingHttpResponse(exportar_catalogo(formato), content_type=f'{tipo}; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="catalogo.{formato}"'
+        return response
 
     def mostrar_categorias(self, obj):
         return ", ".join([c.nombre for c in obj.categorias.all()])
     mostrar_categorias.short_description = 'Categorías'
 
+@admin.register(AjusteMasivo)
+class AjusteMasivoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'fecha', 'usuario', 'productos_actualizados')
+    list_select_related = ('usuario',)
+    readonly_fields = ('usuario', 'fecha', 'productos_actualizados', 'detalle')
+
 admin.site.register(Usuario)
 admin.site.register(Categoria)
 admin.site.register(Post)
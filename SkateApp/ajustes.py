@@ -0,0 +1,175 @@
+"""
+Ajustes masivos de precio y stock.
+
+Todo el lote se aplica en una transacción con UPDATE ... SET col = CASE WHEN
+(un statement por cada BLOQUE_CASE productos) y deja una fila de auditoría.
+"""
+from decimal import Decimal, InvalidOperation
+
+from django.db import router, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from AppSkate.nmasuno import ignorar_n_mas_uno
+
+from .cache_catalogo import invalidar_catalogo
+from .catalogo_io import PRECIO_MAXIMO
+from .models import AjusteMasivo, Producto
+
+BLOQUE_CASE = 500
+MAXIMO_POR_LOTE = 10000
+
+
+class ErrorAjuste(ValueError):
+    pass
+
+
+def _entero(valor, campo):
+    try:
+        return int(str(valor).strip())
+    except (TypeError, ValueError):
+        raise ErrorAjuste(f"{campo} debe ser un número entero.")
+
+
+def normalizar_ajuste(dato):
+    """
+    Acepta {'producto_id', 'stock' | 'delta_stock', 'precio'} y devuelve el
+    ajuste validado. Lanza ErrorAjuste con un mensaje para el usuario.
+    """
+    producto_id = _entero(dato.get('producto_id'), "El producto_id")
+
+    stock = dato.get('stock')
+    delta = dato.get('delta_stock')
+    if stock not in (None, '') and delta not in (None, ''):
+        raise ErrorAjuste("Indica stock absoluto o delta_stock, no ambos.")
+    stock = None if stock in (None, '') else _entero(stock, "El stock")
+    delta = None if delta in (None, '') else _entero(delta, "El delta de stock")
+    if stock is not None and stock < 0:
+        raise ErrorAjuste("El stock no puede ser negativo.")
+
+    precio = dato.get('precio')
+    if precio in (None, ''):
+        precio = None
+    else:
+        try:
+            precio = Decimal(str(precio).strip())
+        except InvalidOperation:
+            raise ErrorAjuste("El precio no es un número válido.")
+        if not precio.is_finite() or precio <= 0 or precio > PRECIO_MAXIMO:
+            raise ErrorAjuste("El precio debe ser un valor positivo.")
+        precio = precio.quantize(Decimal('0.01'))
+
+    if stock is None and delta is None and precio is None:
+        raise ErrorAjuste("El ajuste no modifica nada.")
+
+    return {'producto_id': producto_id, 'stock': stock, 'delta_stock': delta, 'precio': precio}
+
+
+def interpretar_lineas(texto):
+    """
+    Lee líneas "producto_id,stock,precio" del formulario de administración.
+    El stock con signo (+5, -3) es un delta; sin signo es un valor absoluto.
+    Devuelve (datos, errores) con errores como [(linea, mensaje)].
+    """
+    datos = []
+    errores = []
+    for linea, contenido in enumerate(texto.splitlines(), start=1):
+        contenido = contenido.strip()
+        if not contenido or contenido.startswith('#'):
+            continue
+        partes = [p.strip() for p in contenido.split(',')]
+        if len(partes) < 2 or len(partes) > 3:
+            errores.append((linea, "Formato esperado: producto_id,stock,precio"))
+            continue
+        producto_id, stock = partes[0], partes[1]
+        precio = partes[2] if len(partes) == 3 else ''
+        dato = {'producto_id': producto_id, 'precio': precio, 'linea': linea}
+        if stock[:1] in ('+', '-'):
+            dato['delta_stock'] = stock
+        else:
+            dato['stock'] = stock
+        datos.append(dato)
+    return datos, errores
+
+
+def aplicar_ajustes(datos, usuario=None):
+    """
+    Valida y aplica un lote de ajustes. Devuelve (ajuste, errores); ajuste es
+    None si ninguna fila era válida. Las filas con error no detienen el lote.
+    """
+    errores = []
+    ajustes = {}
+    if len(datos) > MAXIMO_POR_LOTE:
+        raise ErrorAjuste(f"El lote supera el máximo de {MAXIMO_POR_LOTE} productos.")
+
+    for posicion, dato in enumerate(datos, start=1):
+        referencia = dato.get('linea', posicion)
+        try:
+            ajuste = normalizar_ajuste(dato)
+        except ErrorAjuste as e:
+            errores.append((referencia, str(e)))
+            continue
+        if ajuste['producto_id'] in ajustes:
+            errores.append((referencia, f"El producto #{ajuste['producto_id']} aparece repetido en el lote."))
+            continue
+        ajuste['referencia'] = referencia
+        ajustes[ajuste['producto_id']] = ajuste
+
+    alias = router.db_for_write(Producto)
+    with transaction.atomic(using=alias):
+        existentes = set(Producto.objects.filter(id__in=ajustes).values_list('id', flat=True))
+        for producto_id in list(ajustes):
+            if producto_id not in existentes:
+                errores.append((ajustes.pop(producto_id)['referencia'], f"No existe el producto #{producto_id}."))
+
+        if not ajustes:
+            return None, errores
+
+        lista = list(ajustes.values())
+        actualizados = 0
+        with ignorar_n_mas_uno():  # un UPDATE por bloque, no un N+1
+            for inicio in range(0, len(lista), BLOQUE_CASE):
+                actualizados += _actualizar_bloque(lista[inicio:inicio + BLOQUE_CASE])
+
+        registro = AjusteMasivo.objects.create(
+            usuario=usuario,
+            productos_actualizados=actualizados,
+            detalle=[
+                {
+                    'producto_id': a['producto_id'],
+                    'stock': a['stock'],
+                    'delta_stock': a['delta_stock'],
+                    'precio': str(a['precio']) if a['precio'] is not None else None,
+                }
+                for a in lista
+            ],
+        )
+        transaction.on_commit(invalidar_catalogo, using=alias)
+
+    return registro, errores
+
+
+def _actualizar_bloque(ajustes):
+    casos_stock = []
+    casos_precio = []
+    for a in ajustes:
+        if a['stock'] is not None:
+            casos_stock.append(When(id=a['producto_id'], then=Value(a['stock'])))
+        elif a['delta_stock'] is not None:
+            # El delta se calcula en la base de datos: no pisa ventas concurrentes
+            casos_stock.append(When(id=a['producto_id'], then=Greatest(F('stock') + a['delta_stock'], Value(0))))
+        if a['precio'] is not None:
+            casos_precio.append(When(id=a['producto_id'], then=Value(a['precio'])))
+
+    # update() no aplica auto_now
+    cambios = {'actualizado': timezone.now()}
+    if casos_stock:
+        cambios['stock'] = Case(*casos_stock, default=F('stock'))
+    if casos_precio:
+        cambios['precio'] = Case(
+            *casos_precio, default=F('precio'),
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        )
+
+    return Producto.objects.filter(id__in=[a['producto_id'] for a in ajustes]).update(**cambios)
@@ -0,0 +1,98 @@
+"""
+Archivo de pedidos antiguos.
+
+Los pedidos entregados (y ya sumados a los resúmenes) con más de N meses
+salen de Pedido/DetallePedido hacia PedidoHistorico, una fila por pedido con
+las líneas en JSON. Se mueven por lotes, una transacción por lote, así que el
+comando archivar_pedidos puede cortarse y retomarse en cualquier momento.
+
+panel_usuario, compra_exitosa, el admin y recalcular_resumenes leen de ambas
+tablas con las funciones de este módulo.
+"""
+import time
+from datetime import datetime
+from itertools import chain
+from operator import attrgetter
+
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import Http404
+
+from .models import DetallePedido, Pedido, PedidoHistorico
+
+TAMANO_LOTE = 500
+ESTADOS_ARCHIVABLES = ('entregado',)
+
+
+def restar_meses(fecha, meses):
+    """La misma fecha `meses` atrás (el día se recorta al último del mes si no existe)."""
+    indice = fecha.year * 12 + fecha.month - 1 - meses
+    anio, mes = divmod(indice, 12)
+    mes += 1
+    siguiente = datetime(anio + mes // 12, mes % 12 + 1, 1)
+    ultimo_dia = (siguiente - datetime(anio, mes, 1)).days
+    return fecha.replace(year=anio, month=mes, day=min(fecha.day, ultimo_dia))
+
+
+def archivables(antes_de):
+    return Pedido.objects.filter(estado__in=ESTADOS_ARCHIVABLES, contabilizado=True, fecha__lt=antes_de)
+
+
+def _historico(pedido):
+    return PedidoHistorico(
+        id=pedido.id,
+        usuario_id=pedido.usuario_id,
+        fecha=pedido.fecha,
+        estado=pedido.estado,
+        total=pedido.total,
+        codigo_seguimiento=pedido.codigo_seguimiento,
+        detalles=[
+            [d.producto_id, d.cantidad, str(d.precio_unitario), d.producto.nombre]
+            for d in pedido.detalles.all()
+        ],
+    )
+
+
+def archivar_pedidos(antes_de, tamano_lote=TAMANO_LOTE, pausa=0, al_avanzar=None):
+    """Mueve los pedidos archivables anteriores a `antes_de`. Devuelve cuántos movió."""
+    detalles = DetallePedido.objects.select_related('producto').only(
+        'pedido_id', 'producto_id', 'cantidad', 'precio_unitario', 'producto__nombre',
+    )
+    total = 0
+    while True:
+        with transaction.atomic():
+            lote = list(
+                archivables(antes_de).order_by('id').select_for_update()
+                .prefetch_related(Prefetch('detalles', queryset=detalles))[:tamano_lote]
+            )
+            if not lote:
+                break
+            ids = [p.id for p in lote]
+            PedidoHistorico.objects.bulk_create([_historico(p) for p in lote])
+            DetallePedido.objects.filter(pedido_id__in=ids).delete()
+            # Las reseñas que apuntaban al pedido quedan con pedido=NULL (SET_NULL)
+            Pedido.objects.filter(id__in=ids).delete()
+
+        total += len(lote)
+        if al_avanzar:
+            al_avanzar(total)
+        if pausa:
+            time.sleep(pausa)
+    return total
+
+
+def pedidos_de_usuario(usuario):
+    """Pedidos vivos y archivados del usuario, más recientes primero."""
+    vivos = Pedido.objects.filter(usuario=usuario).order_by('-fecha')
+    archivados = PedidoHistorico.objects.filter(usuario=usuario).defer('detalles').order_by('-fecha')
+    return sorted(chain(vivos, archivados), key=attrgetter('fecha'), reverse=True)
+
+
+def obtener_pedido(pedido_id, **filtros):
+    """El pedido con ese id, vivo o archivado. Lanza Http404 si no está en ninguna tabla."""
+    pedido = Pedido.objects.filter(id=pedido_id, **filtros).first()
+    if pedido is None:
+        pedido = PedidoHistorico.objects.filter(id=pedido_id, **filtros).first()
+    if pedido is None:
+        raise Http404("No existe el pedido.")
+    return pedido
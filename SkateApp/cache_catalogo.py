@@ -0,0 +1,49 @@
+"""
+Versión global del catálogo en la caché.
+
+Las claves de caché que dependen del catálogo incluyen esta versión, así que
+invalidar todo el catálogo es un solo incremento en vez de borrar clave a clave.
+Junto a la versión se guarda el momento del último cambio, que es el
+Last-Modified del catálogo (ver cache_paginas.py).
+"""
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+
+CLAVE_VERSION = 'catalogo:version'
+CLAVE_MODIFICADO = 'catalogo:modificado'
+
+
+def version_catalogo():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        # Partir de la hora actual evita reutilizar versiones viejas tras un flush
+        cache.add(CLAVE_VERSION, int(time.time()), None)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def modificacion_catalogo():
+    """Fecha del último cambio del catálogo."""
+    modificado = cache.get(CLAVE_MODIFICADO)
+    if modificado is None:
+        # Sin dato (caché vaciada) no se sabe cuándo cambió: se toma ahora
+        cache.add(CLAVE_MODIFICADO, timezone.now(), None)
+        modificado = cache.get(CLAVE_MODIFICADO)
+    return modificado
+
+
+def invalidar_catalogo():
+    cache.set(CLAVE_MODIFICADO, timezone.now(), None)
+    try:
+        cache.incr(CLAVE_VERSION)
+    except ValueError:
+        version_catalogo()
+    # Import local: instantanea.py depende de este módulo
+    from .instantanea import programar_instantanea
+    programar_instantanea()
+
+
+def clave_catalogo(*partes):
+    return ':'.join(['catalogo', str(version_catalogo()), *map(str, partes)])
@@ -0,0 +1,134 @@
+"""
+Caché de páginas completas para visitantes anónimos.
+
+home, catalogo y detalle_producto son iguales para todos los anónimos salvo
+la barra de usuario (login, enlace de administración, carrito) y los mensajes.
+Con @cache_anonima esas partes quedan como huecos en base.html, que los
+completa con GET /fragmento/usuario/ (JSON con el HTML de cada hueco), y el
+resto de la página se guarda en la caché. La clave incluye la versión del
+catálogo (cache_catalogo.py), así que cualquier cambio de productos,
+categorías o reseñas la invalida, y solo los parámetros GET que la vista lee
+(`parametros`): el resto de la query string no crea entradas nuevas. La página
+que se va a guardar se genera leyendo de la primaria (leer_de_primaria en
+AppSkate/replicas.py), nunca de una réplica atrasada.
+
+Las respuestas a anónimos llevan Cache-Control: public y Vary: Cookie, de modo
+que un proxy también puede servirlas; las de usuarios autenticados, private.
+
+Para GET condicionales (304 Not Modified), catalogo y detalle_producto usan
+condition() con las funciones etag_catalogo, modificado_catalogo y
+modificado_producto, que salen de las marcas guardadas sin renderizar nada:
+el ETag es la versión del catálogo, el Last-Modified del catálogo es su último
+cambio y el de cada producto su campo `actualizado`. Solo se aplican a
+anónimos: las páginas de un usuario autenticado dependen también de su sesión.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from AppSkate.replicas import leer_de_primaria
+
+from .cache_catalogo import clave_catalogo, modificacion_catalogo, version_catalogo
+from .models import Producto
+
+HUECOS = ('admin', 'cuenta', 'mensajes')
+
+
+def cantidad_carrito(request):
+    return sum(item['cantidad'] for item in request.session.get('carrito', {}).values())
+
+
+def carrito(request):
+    """Procesador de contexto: unidades en el carrito (se calcula solo si la plantilla lo usa)."""
+    return {'carrito_cantidad': lambda: cantidad_carrito(request)}
+
+
+def _condicional(request):
+    return request.method in ('GET', 'HEAD') and not request.user.is_authenticated
+
+
+def etag_catalogo(request, *args, **kwargs):
+    if _condicional(request):
+        return f'W/"catalogo-{version_catalogo()}"'
+    return None
+
+
+def modificado_catalogo(request, *args, **kwargs):
+    if _condicional(request):
+        return modificacion_catalogo()
+    return None
+
+
+def modificado_producto(request, producto_id):
+    if not _condicional(request):
+        return None
+    clave = clave_catalogo('producto', producto_id, 'actualizado')
+    actualizado = cache.get(clave)
+    if actualizado is None:
+        actualizado = Producto.objects.filter(pk=producto_id).values_list('actualizado', flat=True).first()
+        if actualizado is not None:
+            cache.set(clave, actualizado, None)
+    return actualizado
+
+
+def _compartible(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # La página usó {% csrf_token %}: el token es de este visitante
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+    )
+
+
+def _clave_pagina(request, parametros):
+    partes = [request.path] + [f"{nombre}={request.GET.get(nombre, '')}" for nombre in parametros]
+    return clave_catalogo('pagina', hashlib.md5('\n'.join(partes).encode()).hexdigest())
+
+
+def cache_anonima(segundos=None, parametros=()):
+    """
+    Sirve la vista desde la caché a los anónimos en GET/HEAD (segundos: duración
+    en la caché; parametros: nombres de los parámetros GET que cambian la página).
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+                response = vista(request, *args, **kwargs)
+                patch_cache_control(response, private=True)
+                patch_vary_headers(response, ('Cookie',))
+                return response
+
+            request.pagina_compartida = True
+            maximo = getattr(settings, 'PAGINAS_CACHE_SEGUNDOS', 300)
+            duracion = maximo if segundos is None else min(segundos, maximo)
+            clave = _clave_pagina(request, parametros)
+
+            guardada = cache.get(clave) if duracion else None
+            if guardada is not None:
+                contenido, tipo = guardada
+                response = HttpResponse(contenido, content_type=tipo)
+                compartible = True
+            elif duracion:
+                with leer_de_primaria():
+                    response = vista(request, *args, **kwargs)
+                compartible = _compartible(request, response)
+                if compartible:
+                    cache.set(clave, (response.content, response['Content-Type']), duracion)
+            else:
+                response = vista(request, *args, **kwargs)
+                compartible = _compartible(request, response)
+
+            if compartible:
+                patch_cache_control(response, public=True, max_age=getattr(settings, 'PAGINAS_MAX_AGE', 60))
+            else:
+                patch_cache_control(response, private=True)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return envoltura
+    return decorador
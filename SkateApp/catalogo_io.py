@@ -0,0 +1,311 @@
+"""
+Importación y exportación masiva del catálogo en CSV o JSONL.
+
+Los archivos se procesan fila a fila (nunca se cargan completos en memoria)
+y se escriben por lotes: una transacción por lote con bulk_create/bulk_update.
+"""
+import csv
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, router, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from AppSkate.nmasuno import ignorar_n_mas_uno
+
+from .cache_catalogo import invalidar_catalogo
+from .models import Categoria, Producto, base_slug, slug_disponible
+
+CAMPOS = ['id', 'nombre', 'precio', 'stock', 'descripcion', 'categorias']
+FORMATOS = ('csv', 'jsonl')
+SEPARADOR_CATEGORIAS = '|'
+TAMANO_LOTE = 1000
+PRECIO_MAXIMO = Decimal('99999999.99')  # max_digits=10, decimal_places=2
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []  # (linea, mensaje)
+
+    def agregar_error(self, linea, mensaje):
+        self.errores.append((linea, mensaje))
+
+    def escribir_reporte(self, archivo):
+        """Escribe el reporte de errores como CSV (linea, error)."""
+        escritor = csv.writer(archivo)
+        escritor.writerow(['linea', 'error'])
+        escritor.writerows(self.errores)
+
+
+# ----------------------------------------------------------------------
+# Lectura
+# ----------------------------------------------------------------------
+
+def detectar_formato(nombre_archivo):
+    return 'jsonl' if nombre_archivo.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def leer_filas(archivo, formato):
+    """Genera (linea, fila, error) a partir de un archivo de texto abierto."""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila, None
+    elif formato == 'jsonl':
+        for linea, texto in enumerate(archivo, start=1):
+            if not texto.strip():
+                continue
+            try:
+                fila = json.loads(texto)
+            except json.JSONDecodeError as e:
+                yield linea, None, f"JSON inválido: {e.msg}"
+                continue
+            if not isinstance(fila, dict):
+                yield linea, None, "Cada línea debe ser un objeto JSON."
+                continue
+            yield linea, fila, None
+    else:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+
+def limpiar_fila(fila):
+    """Valida y normaliza una fila. Lanza ValueError con el mensaje para el reporte."""
+    id_producto = str(fila.get('id') or '').strip()
+    if id_producto and not id_producto.isdigit():
+        raise ValueError("El id debe ser numérico.")
+
+    nombre = str(fila.get('nombre') or '').strip()
+    if len(nombre) < 5:
+        raise ValueError("El nombre del producto debe tener al menos 5 caracteres.")
+    if len(nombre) > 200:
+        raise ValueError("El nombre del producto no puede superar los 200 caracteres.")
+
+    try:
+        precio = Decimal(str(fila.get('precio') or '').strip())
+    except InvalidOperation:
+        raise ValueError("El precio no es un número válido.")
+    if not precio.is_finite() or precio <= 0 or precio > PRECIO_MAXIMO:
+        raise ValueError("El precio debe ser un valor positivo.")
+
+    try:
+        stock = int(str(fila.get('stock') or '').strip())
+    except ValueError:
+        raise ValueError("El stock debe ser un número entero.")
+    if stock < 0:
+        raise ValueError("El stock no puede ser negativo.")
+
+    categorias = fila.get('categorias') or []
+    if isinstance(categorias, str):
+        categorias = categorias.split(SEPARADOR_CATEGORIAS)
+    categorias = [str(c).strip()[:100] for c in categorias if str(c).strip()]
+
+    return {
+        'id': int(id_producto) if id_producto else None,
+        'nombre': nombre,
+        'precio': precio.quantize(Decimal('0.01')),
+        'stock': stock,
+        'descripcion': str(fila.get('descripcion') or '').strip(),
+        'categorias': categorias,
+    }
+
+
+# ----------------------------------------------------------------------
+# Escritura por lotes
+# ----------------------------------------------------------------------
+
+class CategoriasPorNombre:
+    """
+    Resuelve nombres de categoría a ids con un solo SELECT inicial.
+    Las que faltan se crean con bulk_create (sin pasar por Categoria.save).
+    """
+
+    def __init__(self):
+        self.recargar()
+
+    def recargar(self):
+        self.ids = {}
+        self.slugs = set()
+        for id_categoria, nombre, slug in Categoria.objects.values_list('id', 'nombre', 'slug'):
+            self.ids[nombre.lower()] = id_categoria
+            if slug:
+                self.slugs.add(slug)
+
+    def _slug_libre(self, nombre):
+        slug = slug_disponible(base_slug(nombre), self.slugs)
+        self.slugs.add(slug)
+        return slug
+
+    def resolver(self, nombres):
+        faltantes = {}
+        for nombre in nombres:
+            if nombre.lower() not in self.ids:
+                faltantes.setdefault(nombre.lower(), nombre)
+
+        if faltantes:
+            nuevas = [Categoria(nombre=n, slug=self._slug_libre(n)) for n in faltantes.values()]
+            Categoria.objects.bulk_create(nuevas)
+            if any(c.pk is None for c in nuevas):
+                # MySQL no devuelve los ids de un INSERT masivo
+                por_slug = dict(Categoria.objects.filter(slug__in=[c.slug for c in nuevas]).values_list('slug', 'id'))
+                for c in nuevas:
+                    c.pk = por_slug[c.slug]
+            for c in nuevas:
+                self.ids[c.nombre.lower()] = c.pk
+
+        return [self.ids[n.lower()] for n in nombres]
+
+
+def _completar_ids(productos):
+    """Asigna el pk a productos recién insertados cuando el motor no lo devuelve."""
+    sin_id = [p for p in productos if p.pk is None]
+    if not sin_id:
+        return
+    ids = {}
+    for id_producto, nombre in Producto.objects.filter(nombre__in=[p.nombre for p in sin_id]).order_by('id').values_list('id', 'nombre'):
+        ids[nombre] = id_producto  # el último insertado gana
+    for p in sin_id:
+        p.pk = ids[p.nombre]
+
+
+def _importar_lote(lote, categorias, resultado):
+    ids_solicitados = [datos['id'] for _, datos in lote if datos['id']]
+    nombres = [datos['nombre'] for _, datos in lote if not datos['id']]
+
+    por_id = Producto.objects.in_bulk(ids_solicitados)
+    por_nombre = {p.nombre: p for p in Producto.objects.filter(nombre__in=nombres)}
+
+    nuevos = []
+    actualizados = {}
+    asignaciones = []  # (producto, [ids de categoría])
+    ahora = timezone.now()  # bulk_update no aplica auto_now
+
+    for linea, datos in lote:
+        if datos['id']:
+            producto = por_id.get(datos['id'])
+            if producto is None:
+                resultado.agregar_error(linea, f"No existe el producto #{datos['id']}.")
+                continue
+        else:
+            producto = por_nombre.get(datos['nombre'])
+
+        if producto is None:
+            producto = Producto()
+            nuevos.append(producto)
+            por_nombre[datos['nombre']] = producto
+        elif producto.pk is not None:
+            actualizados[producto.pk] = producto
+
+        producto.nombre = datos['nombre']
+        producto.precio = datos['precio']
+        producto.stock = datos['stock']
+        producto.descripcion = datos['descripcion']
+        producto.actualizado = ahora
+
+        if datos['categorias']:
+            asignaciones.append((producto, categorias.resolver(datos['categorias'])))
+
+    Producto.objects.bulk_create(nuevos)
+    _completar_ids(nuevos)
+    Producto.objects.bulk_update(actualizados.values(), ['nombre', 'precio', 'stock', 'descripcion', 'actualizado'])
+
+    if asignaciones:
+        Relacion = Producto.categorias.through
+        # Las categorías indicadas en el archivo reemplazan a las actuales
+        Relacion.objects.filter(producto_id__in=[p.pk for p, _ in asignaciones]).delete()
+        Relacion.objects.bulk_create(
+            [Relacion(producto_id=p.pk, categoria_id=c) for p, ids in asignaciones for c in set(ids)],
+            ignore_conflicts=True,
+        )
+
+    resultado.creados += len(nuevos)
+    resultado.actualizados += len(actualizados)
+
+
+def importar_catalogo(filas, tamano_lote=TAMANO_LOTE):
+    """
+    Importa las filas generadas por leer_filas(). Los productos se emparejan
+    por id si viene informado, y si no por nombre exacto.
+    """
+    resultado = ResultadoImportacion()
+    categorias = CategoriasPorNombre()
+    alias = router.db_for_write(Producto)
+
+    def procesar(lote):
+        try:
+            # Las mismas consultas por cada lote: repetición esperada, no N+1
+            with ignorar_n_mas_uno(), transaction.atomic(using=alias):
+                _importar_lote(lote, categorias, resultado)
+        except DatabaseError as e:
+            categorias.recargar()
+            for linea, _ in lote:
+                resultado.agregar_error(linea, f"Lote rechazado por la base de datos: {e}")
+
+    lote = []
+    for linea, fila, error in filas:
+        if error:
+            resultado.agregar_error(linea, error)
+            continue
+        try:
+            lote.append((linea, limpiar_fila(fila)))
+        except ValueError as e:
+            resultado.agregar_error(linea, str(e))
+            continue
+
+        if len(lote) >= tamano_lote:
+            procesar(lote)
+            lote = []
+
+    if lote:
+        procesar(lote)
+
+    if resultado.creados or resultado.actualizados:
+        invalidar_catalogo()
+
+    return resultado
+
+
+# ----------------------------------------------------------------------
+# Exportación
+# ----------------------------------------------------------------------
+
+class Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+def exportar_catalogo(formato, tamano_lote=TAMANO_LOTE):
+    """Genera el catálogo línea a línea, leyendo la base de datos por bloques."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    productos = (
+        Producto.objects.order_by('id')
+        .only('id', 'nombre', 'precio', 'stock', 'descripcion')
+        .prefetch_related(Prefetch('categorias', queryset=Categoria.objects.only('id', 'nombre')))
+    )
+
+    if formato == 'csv':
+        escritor = csv.writer(Eco())
+        yield escritor.writerow(CAMPOS)
+
+    for p in productos.iterator(chunk_size=tamano_lote):
+        nombres_categorias = [c.nombre for c in p.categorias.all()]
+        if formato == 'csv':
+            yield escritor.writerow([
+                p.id, p.nombre, p.precio, p.stock, p.descripcion,
+                SEPARADOR_CATEGORIAS.join(nombres_categorias),
+            ])
+        else:
+            yield json.dumps({
+                'id': p.id,
+                'nombre': p.nombre,
+                'precio': str(p.precio),
+                'stock': p.stock,
+                'descripcion': p.descripcion,
+                'categorias': nombres_categorias,
+            }, ensure_ascii=False) + '\n'
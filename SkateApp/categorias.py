@@ -0,0 +1,94 @@
+"""
+Alta masiva de categorías.
+
+Valida el lote completo con una consulta (nombres ya existentes, sin
+distinguir mayúsculas), reparte los slugs con otra (ver slugs_unicos) e
+inserta todo con un bulk_create en una transacción. Si el INSERT choca con
+la restricción única (collation de la base o una petición simultánea), se
+reintenta fila por fila y las que chocan vuelven como errores del lote.
+"""
+from django.db import IntegrityError, router, transaction
+from django.db.models.functions import Lower
+
+from .cache_catalogo import invalidar_catalogo
+from .models import Categoria, slugs_unicos
+
+MAXIMO_POR_LOTE = 1000
+LARGO_NOMBRE = Categoria._meta.get_field('nombre').max_length
+
+
+class ErrorCategorias(ValueError):
+    pass
+
+
+def crear_una_por_una(filas, errores, alias):
+    """Inserta cada fila en su propio savepoint; las que chocan se agregan a `errores`."""
+    creadas = []
+    for posicion, nombre in filas:
+        categoria = Categoria(nombre=nombre)  # save() vuelve a elegir el slug
+        try:
+            with transaction.atomic(using=alias):
+                categoria.save(using=alias)
+        except IntegrityError:
+            errores.append((posicion, f'Ya existe una categoría llamada "{nombre}".'))
+        else:
+            creadas.append(categoria)
+    return creadas
+
+
+def crear_categorias(nombres):
+    """
+    Crea las categorías válidas del lote. Devuelve (creadas, errores) con
+    errores como [(posición, mensaje)]; las filas con error no detienen el lote.
+    """
+    if len(nombres) > MAXIMO_POR_LOTE:
+        raise ErrorCategorias(f"El lote supera el máximo de {MAXIMO_POR_LOTE} categorías.")
+
+    errores = []
+    validos = {}  # nombre en minúsculas -> (posición, nombre)
+    for posicion, nombre in enumerate(nombres, start=1):
+        nombre = nombre.strip() if isinstance(nombre, str) else ''
+        if not nombre:
+            errores.append((posicion, "El nombre de la categoría no puede estar vacío."))
+        elif len(nombre) > LARGO_NOMBRE:
+            errores.append((posicion, f"El nombre no puede superar los {LARGO_NOMBRE} caracteres."))
+        elif nombre.lower() in validos:
+            errores.append((posicion, f'"{nombre}" aparece repetida en el lote.'))
+        else:
+            validos[nombre.lower()] = (posicion, nombre)
+
+    alias = router.db_for_write(Categoria)
+    with transaction.atomic(using=alias):
+        existentes = set(
+            Categoria.objects.annotate(nombre_min=Lower('nombre'))
+            .filter(nombre_min__in=list(validos)).values_list('nombre_min', flat=True)
+        )
+        for clave in existentes:
+            # Con una collation que ignora acentos la base puede devolver un nombre que
+            # no es clave del lote; esa fila la rechaza el INSERT más abajo
+            fila = validos.pop(clave, None)
+            if fila is not None:
+                errores.append((fila[0], f'Ya existe una categoría llamada "{fila[1]}".'))
+
+        if not validos:
+            return [], sorted(errores)
+
+        filas = list(validos.values())
+        slugs = slugs_unicos([nombre for _, nombre in filas])
+        nuevas = [Categoria(nombre=nombre, slug=slug) for (_, nombre), slug in zip(filas, slugs)]
+        try:
+            with transaction.atomic(using=alias):
+                Categoria.objects.bulk_create(nuevas)
+        except IntegrityError:
+            # La base iguala nombres que Python distingue, u otra petición creó el mismo
+            # nombre o slug entre la lectura y el INSERT: se reintenta fila por fila
+            nuevas = crear_una_por_una(filas, errores, alias)
+        else:
+            if any(c.pk is None for c in nuevas):
+                # MySQL no devuelve los ids de un INSERT masivo
+                por_slug = dict(Categoria.objects.filter(slug__in=slugs).values_list('slug', 'id'))
+                for c in nuevas:
+                    c.pk = por_slug[c.slug]
+        transaction.on_commit(invalidar_catalogo, using=alias)
+
+    return nuevas, sorted(errores)
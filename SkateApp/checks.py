@@ -0,0 +1,63 @@
+"""
+Revisión al arrancar (system checks): informa la configuración efectiva de la
+base de datos y la caché, y advierte combinaciones que penalizan la latencia.
+Se ejecuta con runserver, migrate y `python manage.py check`.
+"""
+from django.conf import settings
+from django.core import checks
+
+
+def describir_configuracion():
+    db = settings.DATABASES['default']
+    pool = db.get('OPTIONS', {}).get('pool')
+    return (
+        f"entorno={getattr(settings, 'ENTORNO', '?')} "
+        f"motor={db['ENGINE'].rsplit('.', 1)[-1]} "
+        f"CONN_MAX_AGE={db.get('CONN_MAX_AGE', 0)} "
+        f"CONN_HEALTH_CHECKS={db.get('CONN_HEALTH_CHECKS', False)} "
+        f"pool={'sí' if pool else 'no'} "
+        f"replicas={len(getattr(settings, 'BASES_REPLICA', []))} "
+        f"cache={settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]} "
+        f"DEBUG={settings.DEBUG}"
+    )
+
+
+@checks.register('configuracion')
+def revisar_configuracion(app_configs=None, **kwargs):
+    mensajes = [checks.Info(describir_configuracion(), id='SkateApp.I001')]
+    if getattr(settings, 'ENTORNO', None) != 'prod':
+        return mensajes
+
+    if settings.SECRET_KEY.startswith('django-insecure-'):
+        mensajes.append(checks.Error(
+            "SECRET_KEY es la clave de desarrollo publicada en el repositorio.",
+            hint="Define DJANGO_SECRET_KEY con una clave propia.",
+            id='SkateApp.E001',
+        ))
+
+    db = settings.DATABASES['default']
+    if not db.get('CONN_MAX_AGE') and not db.get('OPTIONS', {}).get('pool'):
+        mensajes.append(checks.Warning(
+            "CONN_MAX_AGE=0 sin pool: cada petición abre y autentica una conexión nueva.",
+            hint="Define DB_CONN_MAX_AGE (segundos) o DB_POOL=1 con PostgreSQL.",
+            id='SkateApp.W001',
+        ))
+    if db.get('CONN_MAX_AGE') and not db.get('CONN_HEALTH_CHECKS'):
+        mensajes.append(checks.Warning(
+            "Conexiones persistentes sin CONN_HEALTH_CHECKS: una conexión cortada falla en la primera consulta.",
+            id='SkateApp.W002',
+        ))
+    if getattr(settings, 'DB_POOL', False) and not db.get('OPTIONS', {}).get('pool'):
+        mensajes.append(checks.Warning(
+            "DB_POOL solo está disponible con PostgreSQL; en MySQL se usan conexiones persistentes.",
+            id='SkateApp.W003',
+        ))
+    if 'locmem' in settings.CACHES['default']['BACKEND'].lower():
+        mensajes.append(checks.Warning(
+            "Caché local por proceso: sesiones y límites de login no se comparten entre workers.",
+            hint="Define REDIS_URL.",
+            id='SkateApp.W004',
+        ))
+    if settings.DEBUG:
+        mensajes.append(checks.Warning("DEBUG está activo en producción.", id='SkateApp.W005'))
+    return mensajes
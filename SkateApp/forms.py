@@ -226,12 +226,11 @@ class CategoriaForm(forms.ModelForm):
         nombre = nombre.strip()
         if not nombre:
             raise ValidationError("El nombre de la categoría no puede estar vacío.")
+        # Los duplicados (sin distinguir mayúsculas) los detecta la restricción única del modelo
+        return nombre
 
-        qs = Categoria.objects.filter(nombre__iexact=nombre)
-        if self.instance.pk:
-            qs = qs.exclude(pk=self.instance.pk)
-
-        if qs.exists():
-            raise ValidationError("Esta categoría ya existe.")
+class ImportarCatalogoForm(forms.Form):
+    FORMATOS = [('', 'Detectar por extensión'), ('csv', 'CSV'), ('jsonl', 'JSONL')]
 
-        return nombre
+    archivo = forms.FileField(help_text="Columnas: id (opcional), nombre, precio, stock, descripcion, categorias (separadas por |)")
+    formato = forms.ChoiceField(choices=FORMATOS, required=False)
@@ -0,0 +1,45 @@
+import base64
+import io
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageFilter
+
+# Lado máximo (px) de la vista previa difuminada que se guarda en el modelo.
+TAMANO_PLACEHOLDER = 20
+# Lado máximo (px) de la miniatura usada en tablas y listados.
+TAMANO_MINIATURA = 150
+
+
+def generar_vista_previa(archivo, tamano=TAMANO_PLACEHOLDER):
+    """
+    Lee la imagen una sola vez y devuelve (ancho, alto, data_uri).
+    El data_uri es un JPEG diminuto y difuminado listo para incrustar
+    en el HTML mientras carga la imagen real.
+    """
+    archivo.seek(0)
+    with Image.open(archivo) as img:
+        ancho, alto = img.size
+        previa = img.convert("RGB")
+        previa.thumbnail((tamano, tamano))
+        previa = previa.filter(ImageFilter.GaussianBlur(1))
+
+        buffer = io.BytesIO()
+        previa.save(buffer, format="JPEG", quality=40)
+    archivo.seek(0)
+
+    data_uri = "data:image/jpeg;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+    return ancho, alto, data_uri
+
+
+def generar_miniatura(archivo, tamano=TAMANO_MINIATURA):
+    """Devuelve un ContentFile JPEG con la imagen reducida a `tamano` px de lado."""
+    archivo.seek(0)
+    with Image.open(archivo) as img:
+        miniatura = img.convert("RGB")
+        miniatura.thumbnail((tamano, tamano))
+
+        buffer = io.BytesIO()
+        miniatura.save(buffer, format="JPEG", quality=80)
+    archivo.seek(0)
+
+    return ContentFile(buffer.getvalue())
@@ -0,0 +1,162 @@
+"""
+Instantánea del catálogo en JSON para filtrar en el navegador.
+
+catalogo.html descarga /catalogo/instantanea/<versión>.json (id, nombre,
+descripción, precio, stock, categorías, calificación y miniatura de cada
+producto) y con ella filtra por categoría, busca (en nombre y descripción, como
+la vista catalogo) y ordena sin volver al servidor. El archivo
+lleva la versión del catálogo (cache_catalogo.py) en el nombre, así que se
+sirve como inmutable y el servidor solo trabaja cuando la versión cambia.
+
+Se escribe en INSTANTANEA_DIRECTORIO ya comprimido: .json.gz y, si el paquete
+opcional brotli está instalado, .json.br. invalidar_catalogo() pide una nueva
+con programar_instantanea(), que la genera en un hilo aparte; si el navegador
+la pide antes de que esté lista, la vista la genera en el momento.
+"""
+import glob
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Avg, Count
+
+from .cache_catalogo import version_catalogo
+from .models import Categoria, Producto
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él se sirve solo gzip
+    brotli = None
+
+logger = logging.getLogger('skateshop.instantanea')
+
+VERSIONES_GUARDADAS = 3  # Las páginas en caché pueden apuntar a una versión anterior
+ARCHIVO = re.compile(r'catalogo-(\d+)\.json')
+
+_candado = threading.Lock()
+_hilo = None
+_pendiente = False
+
+
+def _url(campo, nombre):
+    return Producto._meta.get_field(campo).storage.url(nombre) if nombre else None
+
+
+def datos_catalogo(version):
+    categorias = list(Categoria.objects.order_by('nombre').values_list('id', 'slug', 'nombre'))
+    slug_por_id = {id_: slug for id_, slug, _ in categorias}
+    por_producto = defaultdict(list)
+    for producto_id, categoria_id in Producto.categorias.through.objects.values_list('producto_id', 'categoria_id'):
+        por_producto[producto_id].append(slug_por_id[categoria_id])
+
+    productos = Producto.objects.order_by('nombre').annotate(
+        calificacion=Avg('reseñas__calificacion'), resenas=Count('reseñas'),
+    ).values(
+        'id', 'nombre', 'descripcion', 'precio', 'stock', 'imagen', 'imagen_miniatura', 'calificacion', 'resenas',
+    )
+
+    return {
+        'version': version,
+        'categorias': [{'slug': slug, 'nombre': nombre} for _, slug, nombre in categorias],
+        'productos': [
+            {
+                'id': p['id'],
+                'nombre': p['nombre'],
+                'descripcion': p['descripcion'],
+                'precio': float(p['precio']),
+                'en_stock': p['stock'] > 0,
+                'categorias': por_producto.get(p['id'], []),
+                'calificacion': round(p['calificacion'], 1) if p['calificacion'] is not None else None,
+                'resenas': p['resenas'],
+                'miniatura': _url('imagen_miniatura', p['imagen_miniatura']) or _url('imagen', p['imagen']),
+            }
+            for p in productos
+        ],
+    }
+
+
+def ruta_instantanea(version):
+    return os.path.join(settings.INSTANTANEA_DIRECTORIO, f'catalogo-{version}.json')
+
+
+def _escribir(ruta, contenido):
+    temporal = f'{ruta}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(temporal, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def _limpiar(directorio):
+    versiones = defaultdict(list)
+    for ruta in glob.glob(os.path.join(directorio, 'catalogo-*.json*')):
+        coincidencia = ARCHIVO.match(os.path.basename(ruta))
+        if coincidencia:
+            versiones[int(coincidencia.group(1))].append(ruta)
+    for version in sorted(versiones)[:-VERSIONES_GUARDADAS]:
+        for ruta in versiones[version]:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
+
+
+def generar_instantanea():
+    """Escribe la instantánea de la versión actual si aún no existe. Devuelve la versión."""
+    # La versión se lee antes que los datos: el archivo nunca queda más viejo que su nombre
+    version = version_catalogo()
+    ruta = ruta_instantanea(version)
+    if os.path.exists(ruta):
+        return version
+
+    contenido = json.dumps(datos_catalogo(version), ensure_ascii=False, separators=(',', ':')).encode()
+    os.makedirs(settings.INSTANTANEA_DIRECTORIO, exist_ok=True)
+    _escribir(ruta + '.gz', gzip.compress(contenido, compresslevel=9, mtime=0))
+    if brotli is not None:
+        _escribir(ruta + '.br', brotli.compress(contenido, quality=11))
+    # El .json va al final: si existe, las versiones comprimidas también
+    _escribir(ruta, contenido)
+    _limpiar(settings.INSTANTANEA_DIRECTORIO)
+    return version
+
+
+def _trabajar():
+    global _hilo, _pendiente
+    try:
+        while True:
+            with _candado:
+                if not _pendiente:
+                    _hilo = None
+                    return
+                _pendiente = False
+            try:
+                generar_instantanea()
+            except Exception:
+                logger.exception("No se pudo generar la instantánea del catálogo")
+    finally:
+        connection.close()
+
+
+def programar_instantanea():
+    """Genera la instantánea en segundo plano (un solo hilo por proceso; los pedidos se acumulan)."""
+    global _hilo, _pendiente
+    if not getattr(settings, 'INSTANTANEA_DIRECTORIO', None):
+        return
+    with _candado:
+        _pendiente = True
+        if _hilo is None:
+            _hilo = threading.Thread(target=_trabajar, name='instantanea-catalogo', daemon=True)
+            _hilo.start()
+
+
+def archivo_para(ruta, aceptadas):
+    """(ruta, Content-Encoding) de la mejor variante que acepta el cliente."""
+    for codificacion, extension in (('br', '.br'), ('gzip', '.gz')):
+        if codificacion in aceptadas and os.path.exists(ruta + extension):
+            return ruta + extension, codificacion
+    return ruta, None
@@ -0,0 +1,88 @@
+"""
+Límite de intentos de inicio de sesión con contadores por ventana en la caché.
+
+Cada límite admite `capacidad` intentos por ventana; la ventana dura lo que
+tarda en recargarse la capacidad al ritmo configurado (capacidad / por_minuto),
+así que el promedio es el mismo que el de un balde de tokens. El contador se
+crea con cache.add y se suma con cache.incr, ambos atómicos en Redis: una
+ráfaga concurrente no consigue más intentos de los permitidos. En el borde
+entre dos ventanas puede admitir hasta el doble de la capacidad.
+
+La IP del cliente sale de REMOTE_ADDR o, detrás del proxy inverso, de la
+cabecera IP_CABECERA (p. ej. X-Forwarded-For) contando IP_PROXIES_CONFIABLES
+saltos desde la derecha: las entradas más a la izquierda las escribe el
+cliente y no sirven para identificarlo.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+class LimiteIntentos:
+    def __init__(self, prefijo, capacidad, por_minuto):
+        self.prefijo = prefijo
+        self.capacidad = capacidad
+        self.ventana = max(1, math.ceil(capacidad * 60 / por_minuto))
+
+    def _clave(self, identificador, ventana):
+        resumen = hashlib.sha256(str(identificador).encode()).hexdigest()[:32]
+        return f"limite:{self.prefijo}:{resumen}:{ventana}"
+
+    def consumir(self, identificador, ahora=None):
+        """Gasta un intento. Devuelve (permitido, segundos hasta la próxima ventana)."""
+        ahora = time.time() if ahora is None else ahora
+        ventana = int(ahora // self.ventana)
+        clave = self._clave(identificador, ventana)
+        cache.add(clave, 0, self.ventana + 1)
+        try:
+            intentos = cache.incr(clave)
+        except ValueError:
+            # La clave venció entre add e incr: empieza de nuevo
+            cache.add(clave, 1, self.ventana + 1)
+            intentos = 1
+
+        if intentos > self.capacidad:
+            return False, max(1, math.ceil((ventana + 1) * self.ventana - ahora))
+        return True, 0
+
+    def reiniciar(self, identificador, ahora=None):
+        ahora = time.time() if ahora is None else ahora
+        cache.delete(self._clave(identificador, int(ahora // self.ventana)))
+
+
+# (capacidad, intentos recargados por minuto); se pueden ajustar en settings
+LIMITE_IP = getattr(settings, 'LIMITE_LOGIN_IP', (20, 10))
+LIMITE_USUARIO = getattr(settings, 'LIMITE_LOGIN_USUARIO', (5, 1))
+
+limite_ip = LimiteIntentos('login-ip', *LIMITE_IP)
+limite_usuario = LimiteIntentos('login-usuario', *LIMITE_USUARIO)
+
+
+def ip_cliente(request):
+    """IP del cliente según REMOTE_ADDR o la cabecera del proxy de confianza."""
+    cabecera = getattr(settings, 'IP_CABECERA', '')
+    if cabecera:
+        saltos = getattr(settings, 'IP_PROXIES_CONFIABLES', 1)
+        direcciones = [d.strip() for d in request.headers.get(cabecera, '').split(',') if d.strip()]
+        if len(direcciones) >= saltos:
+            return direcciones[-saltos]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def permitir_intento_login(request, username):
+    """
+    Consume un intento por IP y por nombre de usuario. Devuelve los segundos
+    de espera si alguno de los dos límites se agotó, o 0 si se permite.
+    """
+    permitido, espera = limite_ip.consumir(ip_cliente(request))
+    if not permitido:
+        return espera
+    permitido, espera = limite_usuario.consumir((username or '').strip().lower())
+    return 0 if permitido else espera
+
+
+def login_exitoso(username):
+    limite_usuario.reiniciar((username or '').strip().lower())
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from SkateApp.archivo import TAMANO_LOTE, archivables, archivar_pedidos, restar_meses
+
+
+class Command(BaseCommand):
+    help = "Mueve los pedidos entregados con más de N meses a la tabla de pedidos archivados, por lotes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--meses', type=int, default=12, help="Antigüedad mínima de los pedidos a archivar.")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Pedidos movidos por transacción.")
+        parser.add_argument('--pausa', type=float, default=0.05, help="Segundos de espera entre lotes.")
+        parser.add_argument('--simular', action='store_true', help="Solo cuenta los pedidos que se archivarían.")
+
+    def handle(self, *args, **options):
+        if options['meses'] < 1:
+            raise CommandError("--meses debe ser al menos 1.")
+        antes_de = restar_meses(timezone.now(), options['meses'])
+
+        if options['simular']:
+            self.stdout.write(f"Pedidos archivables anteriores a {antes_de:%Y-%m-%d}: {archivables(antes_de).count()}.")
+            return
+
+        def al_avanzar(total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{total} pedidos archivados...")
+
+        total = archivar_pedidos(antes_de, options['lote'], options['pausa'], al_avanzar)
+        self.stdout.write(self.style.SUCCESS(f"Pedidos archivados: {total}."))
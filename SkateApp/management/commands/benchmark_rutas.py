@@ -0,0 +1,160 @@
+import json
+import statistics
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from AppSkate import metricas
+from AppSkate.medicion import Medicion
+from SkateApp import urls as urls_skateapp
+from SkateApp.models import Categoria, Pedido, Post, Producto, Usuario
+
+ROLES = ('anonimo', 'cliente', 'superusuario')
+
+# Las de Webpay llaman a Transbank; cerrar_sesion desloguearía al cliente de medición
+EXCLUIDAS = {'iniciar_pago_webpay', 'confirmar_pago_webpay', 'cerrar_sesion'}
+
+
+def percentil(valores, p):
+    if len(valores) == 1:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method='inclusive')[p - 1]
+
+
+def comparar(actual, base, umbral_latencia, minimo_ms, umbral_consultas, umbral_bytes):
+    """Devuelve [(clave, mensaje)] con las regresiones de `actual` respecto de `base`."""
+    regresiones = []
+    for clave, r in actual.items():
+        b = base.get(clave)
+        if b is None:
+            continue
+        if r['p95_ms'] - b['p95_ms'] > max(minimo_ms, b['p95_ms'] * umbral_latencia):
+            regresiones.append((clave, f"p95 {b['p95_ms']:.1f} → {r['p95_ms']:.1f} ms"))
+        if r['consultas'] > b['consultas'] + umbral_consultas:
+            regresiones.append((clave, f"consultas {b['consultas']} → {r['consultas']}"))
+        if b['bytes'] and (r['bytes'] - b['bytes']) / b['bytes'] > umbral_bytes:
+            regresiones.append((clave, f"bytes {b['bytes']} → {r['bytes']}"))
+    return regresiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cada ruta de SkateApp en proceso con el cliente de pruebas contra la base de datos "
+        "configurada (idealmente poblada con seed_skateshop): p50/p95/p99, consultas, bytes y "
+        "desglose SQL/plantilla/vista. Opcionalmente compara contra una línea base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=30)
+        parser.add_argument('--calentamiento', type=int, default=3, help="Peticiones descartadas por ruta.")
+        parser.add_argument('--rutas', nargs='+', help="Solo estas rutas (por nombre).")
+        parser.add_argument('--roles', nargs='+', choices=ROLES, default=list(ROLES))
+        parser.add_argument('--salida', help="Archivo JSON donde guardar los resultados.")
+        parser.add_argument('--base', help="Resultados JSON previos contra los que comparar.")
+        parser.add_argument('--umbral-latencia', type=float, default=0.20, help="Aumento relativo de p95 tolerado.")
+        parser.add_argument('--minimo-ms', type=float, default=2.0, help="Aumento absoluto de p95 que se ignora (ruido).")
+        parser.add_argument('--umbral-consultas', type=int, default=0, help="Consultas extra toleradas.")
+        parser.add_argument('--umbral-bytes', type=float, default=0.10, help="Aumento relativo de bytes tolerado.")
+
+    def preparar(self, roles):
+        producto = (
+            Producto.objects.annotate(n=Count('reseñas')).order_by('-n', 'id').first()
+        )
+        # El cliente con más pedidos: el peor caso de panel_usuario
+        cliente = (
+            Usuario.objects.filter(is_superuser=False).annotate(n=Count('pedidos')).order_by('-n', 'id').first()
+        )
+        admin = Usuario.objects.filter(is_superuser=True).order_by('id').first()
+        categoria = Categoria.objects.exclude(slug=None).order_by('id').first()
+        pedido = Pedido.objects.filter(usuario=cliente).order_by('-fecha').first() if cliente else None
+        post = Post.objects.order_by('-fecha').first()
+        if not all([producto, cliente, categoria, pedido, post]):
+            raise CommandError("La base de datos está casi vacía: ejecuta antes seed_skateshop.")
+
+        self.argumentos = {
+            'producto_id': producto.id, 'categoria_slug': categoria.slug, 'categoria_id': categoria.id,
+            'pedido_id': pedido.id, 'post_id': post.id, 'user_id': cliente.id,
+        }
+        usuarios = {'anonimo': None, 'cliente': cliente, 'superusuario': admin}
+        clientes = {}
+        for rol in roles:
+            if rol == 'superusuario' and admin is None:
+                self.stderr.write("No hay superusuario: se omite ese rol.")
+                continue
+            clientes[rol] = Client()
+            if usuarios[rol]:
+                clientes[rol].force_login(usuarios[rol])
+        return clientes
+
+    def medir(self, cliente, url, repeticiones, calentamiento):
+        for _ in range(calentamiento):
+            cliente.get(url)
+        muestras = []
+        for _ in range(repeticiones):
+            with Medicion() as m:
+                response = cliente.get(url)
+                tamano = len(response.content) if not response.streaming else sum(map(len, response.streaming_content))
+            muestras.append((m, response.status_code, tamano))
+
+        totales = [m.total_ms for m, _, _ in muestras]
+        return {
+            'estado': muestras[-1][1],
+            'p50_ms': round(percentil(totales, 50), 3),
+            'p95_ms': round(percentil(totales, 95), 3),
+            'p99_ms': round(percentil(totales, 99), 3),
+            'sql_ms': round(statistics.median(m.sql_ms for m, _, _ in muestras), 3),
+            'plantilla_ms': round(statistics.median(m.plantilla_ms for m, _, _ in muestras), 3),
+            'vista_ms': round(statistics.median(m.vista_ms for m, _, _ in muestras), 3),
+            'consultas': max(m.consultas for m, _, _ in muestras),
+            'bytes': muestras[-1][2],
+        }
+
+    def handle(self, *args, **o):
+        if o['repeticiones'] < 1:
+            raise CommandError("--repeticiones debe ser al menos 1.")
+        try:
+            setup_test_environment()  # ALLOWED_HOSTS de prueba y correo en memoria
+        except RuntimeError:
+            pass  # ya preparado (p. ej. dentro de la suite de tests)
+        clientes = self.preparar(o['roles'])
+
+        resultados = {}
+        self.stdout.write(f"{'ruta@rol':<40} {'estado':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'sql':>7} {'plant.':>7} {'vista':>7} {'cons.':>5} {'bytes':>8}")
+        for patron in urls_skateapp.urlpatterns:
+            if patron.name in EXCLUIDAS or (o['rutas'] and patron.name not in o['rutas']):
+                continue
+            url = reverse(f'SkateApp:{patron.name}', kwargs={k: self.argumentos[k] for k in patron.pattern.converters})
+            for rol, cliente in clientes.items():
+                clave = f"{patron.name}@{rol}"
+                # Las mediciones no son tráfico: no se cuentan en /metrics
+                with metricas.registro.pausado():
+                    r = resultados[clave] = self.medir(cliente, url, o['repeticiones'], o['calentamiento'])
+                self.stdout.write(
+                    f"{clave:<40} {r['estado']:>6} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} "
+                    f"{r['sql_ms']:>7.2f} {r['plantilla_ms']:>7.2f} {r['vista_ms']:>7.2f} {r['consultas']:>5} {r['bytes']:>8}"
+                )
+
+        if o['salida']:
+            with open(o['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'fecha': timezone.now().isoformat(),
+                    'repeticiones': o['repeticiones'],
+                    'resultados': resultados,
+                }, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f"Resultados guardados en {o['salida']}")
+
+        if o['base']:
+            with open(o['base'], encoding='utf-8') as archivo:
+                base = json.load(archivo)['resultados']
+            regresiones = comparar(
+                resultados, base, o['umbral_latencia'], o['minimo_ms'], o['umbral_consultas'], o['umbral_bytes'],
+            )
+            for clave, mensaje in regresiones:
+                self.stdout.write(self.style.ERROR(f"REGRESIÓN {clave}: {mensaje}"))
+            if regresiones:
+                raise CommandError(f"{len(regresiones)} regresiones respecto de {o['base']}.")
+            self.stdout.write(self.style.SUCCESS("Sin regresiones respecto de la línea base."))
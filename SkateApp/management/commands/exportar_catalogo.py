@@ -0,0 +1,23 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from SkateApp.catalogo_io import FORMATOS, TAMANO_LOTE, exportar_catalogo
+
+
+class Command(BaseCommand):
+    help = "Exporta el catálogo completo en CSV o JSONL sin cargarlo entero en memoria."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS, default='csv')
+        parser.add_argument('--salida', help="Ruta del archivo de salida (por defecto la salida estándar).")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Productos leídos por consulta.")
+
+    def handle(self, *args, **options):
+        salida = open(options['salida'], 'w', encoding='utf-8', newline='') if options['salida'] else sys.stdout
+        try:
+            for linea in exportar_catalogo(options['formato'], tamano_lote=options['lote']):
+                salida.write(linea)
+        finally:
+            if salida is not sys.stdout:
+                salida.close()
@@ -0,0 +1,30 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from SkateApp.models import Pedido
+from SkateApp.pedidos_io import FORMATOS, TAMANO_LOTE, exportar_pedidos, filtrar_pedidos
+
+
+class Command(BaseCommand):
+    help = "Exporta pedidos con su detalle y dirección de envío en CSV o JSONL, por bloques."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=FORMATOS, default='csv')
+        parser.add_argument('--desde', type=date.fromisoformat, help="Fecha inicial incluida (AAAA-MM-DD).")
+        parser.add_argument('--hasta', type=date.fromisoformat, help="Fecha final incluida (AAAA-MM-DD).")
+        parser.add_argument('--estado', action='append', choices=[e for e, _ in Pedido.ESTADOS],
+                            help="Puede repetirse. Por defecto, todos los estados.")
+        parser.add_argument('--salida', help="Ruta del archivo de salida (por defecto la salida estándar).")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Pedidos leídos por consulta.")
+
+    def handle(self, *args, **options):
+        pedidos = filtrar_pedidos(options['desde'], options['hasta'], options['estado'])
+        salida = open(options['salida'], 'w', encoding='utf-8', newline='') if options['salida'] else sys.stdout
+        try:
+            for linea in exportar_pedidos(pedidos, options['formato'], tamano_lote=options['lote']):
+                salida.write(linea)
+        finally:
+            if salida is not sys.stdout:
+                salida.close()
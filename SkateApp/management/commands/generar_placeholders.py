@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from SkateApp.models import Producto
+
+
+class Command(BaseCommand):
+    help = "Calcula dimensiones, vista previa difuminada y miniatura de los productos que aún no las tienen."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--todos', action='store_true', help="Recalcula también los productos que ya tienen vista previa.")
+
+    def handle(self, *args, **options):
+        productos = Producto.objects.exclude(imagen='').exclude(imagen__isnull=True)
+        if not options['todos']:
+            productos = productos.filter(Q(imagen_placeholder='') | Q(imagen_miniatura='') | Q(imagen_miniatura__isnull=True))
+
+        procesados = 0
+        errores = 0
+        for producto in productos.only('id', 'imagen').iterator(chunk_size=500):
+            try:
+                producto.actualizar_vista_previa()
+            except (OSError, ValueError) as e:
+                errores += 1
+                self.stderr.write(f"Producto #{producto.id}: {e}")
+                continue
+            producto.save(update_fields=['imagen_ancho', 'imagen_alto', 'imagen_placeholder', 'imagen_miniatura'])
+            procesados += 1
+
+        self.stdout.write(self.style.SUCCESS(f"{procesados} productos actualizados, {errores} con errores."))
@@ -0,0 +1,43 @@
+import sys
+from contextlib import nullcontext
+
+from django.core.management.base import BaseCommand, CommandError
+
+from SkateApp.catalogo_io import FORMATOS, TAMANO_LOTE, detectar_formato, importar_catalogo, leer_filas
+
+
+class Command(BaseCommand):
+    help = "Importa productos desde un archivo CSV o JSONL (crea o actualiza por id o nombre)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help="Ruta del archivo, o '-' para leer de la entrada estándar.")
+        parser.add_argument('--formato', choices=FORMATOS, help="Por defecto se deduce de la extensión.")
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Filas por transacción.")
+        parser.add_argument('--errores', help="Ruta donde guardar el reporte de errores en CSV.")
+
+    def handle(self, *args, **options):
+        ruta = options['archivo']
+        formato = options['formato'] or detectar_formato(ruta)
+
+        try:
+            # La entrada estándar no es nuestra: nullcontext evita cerrarla al terminar
+            archivo = nullcontext(sys.stdin) if ruta == '-' else open(ruta, encoding='utf-8-sig', newline='')
+        except OSError as e:
+            raise CommandError(f"No se pudo abrir {ruta}: {e}")
+
+        with archivo as entrada:
+            resultado = importar_catalogo(leer_filas(entrada, formato), tamano_lote=options['lote'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado.creados} productos creados, {resultado.actualizados} actualizados, "
+            f"{len(resultado.errores)} filas con errores."
+        ))
+
+        if resultado.errores:
+            if options['errores']:
+                with open(options['errores'], 'w', encoding='utf-8', newline='') as reporte:
+                    resultado.escribir_reporte(reporte)
+                self.stdout.write(f"Reporte de errores guardado en {options['errores']}")
+            else:
+                for linea, mensaje in resultado.errores:
+                    self.stderr.write(f"Línea {linea}: {mensaje}")
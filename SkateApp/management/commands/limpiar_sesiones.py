@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from SkateApp.sesiones import TAMANO_LOTE, borrar_expiradas
+
+
+class Command(BaseCommand):
+    help = "Elimina las sesiones vencidas de la base de datos en bloques acotados."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=TAMANO_LOTE, help="Sesiones borradas por DELETE.")
+        parser.add_argument('--pausa', type=float, default=0.05, help="Segundos de espera entre bloques.")
+
+    def handle(self, *args, **options):
+        def al_avanzar(total):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{total} sesiones eliminadas...")
+
+        total = borrar_expiradas(options['lote'], options['pausa'], al_avanzar)
+        self.stdout.write(self.style.SUCCESS(f"Sesiones vencidas eliminadas: {total}."))
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, get_hasher
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el costo de CPU de verificar una contraseña (lo que cuesta cada intento de login) "
+        "y sugiere iteraciones de PBKDF2 según un presupuesto de latencia."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=10, help="Verificaciones medidas por hasher.")
+        parser.add_argument('--iteraciones', type=int, action='append',
+                            help="Probar PBKDF2 con estas iteraciones (puede repetirse).")
+        parser.add_argument('--presupuesto-ms', type=float,
+                            help="Milisegundos de CPU por login aceptables.")
+
+    def medir(self, hasher, repeticiones):
+        """Mediana de milisegundos de CPU de hasher.verify()."""
+        codificado = hasher.encode('contraseña-de-prueba', hasher.salt())
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.process_time()
+            hasher.verify('contraseña-de-prueba', codificado)
+            tiempos.append((time.process_time() - inicio) * 1000)
+        return statistics.median(tiempos)
+
+    def reportar(self, etiqueta, ms):
+        por_nucleo = 1000 / ms if ms else float('inf')
+        self.stdout.write(f"{etiqueta:<40} {ms:8.1f} ms/login  {por_nucleo:8.1f} logins/s por núcleo")
+
+    def handle(self, *args, **options):
+        repeticiones = options['repeticiones']
+        if repeticiones < 1:
+            raise CommandError("--repeticiones debe ser al menos 1.")
+
+        # El primero de PASSWORD_HASHERS: el que verifica las contraseñas nuevas
+        predeterminado = get_hasher('default')
+        self.reportar(f"{predeterminado.algorithm} (predeterminado)", self.medir(predeterminado, repeticiones))
+
+        referencia = PBKDF2PasswordHasher()
+        ms_referencia = self.medir(referencia, repeticiones)
+        for iteraciones in options['iteraciones'] or []:
+            hasher = PBKDF2PasswordHasher()
+            hasher.iterations = iteraciones
+            self.reportar(f"pbkdf2_sha256 ({iteraciones} iteraciones)", self.medir(hasher, repeticiones))
+
+        if options['presupuesto_ms']:
+            # El costo de PBKDF2 crece linealmente con las iteraciones
+            sugeridas = int(referencia.iterations * options['presupuesto_ms'] / ms_referencia)
+            self.stdout.write(self.style.SUCCESS(
+                f"Con {options['presupuesto_ms']:g} ms por login: ~{sugeridas} iteraciones de PBKDF2 "
+                f"(Django usa {referencia.iterations})."
+            ))
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from SkateApp.models import Pedido, PedidoHistorico
+from SkateApp.resumenes import recalcular_historial
+
+
+class Command(BaseCommand):
+    help = "Reconstruye los resúmenes de ventas recorriendo el historial de pedidos por bloques de días."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help="Fecha inicial (AAAA-MM-DD). Por defecto, el primer pedido.")
+        parser.add_argument('--hasta', type=date.fromisoformat, help="Fecha final incluida (AAAA-MM-DD). Por defecto, hoy.")
+        parser.add_argument('--dias-por-bloque', type=int, default=7, help="Días por transacción.")
+        parser.add_argument('--lectura', type=int, default=2000, help="Pedidos leídos por consulta.")
+
+    def handle(self, *args, **options):
+        desde = options['desde']
+        if desde is None:
+            fechas = [
+                modelo.objects.order_by('fecha').values_list('fecha', flat=True).first()
+                for modelo in (Pedido, PedidoHistorico)
+            ]
+            primero = min(filter(None, fechas), default=None)
+            if primero is None:
+                self.stdout.write("No hay pedidos.")
+                return
+            desde = timezone.localtime(primero).date()
+        hasta = (options['hasta'] or timezone.localdate()) + timedelta(days=1)
+        if desde >= hasta:
+            raise CommandError("--desde debe ser anterior a --hasta.")
+
+        def al_avanzar(inicio, fin, procesados):
+            self.stdout.write(f"{inicio} → {fin - timedelta(days=1)}: {procesados} pedidos")
+
+        total = recalcular_historial(
+            desde, hasta,
+            dias_por_bloque=options['dias_por_bloque'],
+            tamano_lectura=options['lectura'],
+            al_avanzar=al_avanzar,
+        )
+        self.stdout.write(self.style.SUCCESS(f"Resúmenes recalculados: {total} pedidos."))
@@ -0,0 +1,45 @@
+import glob
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Agrega los perfiles cProfile guardados por MedicionMiddleware (PERFIL_DIRECTORIO) "
+        "y muestra las funciones más costosas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directorio', default=getattr(settings, 'PERFIL_DIRECTORIO', None))
+        parser.add_argument('--ruta', help="Solo perfiles de esta ruta (p. ej. SkateApp:comunidad).")
+        parser.add_argument('--ordenar', choices=['cumulative', 'tottime', 'ncalls'], default='cumulative')
+        parser.add_argument('--limite', type=int, default=30, help="Funciones a mostrar.")
+        parser.add_argument('--filtro', default='', help="Regex sobre archivo/función (p. ej. SkateApp).")
+        parser.add_argument('--borrar', action='store_true', help="Elimina los perfiles después del reporte.")
+
+    def handle(self, *args, **o):
+        if not o['directorio']:
+            raise CommandError("Define PERFIL_DIRECTORIO o usa --directorio.")
+        patron = (o['ruta'].replace(':', '_') if o['ruta'] else '*') + '--*.prof'
+        archivos = sorted(glob.glob(os.path.join(o['directorio'], patron)))
+        if not archivos:
+            self.stdout.write("No hay perfiles que agregar.")
+            return
+
+        por_ruta = {}
+        for archivo in archivos:
+            ruta = os.path.basename(archivo).split('--')[0]
+            por_ruta[ruta] = por_ruta.get(ruta, 0) + 1
+        self.stdout.write(f"{len(archivos)} perfiles: " + ', '.join(f"{r} ({n})" for r, n in sorted(por_ruta.items())))
+
+        estadisticas = pstats.Stats(*archivos, stream=self.stdout)
+        estadisticas.strip_dirs().sort_stats(o['ordenar'])
+        restricciones = [o['filtro'], o['limite']] if o['filtro'] else [o['limite']]
+        estadisticas.print_stats(*restricciones)
+
+        if o['borrar']:
+            for archivo in archivos:
+                os.remove(archivo)
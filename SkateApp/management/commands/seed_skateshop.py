@@ -0,0 +1,294 @@
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from SkateApp.models import (
+    Categoria, Comentario, DetallePedido, Direccion, Pedido, Post, Producto, Reseña, Usuario,
+)
+
+COMUNAS = [
+    ('Santiago', 'Metropolitana'), ('Providencia', 'Metropolitana'), ('Ñuñoa', 'Metropolitana'),
+    ('Maipú', 'Metropolitana'), ('Puente Alto', 'Metropolitana'), ('Viña del Mar', 'Valparaíso'),
+    ('Valparaíso', 'Valparaíso'), ('Concepción', 'Biobío'), ('Temuco', 'Araucanía'), ('Antofagasta', 'Antofagasta'),
+]
+NOMBRES = ['Camila', 'Matías', 'Valentina', 'Benjamín', 'Sofía', 'Vicente', 'Isidora', 'Martín', 'Antonia', 'Tomás']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda']
+TIPOS_PRODUCTO = ['Tabla', 'Truck', 'Rueda', 'Rodamiento', 'Lija', 'Zapatilla', 'Polera', 'Gorro', 'Casco', 'Rodillera']
+MARCAS = ['Element', 'Baker', 'Santa Cruz', 'Independent', 'Spitfire', 'Bones', 'Thrasher', 'Vans', 'Girl', 'Palace']
+MAXIMO_FALLOS_RESENAS = 1000  # Sorteos seguidos de pares ya usados antes de recorrerlos en orden
+
+
+class Sesgado:
+    """Elige índices 0..n-1 con probabilidad ~ 1/(rango+1)^s (Zipf): pocos muy populares, cola larga."""
+
+    def __init__(self, rng, n, s=1.0):
+        self.rng = rng
+        self.n = n
+        self.acumulados = list(accumulate(1 / (i + 1) ** s for i in range(n)))
+
+    def elegir(self, k=1):
+        return self.rng.choices(range(self.n), cum_weights=self.acumulados, k=k)
+
+    def distintos(self, k):
+        """k índices distintos (k ≤ n)."""
+        elegidos = set()
+        while len(elegidos) < k:
+            elegidos.update(self.elegir(k - len(elegidos)))
+        return list(elegidos)
+
+
+@contextmanager
+def sin_auto_now_add(*modelos):
+    """Permite fijar las fechas al insertar (bulk_create respeta auto_now_add)."""
+    campos = [c for m in modelos for c in m._meta.concrete_fields if getattr(c, 'auto_now_add', False)]
+    for campo in campos:
+        campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo in campos:
+            campo.auto_now_add = True
+
+
+def insertar(modelo, objetos):
+    """bulk_create que deja el pk en cada objeto también en MySQL (que no devuelve los ids)."""
+    ultimo = modelo.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    modelo.objects.bulk_create(objetos)
+    if objetos and objetos[0].pk is None:
+        ids = modelo.objects.filter(pk__gt=ultimo).order_by('pk').values_list('pk', flat=True)[:len(objetos)]
+        for objeto, pk in zip(objetos, ids):
+            objeto.pk = pk
+    return [o.pk for o in objetos]
+
+
+class Command(BaseCommand):
+    help = (
+        "Llena la base de datos con datos sintéticos a escala de benchmark: inserciones masivas por "
+        "lotes, reproducibles a partir de --semilla y con popularidad sesgada (productos estrella, "
+        "clientes frecuentes). Después conviene ejecutar recalcular_resumenes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--usuarios', type=int, default=2000)
+        parser.add_argument('--categorias', type=int, default=40)
+        parser.add_argument('--productos', type=int, default=5000)
+        parser.add_argument('--pedidos', type=int, default=20000)
+        parser.add_argument('--lineas-por-pedido', type=float, default=2.5, help="Promedio de líneas por pedido.")
+        parser.add_argument('--resenas', type=int, default=10000)
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--comentarios', type=int, default=8000)
+        parser.add_argument('--dias', type=int, default=365, help="Días de historial hacia atrás.")
+        parser.add_argument('--hasta', type=datetime.fromisoformat, help="Último día del historial (AAAA-MM-DD). Por defecto, hoy.")
+        parser.add_argument('--lote', type=int, default=5000, help="Filas por INSERT/transacción.")
+        parser.add_argument('--forzar', action='store_true', help="Permite ejecutarlo con SKATESHOP_ENTORNO=prod.")
+
+    def handle(self, *args, **o):
+        if getattr(settings, 'ENTORNO', None) == 'prod' and not o['forzar']:
+            raise CommandError("Entorno de producción: usa --forzar si de verdad quieres datos sintéticos aquí.")
+        if min(o['usuarios'], o['categorias'], o['productos']) < 1:
+            raise CommandError("--usuarios, --categorias y --productos deben ser al menos 1.")
+
+        self.rng = random.Random(o['semilla'])
+        self.lote = o['lote']
+        hasta = (o['hasta'].date() if o['hasta'] else timezone.localdate()) + timedelta(days=1)
+        self.fin = timezone.make_aware(datetime.combine(hasta, time.min))
+        self.segundos = o['dias'] * 86400
+
+        with sin_auto_now_add(Pedido, Post, Reseña, Comentario):
+            usuarios = self.crear_usuarios(o['usuarios'])
+            categorias = self.crear_categorias(o['categorias'])
+            productos, precios = self.crear_productos(o['productos'], categorias)
+            self.crear_pedidos(o['pedidos'], o['lineas_por_pedido'], usuarios, productos, precios)
+            self.crear_resenas(o['resenas'], usuarios, productos)
+            self.crear_comunidad(o['posts'], o['comentarios'], usuarios)
+
+        self.stdout.write(self.style.SUCCESS("Listo. Ejecuta recalcular_resumenes para poblar el panel de ventas."))
+
+    # ------------------------------------------------------------------
+
+    def fecha(self):
+        """Fecha aleatoria del historial, más densa en los días recientes (crecimiento de la tienda)."""
+        return self.fin - timedelta(seconds=int(self.segundos * (1 - self.rng.random() ** 0.5)))
+
+    def por_lotes(self, total, nombre, crear_lote):
+        """Llama a crear_lote(inicio, fin) en transacciones de self.lote filas y reporta el avance."""
+        resultado = []
+        for inicio in range(0, total, self.lote):
+            fin = min(inicio + self.lote, total)
+            with transaction.atomic():
+                resultado.extend(crear_lote(inicio, fin) or [])
+            self.stdout.write(f"  {nombre}: {fin}/{total}", ending='\r')
+        self.stdout.write(f"  {nombre}: {total}")
+        return resultado
+
+    def crear_usuarios(self, total):
+        # Un solo hash para todos: los usuarios sintéticos entran con "skate1234"
+        clave = make_password('skate1234')
+        desplazamiento = Usuario.objects.count()
+
+        def lote(inicio, fin):
+            direcciones = []
+            usuarios = []
+            for i in range(desplazamiento + inicio, desplazamiento + fin):
+                comuna, region = self.rng.choice(COMUNAS)
+                tiene_direccion = self.rng.random() < 0.8
+                if tiene_direccion:
+                    direcciones.append(Direccion(calle=f"Calle {self.rng.randint(1, 999)} #{self.rng.randint(1, 9999)}", comuna=comuna, region=region))
+                u = Usuario(
+                    username=f"usuario{i:07d}", email=f"usuario{i:07d}@ejemplo.cl", password=clave,
+                    first_name=self.rng.choice(NOMBRES), last_name=self.rng.choice(APELLIDOS),
+                )
+                u.actualizar_campos_normalizados()  # bulk_create no pasa por Usuario.save
+                usuarios.append((u, tiene_direccion))
+            ids_direccion = iter(insertar(Direccion, direcciones))
+            for u, tiene_direccion in usuarios:
+                if tiene_direccion:
+                    u.direccion_id = next(ids_direccion)
+            return insertar(Usuario, [u for u, _ in usuarios])
+
+        return self.por_lotes(total, "usuarios", lote)
+
+    def crear_categorias(self, total):
+        desplazamiento = Categoria.objects.count()
+
+        def lote(inicio, fin):
+            return insertar(Categoria, [
+                Categoria(nombre=f"Categoría {i}", slug=f"categoria-{i}")
+                for i in range(desplazamiento + inicio, desplazamiento + fin)
+            ])
+
+        return self.por_lotes(total, "categorías", lote)
+
+    def crear_productos(self, total, categorias):
+        precios = []
+        elegir_categoria = Sesgado(self.rng, len(categorias), s=0.8)
+        Relacion = Producto.categorias.through
+        desplazamiento = Producto.objects.count()
+
+        def lote(inicio, fin):
+            productos = []
+            for i in range(desplazamiento + inicio, desplazamiento + fin):
+                tipo = self.rng.choice(TIPOS_PRODUCTO)
+                precio = Decimal(self.rng.randrange(2990, 149990, 1000))
+                productos.append(Producto(
+                    nombre=f"{tipo} {self.rng.choice(MARCAS)} {i}", precio=precio,
+                    stock=max(0, int(self.rng.gauss(25, 20))), descripcion=f"{tipo} sintético para pruebas de carga.",
+                ))
+                precios.append(precio)
+            ids = insertar(Producto, productos)
+            Relacion.objects.bulk_create([
+                Relacion(producto_id=pk, categoria_id=categorias[c])
+                for pk in ids
+                for c in elegir_categoria.distintos(min(len(categorias), self.rng.randint(1, 3)))
+            ])
+            return ids
+
+        return self.por_lotes(total, "productos", lote), precios
+
+    def crear_pedidos(self, total, lineas_promedio, usuarios, productos, precios):
+        elegir_usuario = Sesgado(self.rng, len(usuarios), s=0.7)
+        elegir_producto = Sesgado(self.rng, len(productos))
+        hace_una_semana = self.fin - timedelta(days=8)
+        maximo_lineas = min(len(productos), max(1, round(lineas_promedio * 2 - 1)))
+
+        def lote(inicio, fin):
+            pedidos = []
+            lineas = []
+            for _ in range(inicio, fin):
+                fecha = self.fecha()
+                if fecha < hace_una_semana:
+                    estado = self.rng.choices(['entregado', 'enviado', 'pendiente'], [90, 3, 7])[0]
+                else:
+                    estado = self.rng.choice(['pendiente', 'pagado', 'enviado', 'entregado'])
+                elegidos = elegir_producto.distintos(self.rng.randint(1, maximo_lineas))
+                detalle = [(productos[p], self.rng.choices([1, 2, 3], [80, 15, 5])[0], precios[p]) for p in elegidos]
+                pedidos.append(Pedido(
+                    usuario_id=usuarios[elegir_usuario.elegir()[0]], fecha=fecha, estado=estado,
+                    total=sum(c * p for _, c, p in detalle) + 3990,
+                    codigo_seguimiento=f"SK{self.rng.randrange(10 ** 9):09d}" if estado in ('enviado', 'entregado') else None,
+                ))
+                lineas.append(detalle)
+            ids = insertar(Pedido, pedidos)
+            DetallePedido.objects.bulk_create([
+                DetallePedido(pedido_id=pk, producto_id=producto, cantidad=cantidad, precio_unitario=precio)
+                for pk, detalle in zip(ids, lineas) for producto, cantidad, precio in detalle
+            ])
+
+        self.por_lotes(total, "pedidos", lote)
+
+    def crear_resenas(self, total, usuarios, productos):
+        elegir_usuario = Sesgado(self.rng, len(usuarios))
+        elegir_producto = Sesgado(self.rng, len(productos))
+        existentes = set(
+            Reseña.objects.filter(usuario_id__in=usuarios, producto_id__in=productos)
+            .values_list('usuario_id', 'producto_id')
+        )
+        # Una reseña por cliente y producto: no se pueden crear más que los pares libres
+        total = min(total, len(usuarios) * len(productos) - len(existentes))
+
+        def pares_libres():
+            for usuario in usuarios:
+                for producto in productos:
+                    if (usuario, producto) not in existentes:
+                        yield usuario, producto
+
+        libres = pares_libres()
+
+        def lote(inicio, fin):
+            resenas = []
+            fallos = 0
+            while len(resenas) < fin - inicio:
+                if fallos < MAXIMO_FALLOS_RESENAS:
+                    par = (usuarios[elegir_usuario.elegir()[0]], productos[elegir_producto.elegir()[0]])
+                    if par in existentes:
+                        fallos += 1
+                        continue
+                else:
+                    # Casi saturado: el sorteo sesgado ya no encuentra pares libres, se recorren en orden
+                    par = next(libres)
+                existentes.add(par)
+                resenas.append(Reseña(
+                    usuario_id=par[0], producto_id=par[1], texto="Reseña sintética.", fecha=self.fecha(),
+                    calificacion=self.rng.choices([1, 2, 3, 4, 5], [5, 5, 15, 35, 40])[0],
+                ))
+            Reseña.objects.bulk_create(resenas)
+
+        self.por_lotes(total, "reseñas", lote)
+
+    def crear_comunidad(self, total_posts, total_comentarios, usuarios):
+        elegir_usuario = Sesgado(self.rng, len(usuarios))
+
+        def lote_posts(inicio, fin):
+            return insertar(Post, [
+                Post(
+                    usuario_id=usuarios[elegir_usuario.elegir()[0]], titulo=f"Sesión de skate #{i}",
+                    contenido="Post sintético para pruebas de carga.", fecha=self.fecha(),
+                    estado='publicado' if self.rng.random() < 0.95 else 'borrador',
+                )
+                for i in range(inicio, fin)
+            ])
+
+        posts = self.por_lotes(total_posts, "posts", lote_posts)
+        if not posts:
+            return
+        elegir_post = Sesgado(self.rng, len(posts))
+
+        def lote_comentarios(inicio, fin):
+            Comentario.objects.bulk_create([
+                Comentario(
+                    post_id=posts[elegir_post.elegir()[0]], usuario_id=usuarios[elegir_usuario.elegir()[0]],
+                    texto="Comentario sintético.", fecha=self.fecha(),
+                )
+                for _ in range(inicio, fin)
+            ])
+
+        self.por_lotes(total_comentarios, "comentarios", lote_comentarios)
@@ -0,0 +1,135 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from AppSkate import metricas
+from SkateApp.instantanea import generar_instantanea
+from SkateApp.models import Categoria, Producto, VentaCategoriaDia, VentaProductoDia
+
+
+def host_por_defecto():
+    """El primer host de ALLOWED_HOSTS que sirve como Host de la petición ('localhost' si no hay)."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*':
+            return host.lstrip('.')
+    return 'localhost'
+
+
+def mas_vendidos(modelo, campo, desde, limite):
+    """Ids con más unidades vendidas desde `desde` según los resúmenes diarios."""
+    return list(
+        modelo.objects.filter(fecha__gte=desde).values(campo)
+        .annotate(total=Sum('unidades')).order_by('-total', campo)
+        .values_list(campo, flat=True)[:limite]
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Calienta las cachés antes de recibir tráfico (tras un despliegue o un flush): portada, "
+        "catálogo de las categorías más vendidas, detalle de los productos más vendidos e "
+        "instantánea JSON del catálogo. Las páginas se generan en paralelo como visitante anónimo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=4, help="Peticiones simultáneas como máximo.")
+        parser.add_argument(
+            '--categorias', type=int, default=10,
+            help="Cantidad de categorías cuyas páginas de catálogo se generan.",
+        )
+        parser.add_argument('--productos', type=int, default=50, help="Detalles de producto a generar.")
+        parser.add_argument('--dias', type=int, default=30, help="Ventana de ventas para elegir los más vendidos.")
+        parser.add_argument('--host', help="Host de las peticiones (por defecto, el primero de ALLOWED_HOSTS).")
+
+    def tareas(self, o):
+        desde = timezone.localdate() - timedelta(days=o['dias'])
+
+        # Sin ventas en la ventana (tienda nueva o resúmenes vacíos): las de más productos / más reseñas
+        categorias = mas_vendidos(VentaCategoriaDia, 'categoria_id', desde, o['categorias']) or list(
+            Categoria.objects.annotate(n=Count('productos')).order_by('-n', 'nombre')
+            .values_list('id', flat=True)[:o['categorias']]
+        )
+        productos = mas_vendidos(VentaProductoDia, 'producto_id', desde, o['productos']) or list(
+            Producto.objects.filter(stock__gt=0).annotate(n=Count('reseñas')).order_by('-n', 'id')
+            .values_list('id', flat=True)[:o['productos']]
+        )
+        slugs = Categoria.objects.filter(id__in=categorias).exclude(slug=None).values_list('slug', flat=True)
+
+        paginas = [reverse('SkateApp:home'), reverse('SkateApp:catalogo')]
+        paginas += [reverse('SkateApp:productos_por_categoria', args=[slug]) for slug in slugs]
+        paginas += [reverse('SkateApp:detalle_producto', args=[producto_id]) for producto_id in productos]
+
+        tareas = [(url, self.pagina) for url in paginas]
+        if getattr(settings, 'INSTANTANEA_DIRECTORIO', None):
+            tareas.append(('instantanea del catalogo', self.instantanea))
+        return tareas
+
+    def pagina(self, url):
+        response = Client(HTTP_HOST=self.host).get(url)
+        if response.status_code != 200:
+            raise CommandError(f"respondió {response.status_code}")
+        return len(response.content)
+
+    def instantanea(self, _):
+        generar_instantanea()
+        return None
+
+    def ejecutar(self, nombre, funcion):
+        inicio = time.perf_counter()
+        try:
+            detalle = funcion(nombre)
+            error = None
+        except Exception as e:
+            detalle, error = None, str(e) or e.__class__.__name__
+        finally:
+            # Cada hilo del pool abre su propia conexión
+            connection.close()
+        return nombre, (time.perf_counter() - inicio) * 1000, detalle, error
+
+    def handle(self, *args, **o):
+        if o['hilos'] < 1:
+            raise CommandError("--hilos debe ser al menos 1.")
+        # El Host por defecto del Client ('testserver') no está en ALLOWED_HOSTS fuera de los tests
+        self.host = o['host'] or host_por_defecto()
+        if isinstance(caches['default'], LocMemCache):
+            self.stderr.write("La caché es local a este proceso: los workers no verán lo calentado (¿falta REDIS_URL?).")
+        if not getattr(settings, 'PAGINAS_CACHE_SEGUNDOS', 300):
+            self.stderr.write("PAGINAS_CACHE_SEGUNDOS=0: las páginas se generan pero no se guardan.")
+
+        tareas = self.tareas(o)
+        inicio = time.perf_counter()
+        resultados = []
+        self.stdout.write(f"{'tarea':<50} {'ms':>9} {'bytes':>9}")
+        # Las peticiones del calentamiento no son tráfico: no se cuentan en /metrics
+        with metricas.registro.pausado():
+            with ThreadPoolExecutor(max_workers=o['hilos'], thread_name_prefix='warm_caches') as pool:
+                futuros = [pool.submit(self.ejecutar, nombre, funcion) for nombre, funcion in tareas]
+                for futuro in as_completed(futuros):
+                    nombre, ms, detalle, error = futuro.result()
+                    resultados.append((nombre, ms, error))
+                    if error:
+                        self.stdout.write(self.style.ERROR(f"{nombre:<50} {ms:>9.1f} ERROR: {error}"))
+                    else:
+                        self.stdout.write(f"{nombre:<50} {ms:>9.1f} {detalle if detalle is not None else '-':>9}")
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        errores = [nombre for nombre, _, error in resultados if error]
+        suma_ms = sum(ms for _, ms, _ in resultados)
+        lenta = max(resultados, key=lambda r: r[1], default=None)
+        self.stdout.write(
+            f"{len(resultados)} tareas en {total_ms:.0f} ms con {o['hilos']} hilos "
+            f"(suma {suma_ms:.0f} ms{f', la más lenta {lenta[0]} {lenta[1]:.0f} ms' if lenta else ''})."
+        )
+        if errores:
+            raise CommandError(f"{len(errores)} tareas fallaron: {', '.join(errores)}.")
+        self.stdout.write(self.style.SUCCESS("Cachés calentadas."))
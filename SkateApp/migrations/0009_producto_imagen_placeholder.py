@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0008_comentario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_alto',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_ancho',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_placeholder',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
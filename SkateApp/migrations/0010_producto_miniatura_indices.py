@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0009_producto_imagen_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='imagen_miniatura',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='productos/miniaturas/'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['precio'], name='producto_precio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['stock'], name='producto_stock_idx'),
+        ),
+    ]
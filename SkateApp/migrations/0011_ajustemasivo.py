@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0010_producto_miniatura_indices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AjusteMasivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('productos_actualizados', models.PositiveIntegerField(default=0)),
+                ('detalle', models.JSONField(default=list)),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Ajustes masivos',
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:57
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
+
+def rellenar_campos_normalizados(apps, schema_editor):
+    Usuario = apps.get_model('SkateApp', 'Usuario')
+    lote = []
+    for usuario in Usuario.objects.only('id', 'username', 'email', 'first_name', 'last_name').iterator(chunk_size=2000):
+        usuario.username_normalizado = normalizar(usuario.username)
+        usuario.email_normalizado = normalizar(usuario.email)
+        usuario.nombre_normalizado = normalizar(usuario.first_name)
+        usuario.apellido_normalizado = normalizar(usuario.last_name)
+        lote.append(usuario)
+        if len(lote) >= 2000:
+            Usuario.objects.bulk_update(lote, ['username_normalizado', 'email_normalizado', 'nombre_normalizado', 'apellido_normalizado'])
+            lote = []
+    if lote:
+        Usuario.objects.bulk_update(lote, ['username_normalizado', 'email_normalizado', 'nombre_normalizado', 'apellido_normalizado'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0011_ajustemasivo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usuario',
+            name='apellido_normalizado',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='email_normalizado',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=254),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='nombre_normalizado',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='usuario',
+            name='username_normalizado',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(rellenar_campos_normalizados, migrations.RunPython.noop),
+    ]
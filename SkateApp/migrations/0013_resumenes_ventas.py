@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0012_usuario_busqueda_normalizada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas por día',
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hora', models.DateTimeField(unique=True)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('unidades', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas por hora',
+            },
+        ),
+        migrations.AddField(
+            model_name='pedido',
+            name='contabilizado',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.CreateModel(
+            name='VentaCategoriaDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='SkateApp.categoria')),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas por categoría y día',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'categoria'), name='venta_categoria_dia_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='VentaProductoDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('unidades', models.PositiveIntegerField(default=0)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='SkateApp.producto')),
+            ],
+            options={
+                'verbose_name_plural': 'Ventas por producto y día',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'producto'), name='venta_producto_dia_unica')],
+            },
+        ),
+    ]
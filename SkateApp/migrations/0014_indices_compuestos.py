@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:06
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fusionar_duplicados(apps, schema_editor):
+    """Antes de las restricciones únicas: une las líneas repetidas y deja la reseña más reciente."""
+    DetallePedido = apps.get_model('SkateApp', 'DetallePedido')
+    Reseña = apps.get_model('SkateApp', 'Reseña')
+
+    repetidas = (
+        DetallePedido.objects.values('pedido_id', 'producto_id')
+        .annotate(n=Count('id'), cantidad_total=Sum('cantidad')).filter(n__gt=1)
+    )
+    for grupo in list(repetidas):
+        lineas = DetallePedido.objects.filter(pedido_id=grupo['pedido_id'], producto_id=grupo['producto_id']).order_by('id')
+        conservada = lineas.first()
+        DetallePedido.objects.filter(pk=conservada.pk).update(cantidad=grupo['cantidad_total'])
+        lineas.exclude(pk=conservada.pk).delete()
+
+    repetidas = Reseña.objects.values('usuario_id', 'producto_id').annotate(n=Count('id')).filter(n__gt=1)
+    for grupo in list(repetidas):
+        reseñas = Reseña.objects.filter(usuario_id=grupo['usuario_id'], producto_id=grupo['producto_id'])
+        conservada = reseñas.order_by('-fecha', '-id').first()
+        reseñas.exclude(pk=conservada.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0013_resumenes_ventas'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_duplicados, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='producto',
+            name='producto_stock_idx',
+        ),
+        migrations.AddIndex(
+            model_name='comentario',
+            index=models.Index(fields=['post', 'fecha'], name='comentario_post_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['usuario', '-fecha'], name='pedido_usuario_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['estado', '-fecha'], name='post_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producto',
+            index=models.Index(fields=['stock', 'nombre'], name='producto_stock_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reseña',
+            index=models.Index(fields=['producto', '-fecha'], name='resena_producto_fecha_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='detallepedido',
+            constraint=models.UniqueConstraint(fields=('pedido', 'producto'), name='detalle_pedido_producto_unico'),
+        ),
+        migrations.AddConstraint(
+            model_name='reseña',
+            constraint=models.UniqueConstraint(fields=('usuario', 'producto'), name='resena_usuario_producto_unica'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0014_indices_compuestos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PedidoHistorico',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField()),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('pagado', 'Pagado'), ('enviado', 'Enviado'), ('entregado', 'Entregado')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('codigo_seguimiento', models.CharField(blank=True, max_length=50, null=True)),
+                ('detalles', models.JSONField(default=list)),
+                ('archivado', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pedidos_historicos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'pedido archivado',
+                'verbose_name_plural': 'pedidos archivados',
+                'indexes': [models.Index(fields=['usuario', '-fecha'], name='pedido_hist_usuario_fecha_idx'), models.Index(fields=['fecha'], name='pedido_hist_fecha_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:24
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+LARGO_NOMBRE = 100
+
+
+def nombre_libre(nombre, ocupados):
+    """Primer "nombre (n)" que no está en `ocupados` (en minúsculas) y cabe en la columna."""
+    numero = 2
+    while True:
+        sufijo = f" ({numero})"
+        candidato = nombre[:LARGO_NOMBRE - len(sufijo)] + sufijo
+        if candidato.lower() not in ocupados:
+            return candidato
+        numero += 1
+
+
+def renombrar_duplicadas(apps, schema_editor):
+    """Antes de la restricción: a los duplicados sin distinguir mayúsculas se les agrega un sufijo."""
+    Categoria = apps.get_model('SkateApp', 'Categoria')
+    repetidos = (
+        Categoria.objects.annotate(nombre_min=Lower('nombre')).values('nombre_min')
+        .annotate(n=Count('id')).filter(n__gt=1).values_list('nombre_min', flat=True)
+    )
+    # El sufijo tampoco puede chocar con una categoría que ya se llame "Tablas (2)"
+    ocupados = {nombre.lower() for nombre in Categoria.objects.values_list('nombre', flat=True)}
+    for nombre_min in list(repetidos):
+        duplicadas = Categoria.objects.annotate(nombre_min=Lower('nombre')).filter(nombre_min=nombre_min).order_by('id')
+        for categoria in duplicadas[1:]:
+            categoria.nombre = nombre_libre(categoria.nombre, ocupados)
+            ocupados.add(categoria.nombre.lower())
+            categoria.save(update_fields=['nombre'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('SkateApp', '0015_pedidos_historicos'),
+    ]
+
+    operations = [
+        migrations.RunPython(renombrar_duplicadas, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='categoria',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('nombre'), name='categoria_nombre_unico_ci', violation_error_message='Ya existe una categoría con ese nombre.'),
+        ),
+    ]
@@ -1,8 +1,13 @@
+import os
+import unicodedata
+
 from django.db import models
+from django.db.models.functions import Lower
 from django.contrib.auth.models import AbstractUser
-from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 
+from .imagenes import generar_vista_previa, generar_miniatura
+
 # ======================================================================
 # GESTIÓN DE USUARIOS Y DIRECCIONES
 # ======================================================================
@@ -16,6 +21,11 @@ class Direccion(models.Model):
     def __str__(self):
         return f"{self.calle}, {self.comuna}"
 
+def normalizar_texto(texto):
+    """Minúsculas y sin tildes, para búsquedas por prefijo sobre columnas indexadas."""
+    texto = unicodedata.normalize('NFKD', (texto or '').strip().lower())
+    return ''.join(c for c in texto if not unicodedata.combining(c))
+
 class Usuario(AbstractUser):
     direccion = models.OneToOneField(
         'Direccion', 
@@ -32,6 +42,32 @@ class Usuario(AbstractUser):
 
     rol = models.CharField(max_length=20, choices=ROL_CHOICES, default='cliente')
 
+    # Copias normalizadas (ver normalizar_texto) para buscar con LIKE 'prefijo%' usando índice
+    username_normalizado = models.CharField(max_length=150, blank=True, default='', db_index=True, editable=False)
+    email_normalizado = models.CharField(max_length=254, blank=True, default='', db_index=True, editable=False)
+    nombre_normalizado = models.CharField(max_length=150, blank=True, default='', db_index=True, editable=False)
+    apellido_normalizado = models.CharField(max_length=150, blank=True, default='', db_index=True, editable=False)
+
+    CAMPOS_NORMALIZADOS = {
+        'username': 'username_normalizado',
+        'email': 'email_normalizado',
+        'first_name': 'nombre_normalizado',
+        'last_name': 'apellido_normalizado',
+    }
+
+    def actualizar_campos_normalizados(self):
+        for campo, normalizado in self.CAMPOS_NORMALIZADOS.items():
+            setattr(self, normalizado, normalizar_texto(getattr(self, campo)))
+
+    def save(self, *args, **kwargs):
+        self.actualizar_campos_normalizados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                normalizado for campo, normalizado in self.CAMPOS_NORMALIZADOS.items() if campo in update_fields
+            }
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.username
 
@@ -39,36 +75,67 @@ class Usuario(AbstractUser):
 # CATÁLOGO Y PRODUCTOS
 # ======================================================================
 
+def slug_disponible(base, ocupados):
+    """Primer slug libre de la serie base, base-1, base-2... (ocupados: set de slugs)."""
+    slug = base
+    contador = 1
+    while slug in ocupados:
+        slug = f"{base}-{contador}"
+        contador += 1
+    return slug
+
+
+def base_slug(nombre):
+    # SlugField admite 50 caracteres: se deja espacio para el sufijo numérico
+    return slugify(nombre)[:44].strip('-') or 'categoria'
+
+
+def slugs_unicos(nombres, excluir_pk=None):
+    """
+    Un slug libre por nombre, leyendo en una sola consulta los slugs
+    existentes que empiezan igual que alguna de las bases.
+    """
+    bases = [base_slug(n) for n in nombres]
+    filtro = models.Q()
+    anterior = None
+    for base in sorted(set(bases)):
+        # En orden alfabético, 'ruedas-10' queda cubierta por el LIKE 'ruedas-1%' anterior
+        if anterior is None or not base.startswith(anterior):
+            filtro |= models.Q(slug__startswith=base)
+            anterior = base
+    existentes = Categoria.objects.filter(filtro)
+    if excluir_pk is not None:
+        existentes = existentes.exclude(pk=excluir_pk)
+    ocupados = set(existentes.values_list('slug', flat=True))
+
+    slugs = []
+    for base in bases:
+        slug = slug_disponible(base, ocupados)
+        ocupados.add(slug)
+        slugs.append(slug)
+    return slugs
+
+
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, db_index=True) 
     slug = models.SlugField(unique=True, blank=True, null=True, db_index=True)
+    actualizado = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Categorías"
+        constraints = [
+            # Reemplaza las comprobaciones nombre__iexact de clean() y del formulario:
+            # los ModelForm la validan con una consulta y la base de datos la garantiza
+            models.UniqueConstraint(
+                Lower('nombre'), name='categoria_nombre_unico_ci',
+                violation_error_message="Ya existe una categoría con ese nombre.",
+            ),
+        ]
 
-    def clean(self):
-        nombre_normalizado = self.nombre.strip().lower()
-        
-        existe = Categoria.objects.filter(nombre__iexact=self.nombre)
-        if self.pk:
-            existe = existe.exclude(pk=self.pk) 
-
-        if existe.exists():
-            raise ValidationError("Ya existe una categoría con ese nombre.")
-    
     def generar_slug_unico(self):
-        base_slug = slugify(self.nombre)
-        slug = base_slug
-        contador = 1
-
-        while Categoria.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-            slug = f"{base_slug}-{contador}"
-            contador += 1
-
-        return slug
+        return slugs_unicos([self.nombre], excluir_pk=self.pk)[0]
 
     def save(self, *args, **kwargs):
-        self.full_clean() 
         if not self.slug:
             self.slug = self.generar_slug_unico()
         super().save(*args, **kwargs)
@@ -84,12 +151,57 @@ class Producto(models.Model):
     stock = models.IntegerField()
     descripcion = models.TextField()
     imagen = models.ImageField(upload_to='productos/', blank=True, null=True)
-    
+    # Calculados al subir la imagen (ver imagenes.generar_vista_previa)
+    imagen_ancho = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_alto = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    imagen_placeholder = models.TextField(blank=True, default='', editable=False)
+    imagen_miniatura = models.ImageField(upload_to='productos/miniaturas/', blank=True, null=True, editable=False)
+
     categorias = models.ManyToManyField(Categoria, related_name='productos')
+    # Last-Modified de detalle_producto; también cambia con sus reseñas y categorías (ver signals.py)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Columnas ordenables en gestionar_productos
+            models.Index(fields=['precio'], name='producto_precio_idx'),
+            # catalogo: stock > 0 ORDER BY nombre (también sirve para ordenar por stock)
+            models.Index(fields=['stock', 'nombre'], name='producto_stock_nombre_idx'),
+        ]
+
+    def actualizar_vista_previa(self):
+        if not self.imagen:
+            self.imagen_ancho = None
+            self.imagen_alto = None
+            self.imagen_placeholder = ''
+            self.imagen_miniatura = None
+        else:
+            self.imagen_ancho, self.imagen_alto, self.imagen_placeholder = generar_vista_previa(self.imagen)
+            nombre_miniatura = os.path.splitext(os.path.basename(self.imagen.name))[0] + '.jpg'
+            self.imagen_miniatura.save(nombre_miniatura, generar_miniatura(self.imagen), save=False)
+
+    def save(self, *args, **kwargs):
+        # Solo se procesa la imagen cuando es una subida nueva (aún no guardada en disco)
+        if not self.imagen or not self.imagen._committed:
+            self.actualizar_vista_previa()
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.nombre
 
+class AjusteMasivo(models.Model):
+    """Registro de auditoría: una fila por lote de ajustes de precio/stock."""
+    usuario = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha = models.DateTimeField(auto_now_add=True)
+    productos_actualizados = models.PositiveIntegerField(default=0)
+    detalle = models.JSONField(default=list)
+
+    class Meta:
+        verbose_name_plural = "Ajustes masivos"
+
+    def __str__(self):
+        return f"Ajuste #{self.id} ({self.productos_actualizados} productos)"
+
 # ======================================================================
 # VENTAS Y PEDIDOS
 # ======================================================================
@@ -115,6 +227,15 @@ class Pedido(models.Model):
         help_text="Código de Starken/Chilexpress para rastreo"
     )
 
+    # True cuando el pedido ya está sumado en los resúmenes de ventas (ver resumenes.py)
+    contabilizado = models.BooleanField(default=False, editable=False)
+
+    class Meta:
+        indexes = [
+            # panel_usuario: pedidos del cliente, más recientes primero
+            models.Index(fields=['usuario', '-fecha'], name='pedido_usuario_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Pedido #{self.id} - {self.usuario.username}"
 
@@ -125,9 +246,94 @@ class DetallePedido(models.Model):
     
     precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
 
+    class Meta:
+        constraints = [
+            # El checkout crea una línea por producto del carrito
+            models.UniqueConstraint(fields=['pedido', 'producto'], name='detalle_pedido_producto_unico'),
+        ]
+
     def __str__(self):
         return f"{self.cantidad} x {self.producto.nombre}"
 
+class PedidoHistorico(models.Model):
+    """
+    Pedido entregado y antiguo, movido fuera de Pedido/DetallePedido por
+    archivo.py. Conserva el id original; las líneas van en una columna JSON
+    como [producto_id, cantidad, precio_unitario, nombre del producto].
+    """
+    id = models.BigIntegerField(primary_key=True)
+    usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE, related_name='pedidos_historicos')
+    fecha = models.DateTimeField()
+    estado = models.CharField(max_length=20, choices=Pedido.ESTADOS)
+    total = models.DecimalField(max_digits=10, decimal_places=2)
+    codigo_seguimiento = models.CharField(max_length=50, blank=True, null=True)
+    detalles = models.JSONField(default=list)
+    archivado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'pedido archivado'
+        verbose_name_plural = 'pedidos archivados'
+        indexes = [
+            models.Index(fields=['usuario', '-fecha'], name='pedido_hist_usuario_fecha_idx'),
+            models.Index(fields=['fecha'], name='pedido_hist_fecha_idx'),
+        ]
+
+    @property
+    def lineas(self):
+        return [
+            {'producto_id': producto_id, 'cantidad': cantidad, 'precio_unitario': precio, 'nombre': nombre}
+            for producto_id, cantidad, precio, nombre in self.detalles
+        ]
+
+    def __str__(self):
+        return f"Pedido #{self.id} (archivado)"
+
+# ======================================================================
+# RESÚMENES DE VENTAS (se llenan desde resumenes.py)
+# ======================================================================
+
+class VentaHora(models.Model):
+    hora = models.DateTimeField(unique=True)
+    pedidos = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unidades = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Ventas por hora"
+
+class VentaDia(models.Model):
+    fecha = models.DateField(unique=True)
+    pedidos = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    unidades = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Ventas por día"
+
+class VentaProductoDia(models.Model):
+    fecha = models.DateField()
+    producto = models.ForeignKey(Producto, on_delete=models.CASCADE, related_name='+')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Ventas por producto y día"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'producto'], name='venta_producto_dia_unica'),
+        ]
+
+class VentaCategoriaDia(models.Model):
+    fecha = models.DateField()
+    categoria = models.ForeignKey(Categoria, on_delete=models.CASCADE, related_name='+')
+    unidades = models.PositiveIntegerField(default=0)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "Ventas por categoría y día"
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'categoria'], name='venta_categoria_dia_unica'),
+        ]
+
 # ======================================================================
 # COMUNIDAD Y CONTENIDO
 # ======================================================================
@@ -139,6 +345,12 @@ class Post(models.Model):
     fecha = models.DateTimeField(auto_now_add=True)
     estado = models.CharField(max_length=20, default='publicado')
 
+    class Meta:
+        indexes = [
+            # home: últimos posts publicados
+            models.Index(fields=['estado', '-fecha'], name='post_estado_fecha_idx'),
+        ]
+
     def __str__(self):
         return self.titulo
 
@@ -149,6 +361,17 @@ class Reseña(models.Model):
     texto = models.TextField()
     calificacion = models.IntegerField(choices=[(i, str(i)) for i in range(1, 6)])
     fecha = models.DateTimeField(auto_now_add=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # detalle_producto: reseñas del producto, más recientes primero
+            models.Index(fields=['producto', '-fecha'], name='resena_producto_fecha_idx'),
+        ]
+        constraints = [
+            # Una opinión por cliente y producto (detalle_producto ya lo valida)
+            models.UniqueConstraint(fields=['usuario', 'producto'], name='resena_usuario_producto_unica'),
+        ]
 
     def __str__(self):
         return f"Reseña de {self.usuario} a {self.producto}"
@@ -169,5 +392,11 @@ class Comentario(models.Model):
     texto = models.TextField()
     fecha = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # comunidad: comentarios de cada post en orden cronológico
+            models.Index(fields=['post', 'fecha'], name='comentario_post_fecha_idx'),
+        ]
+
     def __str__(self):
         return f"Comentario de {self.usuario.username} en {self.post.titulo}"
\ No newline at end of file
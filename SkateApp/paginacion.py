@@ -0,0 +1,48 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.query import QuerySet
+from django.utils.functional import cached_property
+
+
+def estimar_filas(modelo, alias='default'):
+    """
+    Número aproximado de filas de la tabla según las estadísticas del motor,
+    sin recorrerla. Devuelve None si el motor no ofrece una estimación.
+    """
+    connection = connections[alias]
+    tabla = modelo._meta.db_table
+
+    if connection.vendor == 'mysql':
+        sql = (
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+        )
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [tabla])
+        fila = cursor.fetchone()
+    if not fila or fila[0] is None or fila[0] < 0:
+        return None
+    return int(fila[0])
+
+
+class PaginadorConteoEstimado(Paginator):
+    """
+    Paginador para tablas muy grandes: cuando el listado no tiene filtros y la
+    tabla supera `umbral` filas, usa la estimación del motor en vez de COUNT(*).
+    Con filtros activos el conteo sigue siendo exacto.
+    """
+    umbral = 10000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        if isinstance(qs, QuerySet) and not qs.query.where:
+            estimado = estimar_filas(qs.model, qs.db)
+            if estimado is not None and estimado > self.umbral:
+                return estimado
+        return super().count
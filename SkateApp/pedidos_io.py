@@ -0,0 +1,118 @@
+"""
+Exportación de pedidos con su detalle y dirección de envío (CSV o JSONL).
+
+Los pedidos se leen por bloques con paginación por id (keyset): cada bloque es
+una consulta con select_related del cliente y su dirección, más una consulta de
+detalles para ese bloque. La memoria queda acotada al tamaño del bloque aunque
+el driver de MySQL no soporte cursores en streaming.
+"""
+import csv
+import json
+from datetime import datetime, time, timedelta
+
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from .catalogo_io import Eco
+from .models import DetallePedido, Pedido
+
+FORMATOS = ('csv', 'jsonl')
+TAMANO_LOTE = 2000
+
+CAMPOS_CSV = [
+    'pedido_id', 'fecha', 'estado', 'usuario', 'email', 'calle', 'comuna', 'region',
+    'codigo_seguimiento', 'total_pedido', 'producto_id', 'producto', 'cantidad',
+    'precio_unitario', 'subtotal',
+]
+
+
+def inicio_del_dia(dia):
+    """Medianoche local de `dia` como datetime aware."""
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def filtrar_pedidos(desde=None, hasta=None, estados=None):
+    """Pedidos con fecha local en [desde, hasta] (ambas incluidas) y estado en `estados`."""
+    # Límites aware sobre la columna (no fecha__date): MySQL usa el índice de fecha
+    # y no necesita las tablas de zonas horarias para CONVERT_TZ
+    pedidos = Pedido.objects.all()
+    if desde:
+        pedidos = pedidos.filter(fecha__gte=inicio_del_dia(desde))
+    if hasta:
+        pedidos = pedidos.filter(fecha__lt=inicio_del_dia(hasta + timedelta(days=1)))
+    if estados:
+        pedidos = pedidos.filter(estado__in=estados)
+    return pedidos
+
+
+def iterar_pedidos(pedidos, tamano_lote=TAMANO_LOTE):
+    """Recorre el queryset por bloques de `tamano_lote` ordenados por id."""
+    consulta = (
+        pedidos.order_by('id')
+        .select_related('usuario__direccion')
+        .prefetch_related(Prefetch(
+            'detalles',
+            queryset=DetallePedido.objects.select_related('producto').only(
+                'id', 'pedido_id', 'cantidad', 'precio_unitario', 'producto__id', 'producto__nombre'
+            ),
+        ))
+    )
+    ultimo_id = 0
+    while True:
+        bloque = list(consulta.filter(id__gt=ultimo_id)[:tamano_lote])
+        if not bloque:
+            return
+        yield from bloque
+        ultimo_id = bloque[-1].id
+
+
+def _direccion(pedido):
+    # Los pedidos no guardan copia de la dirección: se exporta la actual del cliente
+    d = pedido.usuario.direccion
+    return (d.calle, d.comuna, d.region) if d else ('', '', '')
+
+
+def exportar_pedidos(pedidos, formato, tamano_lote=TAMANO_LOTE):
+    """Genera las líneas del export: una por detalle en CSV, una por pedido en JSONL."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {formato}")
+
+    if formato == 'csv':
+        escritor = csv.writer(Eco())
+        yield escritor.writerow(CAMPOS_CSV)
+
+    for pedido in iterar_pedidos(pedidos, tamano_lote):
+        calle, comuna, region = _direccion(pedido)
+        fecha = timezone.localtime(pedido.fecha).isoformat()
+        detalles = pedido.detalles.all()
+
+        if formato == 'csv':
+            cabecera = [
+                pedido.id, fecha, pedido.estado, pedido.usuario.username, pedido.usuario.email,
+                calle, comuna, region, pedido.codigo_seguimiento or '', pedido.total,
+            ]
+            for d in detalles:
+                yield escritor.writerow(cabecera + [
+                    d.producto_id, d.producto.nombre, d.cantidad, d.precio_unitario,
+                    d.cantidad * d.precio_unitario,
+                ])
+        else:
+            yield json.dumps({
+                'pedido_id': pedido.id,
+                'fecha': fecha,
+                'estado': pedido.estado,
+                'usuario': pedido.usuario.username,
+                'email': pedido.usuario.email,
+                'direccion': {'calle': calle, 'comuna': comuna, 'region': region},
+                'codigo_seguimiento': pedido.codigo_seguimiento,
+                'total': str(pedido.total),
+                'detalles': [
+                    {
+                        'producto_id': d.producto_id,
+                        'producto': d.producto.nombre,
+                        'cantidad': d.cantidad,
+                        'precio_unitario': str(d.precio_unitario),
+                    }
+                    for d in detalles
+                ],
+            }, ensure_ascii=False) + '\n'
@@ -0,0 +1,15 @@
+"""
+Presupuesto de consultas SQL por vista.
+
+Cada vista declara junto a su definición el máximo de consultas que puede
+hacer en una petición GET, sea cual sea el volumen de datos. PresupuestoConsultasTests
+recorre todas las rutas de SkateApp/urls.py como anónimo, cliente y
+superusuario y falla si alguna lo supera (o si una vista no lo declara).
+"""
+
+
+def presupuesto_consultas(maximo):
+    def decorador(vista):
+        vista.presupuesto_consultas = maximo
+        return vista
+    return decorador
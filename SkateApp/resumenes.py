@@ -0,0 +1,193 @@
+"""
+Resúmenes de ventas por hora, día, producto y categoría.
+
+Cada pedido pagado se suma una sola vez (Pedido.contabilizado) de forma
+incremental; el comando recalcular_resumenes reconstruye rangos completos
+del historial por bloques de días. El panel de administración lee solo
+de estas tablas.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch
+from django.utils import timezone
+
+from .models import (
+    Categoria, DetallePedido, Pedido, PedidoHistorico, Producto,
+    VentaCategoriaDia, VentaDia, VentaHora, VentaProductoDia,
+)
+
+# Estados que cuentan como venta (el pago ya fue confirmado)
+ESTADOS_VENDIDOS = ('pagado', 'enviado', 'entregado')
+
+PREFETCH_DETALLES = [
+    Prefetch('detalles', queryset=DetallePedido.objects.only('id', 'pedido_id', 'producto_id', 'cantidad', 'precio_unitario')),
+    Prefetch('detalles__producto', queryset=Producto.objects.only('id')),
+    Prefetch('detalles__producto__categorias', queryset=Categoria.objects.only('id')),
+]
+
+
+def _totales():
+    return {'pedidos': 0, 'ingresos': Decimal('0'), 'unidades': 0}
+
+
+def _por_item():
+    return {'unidades': 0, 'ingresos': Decimal('0')}
+
+
+class Acumulador:
+    """Suma pedidos en memoria agrupados por la clave de cada tabla de resumen."""
+
+    def __init__(self):
+        self.filas = {
+            VentaHora: defaultdict(_totales),
+            VentaDia: defaultdict(_totales),
+            VentaProductoDia: defaultdict(_por_item),
+            VentaCategoriaDia: defaultdict(_por_item),
+        }
+
+    def agregar(self, pedido):
+        lineas = [
+            (d.producto_id, d.cantidad, d.precio_unitario, [c.id for c in d.producto.categorias.all()])
+            for d in pedido.detalles.all()
+        ]
+        self._agregar(pedido.fecha, pedido.total, lineas)
+
+    def agregar_historico(self, historico, categorias_por_producto):
+        """Como agregar(), para un PedidoHistorico (líneas en JSON, ver archivo.py)."""
+        lineas = [
+            (producto_id, cantidad, Decimal(precio), categorias_por_producto.get(producto_id, ()))
+            for producto_id, cantidad, precio, _ in historico.detalles
+        ]
+        self._agregar(historico.fecha, historico.total, lineas)
+
+    def _agregar(self, fecha, total, lineas):
+        local = timezone.localtime(fecha)
+        hora = local.replace(minute=0, second=0, microsecond=0)
+        dia = local.date()
+        unidades = sum(cantidad for _, cantidad, _, _ in lineas)
+
+        for fila in (self.filas[VentaHora][(('hora', hora),)], self.filas[VentaDia][(('fecha', dia),)]):
+            fila['pedidos'] += 1
+            fila['ingresos'] += total
+            fila['unidades'] += unidades
+
+        for producto_id, cantidad, precio_unitario, categorias in lineas:
+            monto = cantidad * precio_unitario
+            fila = self.filas[VentaProductoDia][(('fecha', dia), ('producto_id', producto_id))]
+            fila['unidades'] += cantidad
+            fila['ingresos'] += monto
+            for categoria_id in categorias:
+                fila = self.filas[VentaCategoriaDia][(('fecha', dia), ('categoria_id', categoria_id))]
+                fila['unidades'] += cantidad
+                fila['ingresos'] += monto
+
+    def sumar_en_base(self):
+        """Suma los valores a las filas existentes (o las crea). Para el camino incremental."""
+        for modelo, filas in self.filas.items():
+            for claves, valores in filas.items():
+                _sumar(modelo, dict(claves), valores)
+
+    def insertar(self):
+        """Inserta todas las filas de una vez. Solo válido sobre un rango recién vaciado."""
+        for modelo, filas in self.filas.items():
+            modelo.objects.bulk_create(
+                [modelo(**dict(claves), **valores) for claves, valores in filas.items()],
+                batch_size=1000,
+            )
+
+
+def _sumar(modelo, claves, valores):
+    incrementos = {campo: F(campo) + valor for campo, valor in valores.items()}
+    if modelo.objects.filter(**claves).update(**incrementos):
+        return
+    try:
+        with transaction.atomic():
+            modelo.objects.create(**claves, **valores)
+    except IntegrityError:
+        # Otro proceso creó la fila entre el UPDATE y el INSERT
+        modelo.objects.filter(**claves).update(**incrementos)
+
+
+def registrar_venta(pedido_id):
+    """Suma un pedido pagado a los resúmenes. Es idempotente: devuelve False si ya estaba."""
+    with transaction.atomic():
+        marcado = Pedido.objects.filter(
+            pk=pedido_id, contabilizado=False, estado__in=ESTADOS_VENDIDOS
+        ).update(contabilizado=True)
+        if not marcado:
+            return False
+
+        pedido = Pedido.objects.prefetch_related(*PREFETCH_DETALLES).get(pk=pedido_id)
+        acumulador = Acumulador()
+        acumulador.agregar(pedido)
+        acumulador.sumar_en_base()
+    return True
+
+
+def _limites_locales(desde, hasta):
+    """Fechas locales [desde, hasta) a datetimes con zona horaria."""
+    zona = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(desde, time.min), zona),
+        timezone.make_aware(datetime.combine(hasta, time.min), zona),
+    )
+
+
+def _categorias_por_producto(historicos):
+    ids = {linea[0] for detalles in historicos.values_list('detalles', flat=True) for linea in detalles}
+    categorias = defaultdict(list)
+    relaciones = Producto.categorias.through.objects.filter(producto_id__in=ids).values_list('producto_id', 'categoria_id')
+    for producto_id, categoria_id in relaciones:
+        categorias[producto_id].append(categoria_id)
+    return categorias
+
+
+def recalcular_rango(desde, hasta, tamano_lectura=2000):
+    """
+    Reconstruye los resúmenes de los días [desde, hasta) en una transacción:
+    vacía el rango, vuelve a sumar sus pedidos vendidos y los marca como contabilizados.
+    Devuelve la cantidad de pedidos procesados.
+    """
+    inicio, fin = _limites_locales(desde, hasta)
+    pedidos = Pedido.objects.filter(fecha__gte=inicio, fecha__lt=fin, estado__in=ESTADOS_VENDIDOS)
+
+    with transaction.atomic():
+        VentaHora.objects.filter(hora__gte=inicio, hora__lt=fin).delete()
+        for modelo in (VentaDia, VentaProductoDia, VentaCategoriaDia):
+            modelo.objects.filter(fecha__gte=desde, fecha__lt=hasta).delete()
+
+        acumulador = Acumulador()
+        procesados = 0
+        consulta = pedidos.only('id', 'fecha', 'total').prefetch_related(*PREFETCH_DETALLES)
+        for pedido in consulta.iterator(chunk_size=tamano_lectura):
+            acumulador.agregar(pedido)
+            procesados += 1
+
+        # Los pedidos archivados siguen contando en los resúmenes
+        historicos = PedidoHistorico.objects.filter(fecha__gte=inicio, fecha__lt=fin, estado__in=ESTADOS_VENDIDOS)
+        categorias = _categorias_por_producto(historicos)
+        for historico in historicos.iterator(chunk_size=tamano_lectura):
+            acumulador.agregar_historico(historico, categorias)
+            procesados += 1
+
+        acumulador.insertar()
+        pedidos.filter(contabilizado=False).update(contabilizado=True)
+
+    return procesados
+
+
+def recalcular_historial(desde, hasta, dias_por_bloque=7, tamano_lectura=2000, al_avanzar=None):
+    """Recorre [desde, hasta) en bloques de `dias_por_bloque` días, una transacción por bloque."""
+    total = 0
+    actual = desde
+    while actual < hasta:
+        siguiente = min(actual + timedelta(days=dias_por_bloque), hasta)
+        procesados = recalcular_rango(actual, siguiente, tamano_lectura)
+        total += procesados
+        if al_avanzar:
+            al_avanzar(actual, siguiente, procesados)
+        actual = siguiente
+    return total
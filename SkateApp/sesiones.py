@@ -0,0 +1,90 @@
+"""
+Motor de sesiones: lectura desde la caché y escritura en la base de datos
+(cached_db), sin escribir cuando los datos no cambiaron.
+
+Las vistas del carrito marcan request.session.modified aunque el contenido
+quede igual; aquí se compara una huella del contenido al cargar y al guardar,
+así que varias marcas sin cambios reales no generan ningún UPDATE.
+
+Cada marca renueva el vencimiento de la cookie; para que la sesión guardada no
+venza antes, expire_date se guarda con MARGEN_VENCIMIENTO de más y se anota en
+los datos (CLAVE_VENCE). Un guardado sin cambios solo se omite mientras ese
+vencimiento siga cubriendo el de la cookie: como mucho un UPDATE por margen.
+Configurar con SESSION_ENGINE = 'SkateApp.sesiones'.
+"""
+import json
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.models import Session
+from django.utils import timezone
+
+TAMANO_LOTE = 1000
+MARGEN_VENCIMIENTO = timedelta(hours=1)
+CLAVE_VENCE = '_vence_guardado'
+
+
+def borrar_expiradas(tamano_lote=TAMANO_LOTE, pausa=0, al_avanzar=None):
+    """
+    Borra las sesiones vencidas en bloques de `tamano_lote` claves, cada uno en su
+    propio DELETE corto, para no mantener bloqueada la tabla. Devuelve el total borrado.
+    """
+    ahora = timezone.now()
+    total = 0
+    while True:
+        claves = list(
+            Session.objects.filter(expire_date__lt=ahora).values_list('session_key', flat=True)[:tamano_lote]
+        )
+        if not claves:
+            return total
+        borradas = Session.objects.filter(session_key__in=claves).delete()[0]
+        total += borradas
+        if al_avanzar:
+            al_avanzar(total)
+        if pausa:
+            time.sleep(pausa)
+
+
+def huella(datos):
+    datos = {clave: valor for clave, valor in datos.items() if clave != CLAVE_VENCE}
+    return json.dumps(datos, sort_keys=True, separators=(',', ':'), default=str)
+
+
+class SessionStore(cached_db.SessionStore):
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._huella_cargada = None
+
+    def load(self):
+        datos = super().load()
+        self._huella_cargada = huella(datos)
+        return datos
+
+    def _cubre_la_cookie(self):
+        vence = self._session.get(CLAVE_VENCE)
+        return vence is not None and datetime.fromisoformat(vence) >= self.get_expiry_date()
+
+    def save(self, must_create=False):
+        if (
+            not must_create
+            and self.session_key is not None
+            and self._huella_cargada is not None
+            and huella(self._session) == self._huella_cargada
+            and self._cubre_la_cookie()
+        ):
+            return
+        datos = self._get_session(no_load=must_create)
+        datos[CLAVE_VENCE] = (self.get_expiry_date() + MARGEN_VENCIMIENTO).isoformat()
+        super().save(must_create)
+        self._huella_cargada = huella(self._session)
+
+    def create_model_instance(self, data):
+        instancia = super().create_model_instance(data)
+        instancia.expire_date = datetime.fromisoformat(data[CLAVE_VENCE])
+        return instancia
+
+    @classmethod
+    def clear_expired(cls):
+        # clearsessions también borra por lotes
+        borrar_expiradas()
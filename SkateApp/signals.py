@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache_catalogo import invalidar_catalogo
+from .models import Categoria, Pedido, Producto, Reseña
+from .resumenes import ESTADOS_VENDIDOS, registrar_venta
+
+
+@receiver(post_save, sender=Producto)
+@receiver(post_delete, sender=Producto)
+@receiver(post_save, sender=Categoria)
+@receiver(post_delete, sender=Categoria)
+@receiver(post_save, sender=Reseña)
+@receiver(post_delete, sender=Reseña)
+@receiver(m2m_changed, sender=Producto.categorias.through)
+def catalogo_modificado(sender, action='post', **kwargs):
+    if action.startswith('pre_'):
+        return
+    # Las reseñas cuentan porque el catálogo y el detalle muestran el promedio.
+    # Las escrituras masivas (bulk_update, update) no emiten señales:
+    # quien las hace llama a invalidar_catalogo() una vez por lote.
+    transaction.on_commit(invalidar_catalogo)
+
+
+@receiver(post_save, sender=Reseña)
+@receiver(post_delete, sender=Reseña)
+def resena_modificada(sender, instance, **kwargs):
+    # detalle_producto muestra las reseñas: cambian el Last-Modified del producto
+    Producto.objects.filter(pk=instance.producto_id).update(actualizado=timezone.now())
+
+
+@receiver(post_save, sender=Categoria)
+@receiver(pre_delete, sender=Categoria)
+def categoria_modificada(sender, instance, created=False, **kwargs):
+    # pre_delete: después de borrarla ya no se sabe qué productos tenía
+    if not created:
+        Producto.objects.filter(categorias=instance).update(actualizado=timezone.now())
+
+
+@receiver(post_save, sender=Pedido)
+def pedido_guardado(sender, instance, **kwargs):
+    if instance.estado in ESTADOS_VENDIDOS and not instance.contabilizado:
+        pedido_id = instance.pk
+        transaction.on_commit(lambda: registrar_venta(pedido_id))
@@ -1,7 +1,53 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+import gzip
+import io
+import importlib
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, time, timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import resolve, reverse
 from django.contrib.auth import get_user_model
-from .models import Categoria, Producto
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from .models import (
+    Categoria, Producto, Pedido, DetallePedido, Direccion, AjusteMasivo, Post, Comentario, Reseña, Noticia,
+    PedidoHistorico, VentaDia, VentaHora, VentaProductoDia, VentaCategoriaDia, slugs_unicos,
+)
+from .paginacion import PaginadorConteoEstimado
+from .catalogo_io import importar_catalogo, exportar_catalogo, leer_filas
+from .ajustes import aplicar_ajustes
+from .cache_catalogo import invalidar_catalogo, version_catalogo
+from . import instantanea
+from .categorias import crear_categorias
+from .forms import CategoriaForm
+from .resumenes import recalcular_historial, registrar_venta
+from .archivo import archivar_pedidos, restar_meses
+from .pedidos_io import exportar_pedidos, filtrar_pedidos
+from .limites import LimiteIntentos, ip_cliente
+from .sesiones import borrar_expiradas
+from .checks import revisar_configuracion
+from . import urls as urls_skateapp
+from .management.commands.benchmark_rutas import comparar
+from .management.commands.seed_skateshop import Command as SeedCommand
+from .management.commands.warm_caches import host_por_defecto
+from AppSkate import metricas
+from AppSkate.medicion import Medicion
+from AppSkate.replicas import COOKIE_PRIMARIA, lee_de_replica
+from AppSkate.nmasuno import ConsultasRepetidas, detectar_n_mas_uno, forma_sql, ignorar_n_mas_uno
 
 User = get_user_model() 
 
@@ -49,4 +95,1263 @@ class SkateShopTests(TestCase):
         self.assertEqual(response.status_code, 200)
         
         session = self.client.session
-        self.assertIn(str(self.producto.id), session['carrito'])
\ No newline at end of file
+        self.assertIn(str(self.producto.id), session['carrito'])
+
+def imagen_de_prueba(nombre='prueba.png', tamano=(640, 480)):
+    buffer = io.BytesIO()
+    Image.new('RGB', tamano, (93, 0, 137)).save(buffer, format='PNG')
+    return SimpleUploadedFile(nombre, buffer.getvalue(), content_type='image/png')
+
+
+class ImagenPlaceholderTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.override = override_settings(MEDIA_ROOT=self.media)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        shutil.rmtree(self.media, ignore_errors=True)
+
+    def test_placeholder_calculado_al_subir(self):
+        """Al subir una imagen se guardan sus dimensiones y una vista previa en base64"""
+        producto = Producto.objects.create(
+            nombre='Rueda 52mm', precio=15000, stock=5, descripcion='Rueda dura',
+            imagen=imagen_de_prueba()
+        )
+        self.assertEqual((producto.imagen_ancho, producto.imagen_alto), (640, 480))
+        self.assertTrue(producto.imagen_placeholder.startswith('data:image/jpeg;base64,'))
+
+    def test_catalogo_sin_placeholder_externo(self):
+        """El catálogo reserva el espacio de la imagen y no usa placehold.co"""
+        Producto.objects.create(
+            nombre='Rueda 52mm', precio=15000, stock=5, descripcion='Rueda dura',
+            imagen=imagen_de_prueba(tamano=(1200, 800))
+        )
+        Producto.objects.create(nombre='Lija Mob', precio=8000, stock=5, descripcion='Lija')
+        response = self.client.get(reverse('SkateApp:catalogo'))
+        self.assertContains(response, 'width="1200" height="800"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, 'placehold.co')
+
+
+class GestionarProductosTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='admin123', email='admin@test.com')
+        self.tablas = Categoria.objects.create(nombre='Tablas', slug='tablas')
+        self.ruedas = Categoria.objects.create(nombre='Ruedas', slug='ruedas')
+        for i in range(30):
+            producto = Producto.objects.create(
+                nombre=f'Producto {i:02d}', precio=1000 + i, stock=i, descripcion='Descripcion'
+            )
+            producto.categorias.add(self.tablas if i % 2 else self.ruedas)
+        self.client.force_login(self.admin)
+
+    def test_paginacion_y_consultas_constantes(self):
+        """La tabla se pagina y no hace una consulta por producto"""
+        url = reverse('SkateApp:gestionar_productos')
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['productos']), 25)
+        self.assertEqual(response.context['pagina'].paginator.num_pages, 2)
+
+        response = self.client.get(url, {'pagina': 2})
+        self.assertEqual(len(response.context['productos']), 5)
+
+    def test_filtros_y_orden(self):
+        """Filtra por categoría y nivel de stock, ordenando por una columna permitida"""
+        response = self.client.get(reverse('SkateApp:gestionar_productos'), {
+            'categoria': self.tablas.id, 'stock': 'bajo', 'orden': '-stock',
+        })
+        stocks = [p.stock for p in response.context['productos']]
+        self.assertEqual(stocks, [5, 3, 1])
+
+        response = self.client.get(reverse('SkateApp:gestionar_productos'), {'orden': 'descripcion'})
+        self.assertEqual(response.context['orden'], 'nombre')
+
+
+class AdminConsultasTests(TestCase):
+    """Presupuesto fijo de consultas por changelist del admin, sin importar el número de filas"""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='admin123', email='admin@test.com')
+        categorias = [Categoria.objects.create(nombre=f'Categoria {i}') for i in range(3)]
+        for i in range(20):
+            direccion = Direccion.objects.create(calle=f'Calle {i}', comuna='Santiago', region='RM')
+            cliente = User.objects.create_user(username=f'cliente{i}', direccion=direccion)
+            Pedido.objects.create(usuario=cliente, total=10000 + i)
+            producto = Producto.objects.create(nombre=f'Producto {i}', precio=1000, stock=5, descripcion='-')
+            producto.categorias.set(categorias)
+        self.client.force_login(self.admin)
+
+    def test_changelist_pedidos(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('admin:SkateApp_pedido_changelist'))
+        self.assertContains(response, 'Calle 19, Santiago (RM)')
+
+    def test_changelist_productos(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('admin:SkateApp_producto_changelist'))
+        self.assertContains(response, 'Categoria 0, Categoria 1, Categoria 2')
+
+    def test_changelist_direcciones(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('admin:SkateApp_direccion_changelist'))
+        self.assertContains(response, 'cliente19')
+
+    def test_paginador_estimado_sin_filtros(self):
+        """Sin filtros y sobre el umbral se usa la estimación del motor en lugar de COUNT(*)"""
+        with mock.patch('SkateApp.paginacion.estimar_filas', return_value=2_000_000):
+            self.assertEqual(PaginadorConteoEstimado(Pedido.objects.order_by('-id'), 100).count, 2_000_000)
+            self.assertEqual(PaginadorConteoEstimado(Pedido.objects.filter(estado='pendiente').order_by('-id'), 100).count, 20)
+
+
+class CatalogoImportacionTests(TestCase):
+    def setUp(self):
+        self.existente = Producto.objects.create(nombre='Skate Pro', precio=50000, stock=10, descripcion='Tabla')
+        Categoria.objects.create(nombre='Tablas', slug='tablas')
+
+    def test_importar_csv_por_lotes(self):
+        """Crea, actualiza y reporta errores por línea resolviendo categorías en bloque"""
+        archivo = io.StringIO(
+            "nombre,precio,stock,descripcion,categorias\n"
+            "Skate Pro,45000,3,Tabla rebajada,tablas\n"
+            "Rueda Spitfire,20000,8,Ruedas 52mm,Ruedas|Accesorios\n"
+            "Lija,1000,2,Muy corto,Accesorios\n"
+            "Truck Independent,abc,2,Trucks,Trucks\n"
+            "Rodamiento Bones,15000,4,Rodamientos,Accesorios\n"
+        )
+        resultado = importar_catalogo(leer_filas(archivo, 'csv'), tamano_lote=2)
+
+        self.assertEqual((resultado.creados, resultado.actualizados), (2, 1))
+        self.assertEqual([linea for linea, _ in resultado.errores], [4, 5])
+        self.existente.refresh_from_db()
+        self.assertEqual((self.existente.precio, self.existente.stock), (45000, 3))
+        self.assertEqual(list(self.existente.categorias.values_list('slug', flat=True)), ['tablas'])
+        self.assertEqual(Categoria.objects.filter(nombre='Accesorios').count(), 1)
+        self.assertEqual(Producto.objects.get(nombre='Rodamiento Bones').categorias.get().nombre, 'Accesorios')
+
+    def test_comando_desde_stdin_no_la_cierra(self):
+        """Con '-' el comando lee la entrada estándar sin cerrarla"""
+        entrada = io.StringIO('{"nombre": "Lija Mob", "precio": 5000, "stock": 4, "descripcion": "Lija negra"}\n')
+        with mock.patch('sys.stdin', entrada):
+            call_command('importar_catalogo', '-', formato='jsonl', stdout=io.StringIO())
+        self.assertFalse(entrada.closed)
+        self.assertTrue(Producto.objects.filter(nombre='Lija Mob').exists())
+
+    def test_exportar_jsonl(self):
+        """La exportación genera una línea JSON por producto"""
+        self.existente.categorias.add(Categoria.objects.get(slug='tablas'))
+        lineas = list(exportar_catalogo('jsonl'))
+        self.assertEqual(len(lineas), 1)
+        self.assertEqual(json.loads(lineas[0])['categorias'], ['Tablas'])
+
+    def test_admin_exportar_streaming(self):
+        """El admin exporta el catálogo como respuesta en streaming"""
+        admin = User.objects.create_superuser(username='admin', password=None, email='admin@test.com')
+        self.client.force_login(admin)
+        response = self.client.get(reverse('admin:SkateApp_producto_exportar', args=['csv']))
+        self.assertTrue(response.streaming)
+        contenido = b''.join(response.streaming_content).decode()
+        self.assertIn('Skate Pro', contenido)
+
+
+class AjusteMasivoTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password=None, email='admin@test.com')
+        self.p1 = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=10, descripcion='-')
+        self.p2 = Producto.objects.create(nombre='Rueda Spitfire', precio=20000, stock=1, descripcion='-')
+        self.client.force_login(self.admin)
+
+    def test_api_aplica_lote_en_un_statement(self):
+        """Un lote válido se aplica con un UPDATE y deja una fila de auditoría"""
+        payload = {'ajustes': [
+            {'producto_id': self.p1.id, 'delta_stock': 5, 'precio': '35990'},
+            {'producto_id': self.p2.id, 'delta_stock': -3},
+            {'producto_id': 9999, 'stock': 1},
+        ]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('SkateApp:api_ajuste_masivo'), json.dumps(payload), content_type='application/json'
+            )
+        datos = response.json()
+        self.assertEqual(datos['actualizados'], 2)
+        self.assertEqual(len(datos['errores']), 1)
+
+        self.p1.refresh_from_db()
+        self.p2.refresh_from_db()
+        self.assertEqual((self.p1.stock, self.p1.precio), (15, 35990))
+        self.assertEqual(self.p2.stock, 0)
+        self.assertEqual(AjusteMasivo.objects.get().usuario, self.admin)
+
+    def test_invalidacion_unica_por_lote(self):
+        """La caché del catálogo se invalida una sola vez por lote"""
+        with mock.patch('SkateApp.ajustes.invalidar_catalogo') as invalidar:
+            with self.captureOnCommitCallbacks(execute=True):
+                aplicar_ajustes([
+                    {'producto_id': self.p1.id, 'stock': 3},
+                    {'producto_id': self.p2.id, 'stock': 4},
+                ])
+        invalidar.assert_called_once()
+
+    def test_formulario_lineas(self):
+        """El formulario acepta deltas con signo y reporta líneas mal formadas"""
+        response = self.client.post(reverse('SkateApp:ajuste_masivo'), {
+            'ajustes': f"{self.p1.id},+2\n{self.p2.id},,15990\nbasura",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['errores']), 1)
+        self.p1.refresh_from_db()
+        self.p2.refresh_from_db()
+        self.assertEqual((self.p1.stock, self.p2.precio), (12, 15990))
+
+    def test_errores_ordenados_por_linea(self):
+        """Los errores se listan por número de línea, no como texto (2 antes que 10)"""
+        texto = "\n".join(['basura' if linea in (2, 10) else '# comentario' for linea in range(1, 11)])
+        response = self.client.post(reverse('SkateApp:ajuste_masivo'), {'ajustes': texto})
+        self.assertEqual([linea for linea, _ in response.context['errores']], [2, 10])
+
+
+class BusquedaUsuariosTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password=None, email='admin@test.com')
+        self.ana = User.objects.create_user(username='AnaSk8', email='Ana.Perez@Mail.com', first_name='Ána', last_name='Pérez')
+        self.luis = User.objects.create_user(username='luisito', email='luis@mail.com', first_name='Luis', last_name='Soto')
+        self.pedido = Pedido.objects.create(usuario=self.luis, total=10000)
+        Pedido.objects.create(usuario=self.luis, total=5000)
+        self.client.force_login(self.admin)
+
+    def buscar(self, termino):
+        response = self.client.get(reverse('SkateApp:gestionar_usuarios'), {'buscar': termino})
+        return [u.username for u in response.context['usuarios']]
+
+    def test_campos_normalizados(self):
+        """Los campos de búsqueda se guardan en minúsculas y sin tildes"""
+        self.assertEqual(self.ana.nombre_normalizado, 'ana')
+        self.assertEqual(self.ana.email_normalizado, 'ana.perez@mail.com')
+
+    def test_busqueda_por_prefijo_y_atajos(self):
+        """Prefijo sin tildes, email exacto y número de pedido"""
+        self.assertEqual(self.buscar('PER'), ['AnaSk8'])
+        self.assertEqual(self.buscar('ANA.PEREZ@mail.com'), ['AnaSk8'])
+        self.assertEqual(self.buscar(f'#{self.pedido.id}'), ['luisito'])
+
+    def test_prefijo_distingue_mayusculas_fuera_de_mysql(self):
+        """Sobre columnas normalizadas no hace falta istartswith (UPPER() en PostgreSQL)"""
+        from .views import buscar_usuarios
+
+        def busquedas(nodo):
+            for hijo in nodo.children:
+                yield from busquedas(hijo) if hasattr(hijo, 'children') else [hijo.lookup_name]
+
+        self.assertEqual(set(busquedas(buscar_usuarios('Pér').query.where)), {'startswith'})
+
+    def test_conteo_de_pedidos_en_una_consulta(self):
+        """La tabla muestra pedidos por usuario sin una consulta por fila"""
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('SkateApp:gestionar_usuarios'))
+        conteos = {u.username: u.cantidad_pedidos for u in response.context['usuarios']}
+        self.assertEqual(conteos, {'admin': 0, 'AnaSk8': 0, 'luisito': 2})
+
+
+class ResumenesVentasTests(TestCase):
+    def setUp(self):
+        self.cliente = User.objects.create_user(username='cliente')
+        self.tablas = Categoria.objects.create(nombre='Tablas', slug='tablas')
+        self.producto = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=50, descripcion='-')
+        self.producto.categorias.add(self.tablas)
+
+    def crear_pedido(self, cantidad=2):
+        pedido = Pedido.objects.create(usuario=self.cliente, total=40000 * cantidad + 5000)
+        DetallePedido.objects.create(pedido=pedido, producto=self.producto, cantidad=cantidad, precio_unitario=40000)
+        return pedido
+
+    def pagar(self, pedido):
+        with self.captureOnCommitCallbacks(execute=True):
+            pedido.estado = 'pagado'
+            pedido.save()
+
+    def test_pago_suma_una_sola_vez(self):
+        """Al pagarse, el pedido se suma a todas las tablas de resumen una única vez"""
+        pedido = self.crear_pedido()
+        self.pagar(pedido)
+        self.assertFalse(registrar_venta(pedido.id))
+
+        dia = VentaDia.objects.get()
+        self.assertEqual((dia.pedidos, dia.unidades, dia.ingresos), (1, 2, 85000))
+        self.assertEqual(VentaHora.objects.get().pedidos, 1)
+        self.assertEqual(VentaProductoDia.objects.get(producto=self.producto).ingresos, 80000)
+        self.assertEqual(VentaCategoriaDia.objects.get(categoria=self.tablas).unidades, 2)
+
+    def test_recalculo_coincide_con_incremental(self):
+        """Reconstruir el historial por bloques da los mismos totales"""
+        for cantidad in (1, 3):
+            self.pagar(self.crear_pedido(cantidad))
+        self.crear_pedido(5)  # pendiente: no cuenta
+        antes = list(VentaDia.objects.values('fecha', 'pedidos', 'unidades', 'ingresos'))
+
+        hoy = timezone.localdate()
+        recalcular_historial(hoy - timedelta(days=3), hoy + timedelta(days=1), dias_por_bloque=2)
+        self.assertEqual(list(VentaDia.objects.values('fecha', 'pedidos', 'unidades', 'ingresos')), antes)
+        self.assertEqual(VentaProductoDia.objects.get().unidades, 4)
+
+    def test_panel_lee_solo_resumenes(self):
+        """El panel no consulta pedidos: su costo no depende del historial"""
+        self.pagar(self.crear_pedido())
+        admin = User.objects.create_superuser(username='admin', password=None, email='admin@test.com')
+        self.client.force_login(admin)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.get(reverse('SkateApp:gestion_administrador'))
+        self.assertEqual(response.context['totales']['pedidos'], 1)
+        self.assertFalse(any('"SkateApp_pedido"' in q['sql'] for q in consultas.captured_queries))
+
+
+class ExportarPedidosTests(TestCase):
+    def setUp(self):
+        direccion = Direccion.objects.create(calle='Av. Siempre Viva 742', comuna='Providencia', region='RM')
+        self.cliente = User.objects.create_user(username='cliente', email='c@test.com', direccion=direccion)
+        productos = [
+            Producto.objects.create(nombre=nombre, precio=40000, stock=50, descripcion='-')
+            for nombre in ('Tabla Element', 'Tabla Baker')
+        ]
+        for estado in ['pagado', 'pendiente', 'enviado']:
+            pedido = Pedido.objects.create(usuario=self.cliente, total=80000, estado=estado)
+            for producto in productos:
+                DetallePedido.objects.create(pedido=pedido, producto=producto, cantidad=1, precio_unitario=40000)
+
+    def test_csv_por_bloques_con_consultas_acotadas(self):
+        """Una línea por detalle y dos consultas por bloque, sin importar la cantidad de pedidos"""
+        pedidos = filtrar_pedidos(estados=['pagado', 'enviado'])
+        with self.assertNumQueries(5):  # 2 bloques x (pedidos + detalles) + bloque vacío
+            lineas = list(exportar_pedidos(pedidos, 'csv', tamano_lote=1))
+        self.assertEqual(len(lineas), 5)
+        self.assertIn('Providencia', lineas[1])
+
+    def test_jsonl_filtra_por_fecha(self):
+        """El filtro de fechas excluye los días fuera del rango"""
+        hoy = timezone.localdate()
+        self.assertEqual(list(exportar_pedidos(filtrar_pedidos(desde=hoy + timedelta(days=1)), 'jsonl')), [])
+        registro = json.loads(next(exportar_pedidos(filtrar_pedidos(hasta=hoy, estados=['pendiente']), 'jsonl')))
+        self.assertEqual((registro['estado'], len(registro['detalles'])), ('pendiente', 2))
+        self.assertEqual(registro['direccion']['comuna'], 'Providencia')
+
+    def test_limites_del_dia_local_sin_funciones_de_fecha(self):
+        """Un pedido a las 23:59 locales entra en su día; la columna se compara sin DATE()"""
+        ayer = timezone.localdate() - timedelta(days=1)
+        pedido = Pedido.objects.filter(estado='pagado').get()
+        Pedido.objects.filter(pk=pedido.pk).update(fecha=timezone.make_aware(datetime.combine(ayer, time(23, 59))))
+        self.assertEqual(list(filtrar_pedidos(desde=ayer, hasta=ayer).values_list('id', flat=True)), [pedido.id])
+        self.assertFalse(filtrar_pedidos(desde=ayer + timedelta(days=1)).filter(pk=pedido.pk).exists())
+        self.assertNotIn('cast_date', str(filtrar_pedidos(desde=ayer, hasta=ayer).query).lower())
+
+    def test_accion_admin_streaming(self):
+        """La acción del admin devuelve el export en streaming"""
+        admin = User.objects.create_superuser(username='admin', password=None, email='admin@test.com')
+        self.client.force_login(admin)
+        response = self.client.post(reverse('admin:SkateApp_pedido_changelist'), {
+            'action': 'exportar_csv',
+            '_selected_action': list(Pedido.objects.values_list('id', flat=True)),
+        })
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 7)
+
+
+class LimiteLoginTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_ventana_se_renueva(self):
+        """Admite la capacidad por ventana, rechaza el resto y se renueva con la ventana siguiente"""
+        limite = LimiteIntentos('prueba', capacidad=2, por_minuto=60)  # ventana de 2 s
+        self.assertEqual([limite.consumir('x', ahora=100)[0] for _ in range(3)], [True, True, False])
+        self.assertEqual(limite.consumir('x', ahora=101), (False, 1))
+        self.assertTrue(limite.consumir('x', ahora=102.5)[0])
+
+    def test_rafaga_no_supera_la_capacidad(self):
+        """Con la clave ya leída por otros, incr sigue contando cada intento (sin get/set)"""
+        limite = LimiteIntentos('prueba', capacidad=3, por_minuto=60)
+        with mock.patch('SkateApp.limites.cache.set', side_effect=AssertionError):
+            resultados = [limite.consumir('x', ahora=100)[0] for _ in range(10)]
+        self.assertEqual(resultados.count(True), 3)
+
+    @override_settings(IP_CABECERA='X-Forwarded-For', IP_PROXIES_CONFIABLES=1)
+    def test_ip_detras_del_proxy(self):
+        """Se usa la entrada que añadió el proxy propio, no las que manda el cliente"""
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1', HTTP_X_FORWARDED_FOR='1.1.1.1, 203.0.113.9')
+        self.assertEqual(ip_cliente(request), '203.0.113.9')
+        self.assertEqual(ip_cliente(RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')), '10.0.0.1')
+
+    def test_rechaza_antes_de_autenticar(self):
+        """Superado el límite por usuario se responde 429 sin llamar a authenticate"""
+        url = reverse('SkateApp:iniciar_sesion')
+        with mock.patch('SkateApp.views.authenticate', return_value=None) as autenticar:
+            for _ in range(5):
+                self.client.post(url, {'username': 'Victima', 'password': 'x'})
+            response = self.client.post(url, {'username': 'victima ', 'password': 'x'})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(autenticar.call_count, 5)
+
+
+class SesionesTests(TestCase):
+    def setUp(self):
+        self.producto = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=50, descripcion='-')
+
+    def escrituras_de_sesion(self, url, datos):
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.post(url, datos)
+        return [q['sql'] for q in consultas.captured_queries
+                if 'django_session' in q['sql'] and not q['sql'].startswith('SELECT')]
+
+    def test_no_reescribe_sesion_sin_cambios(self):
+        """Marcar la sesión como modificada sin cambiar el carrito no escribe en la base de datos"""
+        self.client.get(reverse('SkateApp:gestionar_carrito', args=[self.producto.id]))
+        url = reverse('SkateApp:actualizar_cantidad', args=[self.producto.id])
+        self.assertTrue(self.escrituras_de_sesion(url, {'cantidad': 3}))
+        self.assertEqual(self.escrituras_de_sesion(url, {'cantidad': 3}), [])
+        self.assertEqual(self.client.session['carrito'][str(self.producto.id)]['cantidad'], 3)
+
+    def test_sin_cambios_el_vencimiento_guardado_cubre_la_cookie(self):
+        """Omitir la escritura no deja que la sesión venza en el servidor antes que la cookie"""
+        self.client.get(reverse('SkateApp:gestionar_carrito', args=[self.producto.id]))
+        url = reverse('SkateApp:actualizar_cantidad', args=[self.producto.id])
+        self.client.post(url, {'cantidad': 3})
+        clave = self.client.session.session_key
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(minutes=10)):
+            self.assertEqual(self.escrituras_de_sesion(url, {'cantidad': 3}), [])
+            cookie = timezone.now() + timedelta(seconds=settings.SESSION_COOKIE_AGE)
+            self.assertGreaterEqual(Session.objects.get(session_key=clave).expire_date, cookie)
+
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timedelta(hours=2)):
+            self.assertTrue(self.escrituras_de_sesion(url, {'cantidad': 3}))
+            cookie = timezone.now() + timedelta(seconds=settings.SESSION_COOKIE_AGE)
+            self.assertGreaterEqual(Session.objects.get(session_key=clave).expire_date, cookie)
+
+    def test_limpieza_por_lotes(self):
+        """Borra solo las sesiones vencidas, en varios DELETE acotados"""
+        ahora = timezone.now()
+        for i in range(5):
+            Session.objects.create(session_key=f'vencida{i}', session_data='', expire_date=ahora - timedelta(days=1))
+        Session.objects.create(session_key='vigente', session_data='', expire_date=ahora + timedelta(days=1))
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(borrar_expiradas(tamano_lote=2), 5)
+        self.assertEqual(sum(q['sql'].startswith('DELETE') for q in consultas.captured_queries), 3)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['vigente'])
+
+
+class ConfiguracionTests(TestCase):
+    def test_informa_configuracion_efectiva(self):
+        """Fuera de producción solo se informa la configuración"""
+        mensajes = revisar_configuracion()
+        self.assertEqual([m.id for m in mensajes], ['SkateApp.I001'])
+        self.assertIn('CONN_MAX_AGE=', mensajes[0].msg)
+
+    @override_settings(ENTORNO='prod', DEBUG=True, SECRET_KEY='clave-propia-de-produccion')
+    def test_advierte_en_produccion(self):
+        """En producción advierte conexiones no persistentes, caché local y DEBUG"""
+        ids = [m.id for m in revisar_configuracion()]
+        self.assertEqual(ids, ['SkateApp.I001', 'SkateApp.W001', 'SkateApp.W004', 'SkateApp.W005'])
+
+    @override_settings(ENTORNO='prod')
+    def test_error_con_clave_de_desarrollo_en_produccion(self):
+        """En producción la clave de desarrollo del repositorio es un error"""
+        self.assertIn('SkateApp.E001', [m.id for m in revisar_configuracion()])
+
+    def test_produccion_sin_clave_no_arranca(self):
+        """Cargar los settings de producción sin DJANGO_SECRET_KEY falla"""
+        entorno = {k: v for k, v in os.environ.items() if k != 'DJANGO_SECRET_KEY'}
+        entorno['SKATESHOP_ENTORNO'] = 'prod'
+        resultado = subprocess.run(
+            [sys.executable, '-c', 'import AppSkate.settings'],
+            cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True,
+        )
+        self.assertNotEqual(resultado.returncode, 0)
+        self.assertIn('DJANGO_SECRET_KEY', resultado.stderr)
+
+
+def escaneos_completos(sql):
+    """Tablas que el plan (EXPLAIN) de la consulta recorre completas, sin usar índices."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN FORMAT=JSON ' + sql)
+            plan = json.loads(cursor.fetchone()[0])
+            return [t['table_name'] for t in _tablas_plan_mysql(plan) if t.get('access_type') == 'ALL']
+        if connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql)
+            lineas = [fila[0] for fila in cursor.fetchall()]
+            return [l.split('Seq Scan on ', 1)[1].split()[0].strip('"') for l in lineas if 'Seq Scan on ' in l]
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        lineas = [fila[-1] for fila in cursor.fetchall()]
+    # SQLite: "SCAN tabla" sin "USING ... INDEX" es un recorrido completo
+    return [l.split()[1] for l in lineas if l.startswith('SCAN ') and 'INDEX' not in l]
+
+
+def _tablas_plan_mysql(nodo):
+    if isinstance(nodo, dict):
+        if 'table_name' in nodo:
+            yield nodo
+        for valor in nodo.values():
+            yield from _tablas_plan_mysql(valor)
+    elif isinstance(nodo, list):
+        for valor in nodo:
+            yield from _tablas_plan_mysql(valor)
+
+
+class PlanesConsultaTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        clientes = User.objects.bulk_create([User(username=f'cliente{i}') for i in range(20)])
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i:03}', precio=1000 + i, stock=i % 4, descripcion='-') for i in range(60)
+        ])
+        Pedido.objects.bulk_create([Pedido(usuario=clientes[i % 20], total=1000) for i in range(100)])
+        posts = Post.objects.bulk_create([
+            Post(usuario=clientes[i % 20], titulo=f'Post {i}', contenido='-', estado='publicado' if i % 3 else 'borrador')
+            for i in range(30)
+        ])
+        Comentario.objects.bulk_create([Comentario(post=posts[i % 30], usuario=clientes[i % 20], texto='-') for i in range(90)])
+        Reseña.objects.bulk_create([
+            Reseña(usuario=clientes[i], producto=productos[j], texto='-', calificacion=5)
+            for i in range(20) for j in range(5)
+        ])
+        productos[0].categorias.add(Categoria.objects.create(nombre='Tablas', slug='tablas'))
+        cls.cliente, cls.producto, cls.post = clientes[0], productos[0], posts[0]
+
+    def test_consultas_principales_usan_indices(self):
+        """Las consultas que emite cada vista a su tabla principal no la recorren completa"""
+        rutas = {
+            'home': (reverse('SkateApp:home'), Post),
+            'catalogo': (reverse('SkateApp:catalogo'), Producto),
+            'detalle_producto': (reverse('SkateApp:detalle_producto', args=[self.producto.id]), Reseña),
+            'panel_usuario': (reverse('SkateApp:panel_usuario'), Pedido),
+            'comunidad': (reverse('SkateApp:comunidad'), Comentario),
+        }
+        self.client.force_login(self.cliente)
+        for vista, (url, modelo) in rutas.items():
+            with self.subTest(vista=vista):
+                with CaptureQueriesContext(connection) as consultas:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                tabla = modelo._meta.db_table
+                desde = f'FROM {connection.ops.quote_name(tabla)}'
+                sqls = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('SELECT') and desde in q['sql']]
+                self.assertTrue(sqls, f"{vista} no consultó {tabla}")
+                for sql in sqls:
+                    self.assertNotIn(tabla, escaneos_completos(sql), sql)
+
+    def test_una_resena_por_cliente_y_producto(self):
+        """La base de datos rechaza una segunda reseña del mismo cliente al mismo producto"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Reseña.objects.create(usuario=self.cliente, producto=self.producto, texto='otra', calificacion=1)
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Recorre todas las rutas de SkateApp con datos de volumen realista (ver presupuestos.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        categorias = Categoria.objects.bulk_create([Categoria(nombre=f'Categoria {i}', slug=f'categoria-{i}') for i in range(10)])
+        direcciones = Direccion.objects.bulk_create([Direccion(calle=f'Calle {i}', comuna='Santiago', region='RM') for i in range(30)])
+        clientes = User.objects.bulk_create([User(username=f'cliente{i}', direccion=direcciones[i]) for i in range(30)])
+        cls.admin = User.objects.create_superuser(username='admin', password=None, email='admin@test.com')
+        cls.productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i:03}', precio=1000 + i, stock=i % 6, descripcion='-') for i in range(60)
+        ])
+        Relacion = Producto.categorias.through
+        Relacion.objects.bulk_create([
+            Relacion(producto=p, categoria=categorias[(i + k) % 10]) for i, p in enumerate(cls.productos) for k in range(2)
+        ])
+        cls.cliente = clientes[0]
+        pedidos = Pedido.objects.bulk_create([
+            Pedido(usuario=clientes[0] if i % 2 else clientes[i % 30], total=3000, estado='pagado') for i in range(40)
+        ])
+        DetallePedido.objects.bulk_create([
+            DetallePedido(pedido=pedido, producto=cls.productos[k], cantidad=1, precio_unitario=1000)
+            for pedido in pedidos for k in range(3)
+        ])
+        posts = Post.objects.bulk_create([Post(usuario=clientes[i % 30], titulo=f'Post {i}', contenido='-') for i in range(30)])
+        Comentario.objects.bulk_create([Comentario(post=posts[i % 30], usuario=clientes[i % 30], texto='-') for i in range(90)])
+        Reseña.objects.bulk_create([
+            Reseña(usuario=c, producto=p, texto='-', calificacion=4) for c in clientes for p in cls.productos[:10]
+        ])
+        Noticia.objects.bulk_create([Noticia(titulo=f'Noticia {i}', contenido='-') for i in range(5)])
+        cls.argumentos = {
+            'producto_id': cls.productos[0].id,
+            'categoria_slug': categorias[0].slug,
+            'pedido_id': pedidos[1].id,
+            'post_id': posts[0].id,
+            'categoria_id': categorias[0].id,
+            'user_id': cls.cliente.id,
+            'version': 1,
+        }
+
+    def cliente_http(self, usuario):
+        cliente = Client()
+        if usuario:
+            cliente.force_login(usuario)
+            sesion = cliente.session
+            sesion['carrito'] = {
+                str(p.id): {'cantidad': 1, 'precio': float(p.precio), 'nombre': p.nombre, 'imagen': None}
+                for p in self.productos[:5]
+            }
+            sesion.save()
+        return cliente
+
+    def test_rutas_dentro_del_presupuesto(self):
+        """Ninguna ruta supera el máximo de consultas declarado en su vista"""
+        roles = {'anonimo': None, 'cliente': self.cliente, 'superusuario': self.admin}
+        for patron in urls_skateapp.urlpatterns:
+            url = reverse(f'SkateApp:{patron.name}', kwargs={k: self.argumentos[k] for k in patron.pattern.converters})
+            maximo = getattr(resolve(url).func, 'presupuesto_consultas', None)
+            for rol, usuario in roles.items():
+                with self.subTest(ruta=patron.name, rol=rol):
+                    self.assertIsNotNone(maximo, f"{patron.name} no declara @presupuesto_consultas")
+                    cliente = self.cliente_http(usuario)
+                    # iniciar_pago_webpay no debe salir a la red durante los tests
+                    with mock.patch('SkateApp.views.Transaction'), CaptureQueriesContext(connection) as consultas:
+                        response = cliente.get(url)
+                    self.assertLess(response.status_code, 500)
+                    self.assertLessEqual(
+                        len(consultas), maximo,
+                        "\n".join(q['sql'] for q in consultas.captured_queries),
+                    )
+
+
+class SeedSkateshopTests(TestCase):
+    def sembrar(self):
+        call_command(
+            'seed_skateshop', semilla=7, usuarios=20, categorias=5, productos=30, pedidos=60,
+            resenas=40, posts=10, comentarios=30, lote=25, stdout=io.StringIO(),
+        )
+        return list(Pedido.objects.order_by('id').values_list('usuario__username', 'fecha', 'estado', 'total'))
+
+    def test_datos_reproducibles_y_consistentes(self):
+        """La misma semilla genera los mismos datos, con campos normalizados y totales coherentes"""
+        primera = self.sembrar()
+        Pedido.objects.all().delete()
+        Reseña.objects.all().delete()
+        Post.objects.all().delete()
+        Producto.objects.all().delete()
+        Categoria.objects.all().delete()
+        User.objects.all().delete()
+        self.assertEqual(self.sembrar(), primera)
+
+        self.assertEqual(User.objects.filter(username_normalizado='').count(), 0)
+        self.assertEqual(Reseña.objects.count(), 40)
+        pedido = Pedido.objects.prefetch_related('detalles').first()
+        self.assertEqual(pedido.total, sum(d.cantidad * d.precio_unitario for d in pedido.detalles.all()) + 3990)
+        self.assertGreater(len({p.fecha.date() for p in Pedido.objects.all()}), 1)
+
+    def test_resenas_saturadas_terminan(self):
+        """Con más reseñas pedidas que pares cliente-producto libres se crean solo las posibles"""
+        opciones = dict(
+            semilla=3, usuarios=4, categorias=2, productos=5, pedidos=5, resenas=100,
+            posts=1, comentarios=1, lote=7, stdout=io.StringIO(),
+        )
+        call_command('seed_skateshop', **opciones)
+        self.assertEqual(Reseña.objects.count(), 20)
+
+        # Con los mismos clientes y productos ya no quedan pares libres
+        comando = SeedCommand(stdout=io.StringIO())
+        comando.rng, comando.lote = random.Random(1), 7
+        comando.fin, comando.segundos = timezone.now(), 86400
+        usuarios = list(User.objects.values_list('id', flat=True))
+        productos = list(Producto.objects.values_list('id', flat=True))
+        comando.crear_resenas(10, usuarios, productos)
+        self.assertEqual(Reseña.objects.count(), 20)
+
+
+class BenchmarkRutasTests(TestCase):
+    def test_medicion_desglosa_sql_plantilla_y_vista(self):
+        """Las tres partes suman el total y las consultas se cuentan"""
+        Producto.objects.create(nombre='Tabla Element', precio=40000, stock=5, descripcion='-')
+        with Medicion() as m:
+            self.client.get(reverse('SkateApp:catalogo'))
+        self.assertGreaterEqual(m.consultas, 2)
+        self.assertGreater(m.plantilla_ms, 0)
+        self.assertAlmostEqual(m.sql_ms + m.plantilla_ms + m.vista_ms, m.total_ms, places=3)
+
+    def test_comparar_detecta_regresiones(self):
+        """Se reportan aumentos de p95, consultas y bytes sobre los umbrales"""
+        base = {'home@anonimo': {'p95_ms': 10.0, 'consultas': 5, 'bytes': 1000}}
+        ruido = {'home@anonimo': {'p95_ms': 11.0, 'consultas': 5, 'bytes': 1050}}
+        peor = {'home@anonimo': {'p95_ms': 20.0, 'consultas': 9, 'bytes': 2000}}
+        self.assertEqual(comparar(ruido, base, 0.2, 2.0, 0, 0.1), [])
+        self.assertEqual(len(comparar(peor, base, 0.2, 2.0, 0, 0.1)), 3)
+
+    def test_comando_escribe_resultados(self):
+        """El comando mide contra la base sembrada y guarda el JSON"""
+        call_command('seed_skateshop', usuarios=5, categorias=2, productos=5, pedidos=5,
+                     resenas=3, posts=2, comentarios=2, stdout=io.StringIO())
+        with tempfile.NamedTemporaryFile(suffix='.json') as salida:
+            call_command('benchmark_rutas', rutas=['home', 'panel_usuario'], roles=['cliente'],
+                         repeticiones=2, calentamiento=0, salida=salida.name, stdout=io.StringIO(), stderr=io.StringIO())
+            with open(salida.name, encoding='utf-8') as archivo:
+                resultados = json.load(archivo)['resultados']
+        self.assertEqual(set(resultados), {'home@cliente', 'panel_usuario@cliente'})
+        self.assertEqual(resultados['panel_usuario@cliente']['estado'], 200)
+
+    def test_comando_no_cuenta_en_metricas(self):
+        """Las mediciones no suman peticiones ni dejan archivo de métricas"""
+        call_command('seed_skateshop', usuarios=5, categorias=2, productos=5, pedidos=5,
+                     resenas=3, posts=2, comentarios=2, stdout=io.StringIO())
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, ignore_errors=True)
+        antes = metricas.registro.agregar(None).get('skateshop_peticiones_total', {})
+        with override_settings(METRICAS_DIRECTORIO=directorio, METRICAS_INTERVALO=0):
+            call_command('benchmark_rutas', rutas=['home'], roles=['anonimo'], repeticiones=2, calentamiento=1,
+                         stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(metricas.registro.agregar(None).get('skateshop_peticiones_total', {}), antes)
+        self.assertEqual(os.listdir(directorio), [])
+
+
+class MedicionMiddlewareTests(TestCase):
+    def test_cabecera_server_timing(self):
+        """Cada respuesta informa tiempos de SQL, plantilla y vista"""
+        response = self.client.get(reverse('SkateApp:catalogo'))
+        self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="\d+ consultas", tpl;dur=[\d.]+, vista;dur=')
+
+    def test_perfil_muestreado_y_reporte(self):
+        """Con muestreo se guarda un perfil por petición y el comando los agrega"""
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio)
+        with override_settings(PERFIL_MUESTREO=1.0, PERFIL_DIRECTORIO=directorio):
+            self.client.get(reverse('SkateApp:catalogo'))
+            self.client.get(reverse('SkateApp:comunidad'))
+
+        salida = io.StringIO()
+        call_command('reporte_perfiles', directorio=directorio, ruta='SkateApp:catalogo', filtro='views', stdout=salida)
+        self.assertIn('1 perfiles: SkateApp_catalogo (1)', salida.getvalue())
+        self.assertIn('catalogo', salida.getvalue())
+
+        call_command('reporte_perfiles', directorio=directorio, borrar=True, stdout=io.StringIO())
+        self.assertEqual(os.listdir(directorio), [])
+
+
+class DetectorNMasUnoTests(TestCase):
+    def setUp(self):
+        self.productos = [
+            Producto.objects.create(nombre=f'Producto {i}', precio=1000, stock=5, descripcion='-') for i in range(8)
+        ]
+
+    def test_forma_colapsa_listas_in(self):
+        """Consultas que solo difieren en el largo de un IN tienen la misma forma"""
+        self.assertEqual(forma_sql('SELECT * FROM t WHERE id IN (%s, %s)'), forma_sql('SELECT * FROM t WHERE id IN (%s)'))
+
+    def test_reporta_forma_repetida_con_origen(self):
+        """Un acceso perezoso por fila se reporta con la línea que lo disparó"""
+        with detectar_n_mas_uno(umbral=5) as detector:
+            for producto in Producto.objects.all():
+                producto.categorias.count()
+        (forma, veces, origen), = detector.repetidas()
+        self.assertEqual(veces, 8)
+        self.assertIn('SkateApp/tests.py', origen)
+
+        with detectar_n_mas_uno(umbral=5) as detector, ignorar_n_mas_uno():
+            for producto in Producto.objects.all():
+                producto.categorias.count()
+        self.assertEqual(detector.repetidas(), [])
+
+    def test_middleware_falla_en_tests(self):
+        """En el entorno de tests una petición con N+1 lanza ConsultasRepetidas"""
+        def vista_con_n_mas_uno(request):
+            from django.http import HttpResponse
+            return HttpResponse(str(sum(p.reseñas.count() for p in Producto.objects.all())))
+
+        from AppSkate.middleware import NMasUnoMiddleware
+        with override_settings(N_MAS_UNO='error', N_MAS_UNO_UMBRAL=5):
+            middleware = NMasUnoMiddleware(vista_con_n_mas_uno)
+            with self.assertRaises(ConsultasRepetidas) as error:
+                middleware(RequestFactory().get('/catalogo/'))
+        self.assertIn('GET /catalogo/', str(error.exception))
+
+    def test_falla_con_manage_test_en_cualquier_perfil(self):
+        """`manage.py test` activa el modo 'error' aunque el perfil sea dev"""
+        entorno = {k: v for k, v in os.environ.items() if k not in ('SKATESHOP_ENTORNO', 'N_MAS_UNO')}
+        resultado = subprocess.run(
+            [sys.executable, '-c', 'import AppSkate.settings as s; print(s.N_MAS_UNO)', 'test'],
+            cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True,
+        )
+        self.assertEqual(resultado.stdout.strip(), 'error')
+
+
+class MetricasTests(TestCase):
+    def setUp(self):
+        metricas.registro.reiniciar()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+
+    def test_formato_prometheus(self):
+        """Contadores y cubetas acumuladas del histograma en formato de texto"""
+        contador = metricas.contador('prueba_eventos_total', 'Eventos.', etiquetas=('tipo',))
+        histograma = metricas.histograma('prueba_segundos', 'Duración.', cubetas=(0.1, 1))
+        contador.inc(tipo='a')
+        contador.inc(2, tipo='a')
+        for valor in (0.05, 0.5, 3):
+            histograma.observar(valor)
+
+        texto = metricas.registro.exponer(self.directorio)
+        self.assertIn('# TYPE prueba_eventos_total counter', texto)
+        self.assertIn('prueba_eventos_total{tipo="a"} 3', texto)
+        self.assertIn('prueba_segundos_bucket{le="0.1"} 1', texto)
+        self.assertIn('prueba_segundos_bucket{le="1"} 2', texto)
+        self.assertIn('prueba_segundos_bucket{le="+Inf"} 3', texto)
+        self.assertIn('prueba_segundos_count 3', texto)
+
+    def test_suma_los_archivos_de_otros_procesos(self):
+        """Los totales volcados por otros workers se suman a los del proceso actual"""
+        otro = metricas.Registro()
+        otro.obtener(metricas.Contador, 'prueba_eventos_total', 'Eventos.', ('tipo',)).inc(5, tipo='a')
+        otro.obtener(metricas.Histograma, 'prueba_segundos', 'Duración.', cubetas=(0.1, 1)).observar(0.05)
+        otro._proceso = (os.getpid(), os.path.join(self.directorio, 'otro.json'))
+        otro.volcar(self.directorio)
+
+        metricas.contador('prueba_eventos_total', 'Eventos.', etiquetas=('tipo',)).inc(tipo='a')
+        metricas.registro.volcar(self.directorio)
+        totales = metricas.registro.agregar(self.directorio)
+        self.assertEqual(totales['prueba_eventos_total'][('a',)], 6)
+        self.assertEqual(totales['prueba_segundos'][()][2], 1)
+
+    def test_archivos_de_procesos_terminados_se_compactan(self):
+        """Lo de los workers que ya no existen se suma en un archivo y sus archivos se borran"""
+        metricas.contador('prueba_eventos_total', 'Eventos.', etiquetas=('tipo',))
+        terminado = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'], capture_output=True, text=True)
+        pid = int(terminado.stdout)
+        for i, valor in enumerate((2, 3)):
+            with open(os.path.join(self.directorio, f'{pid}-0000000{i}.json'), 'w') as f:
+                json.dump({'prueba_eventos_total': [[['a'], valor]]}, f)
+
+        self.assertEqual(metricas.registro.agregar(self.directorio)['prueba_eventos_total'][('a',)], 5)
+        self.assertEqual(os.listdir(self.directorio), [metricas.TERMINADOS])
+        self.assertEqual(metricas.registro.agregar(self.directorio)['prueba_eventos_total'][('a',)], 5)
+
+    def test_sin_peticiones_no_deja_archivo_al_salir(self):
+        """Un proceso que no sirvió peticiones (p. ej. manage.py) no escribe al terminar"""
+        registro = metricas.Registro()
+        registro.obtener(metricas.Contador, 'prueba_eventos_total', 'Eventos.').inc()
+        with override_settings(METRICAS_DIRECTORIO=self.directorio):
+            registro.volcar_al_salir()
+            self.assertEqual(os.listdir(self.directorio), [])
+            registro.volcar()
+            registro.volcar_al_salir()
+        self.assertEqual(len(os.listdir(self.directorio)), 1)
+
+    def test_endpoint_protegido(self):
+        """/metrics exige el token del scraper o un superusuario"""
+        self.client.get(reverse('SkateApp:catalogo'))
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+
+        with override_settings(METRICAS_TOKEN='secreto'):
+            self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer otro').status_code, 401)
+            respuesta = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(
+            'skateshop_peticiones_total{vista="SkateApp:catalogo",metodo="GET",estado="200"} 1',
+            respuesta.content.decode(),
+        )
+
+        admin = get_user_model().objects.create_superuser('admin_metricas', 'a@a.cl', None)
+        self.client.force_login(admin)
+        self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+@skipUnless('replica' in settings.DATABASES, "sin base 'replica' configurada (perfil test o DB_REPLICA_SQLITE)")
+@override_settings(BASES_REPLICA=['replica'])
+class ReplicasTests(TestCase):
+    """Dos SQLite independientes: lo que se lee de la réplica no existe en la primaria."""
+    # El runner junta las bases de todas las clases, también de las saltadas
+    databases = {'default', 'replica'} & set(settings.DATABASES)
+
+    def setUp(self):
+        Producto.objects.create(nombre='Tabla primaria', precio=1000, stock=5, descripcion='-')
+        Producto.objects.using('replica').create(nombre='Tabla replica', precio=1000, stock=5, descripcion='-')
+        self.usuario = get_user_model().objects.create_user('lector', 'l@l.cl', None)
+
+    def test_vistas_de_lectura_usan_la_replica(self):
+        """El catálogo lee de la réplica; las vistas sin marcar, de la primaria"""
+        contenido = self.client.get(reverse('SkateApp:catalogo')).content.decode()
+        self.assertIn('Tabla replica', contenido)
+        self.assertNotIn('Tabla primaria', contenido)
+
+        self.client.force_login(self.usuario)
+        self.assertEqual(self.client.get(reverse('SkateApp:panel_usuario')).status_code, 200)
+
+    @override_settings(PAGINAS_CACHE_SEGUNDOS=300)
+    def test_pagina_para_la_cache_sale_de_la_primaria(self):
+        """Lo que se guarda en la caché compartida no se lee de una réplica atrasada"""
+        cache.clear()
+        contenido = self.client.get(reverse('SkateApp:catalogo')).content.decode()
+        self.assertIn('Tabla primaria', contenido)
+        self.assertNotIn('Tabla replica', contenido)
+
+    def test_fija_la_primaria_tras_escribir(self):
+        """Después de escribir, el mismo cliente lee sus cambios desde la primaria"""
+        post = Post.objects.create(usuario=self.usuario, titulo='Sesión', contenido='-', estado='publicado')
+        self.client.force_login(self.usuario)
+        respuesta = self.client.post(reverse('SkateApp:agregar_comentario', args=[post.id]), {'contenido': 'Buena'})
+        self.assertIn(COOKIE_PRIMARIA, respuesta.cookies)
+
+        contenido = self.client.get(reverse('SkateApp:catalogo')).content.decode()
+        self.assertIn('Tabla primaria', contenido)
+
+    def test_transacciones_y_bloqueos_van_a_la_primaria(self):
+        """Dentro de atomic(), con select_for_update y para sesiones no se usa la réplica"""
+        bases = {}
+
+        @lee_de_replica
+        def vista(request):
+            bases['lectura'] = Producto.objects.all().db
+            bases['bloqueo'] = Producto.objects.select_for_update().db
+            bases['sesion'] = Session.objects.all().db
+            with transaction.atomic():
+                bases['transaccion'] = Producto.objects.all().db
+
+        from django.test import RequestFactory
+        vista(RequestFactory().get('/'))
+        self.assertEqual(bases, {'lectura': 'replica', 'bloqueo': 'default', 'sesion': 'default', 'transaccion': 'default'})
+
+
+class ArchivoPedidosTests(TestCase):
+    def setUp(self):
+        self.cliente = User.objects.create_user(username='cliente', password=None)
+        self.tablas = Categoria.objects.create(nombre='Tablas', slug='tablas')
+        self.producto = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=50, descripcion='-')
+        self.producto.categorias.add(self.tablas)
+        self.hace_dos_anios = timezone.now() - timedelta(days=730)
+
+    def crear_pedido(self, estado, fecha, cantidad=2):
+        pedido = Pedido.objects.create(usuario=self.cliente, total=40000 * cantidad + 5000, estado=estado)
+        DetallePedido.objects.create(pedido=pedido, producto=self.producto, cantidad=cantidad, precio_unitario=40000)
+        Pedido.objects.filter(pk=pedido.pk).update(fecha=fecha, contabilizado=estado != 'pendiente')
+        return pedido
+
+    def test_restar_meses(self):
+        """El día se recorta al último del mes de destino"""
+        self.assertEqual(restar_meses(timezone.datetime(2024, 3, 31), 1), timezone.datetime(2024, 2, 29))
+        self.assertEqual(restar_meses(timezone.datetime(2024, 1, 15), 13), timezone.datetime(2022, 12, 15))
+
+    def test_archiva_solo_entregados_antiguos(self):
+        """Los entregados antiguos pasan al historial con sus líneas en JSON; el resto se queda"""
+        viejo = self.crear_pedido('entregado', self.hace_dos_anios)
+        pendiente = self.crear_pedido('pendiente', self.hace_dos_anios)
+        reciente = self.crear_pedido('entregado', timezone.now())
+
+        self.assertEqual(archivar_pedidos(restar_meses(timezone.now(), 12), tamano_lote=1), 1)
+        self.assertEqual(set(Pedido.objects.values_list('id', flat=True)), {pendiente.id, reciente.id})
+        self.assertFalse(DetallePedido.objects.filter(pedido_id=viejo.id).exists())
+        historico = PedidoHistorico.objects.get(id=viejo.id)
+        self.assertEqual(historico.detalles, [[self.producto.id, 2, '40000.00', 'Tabla Element']])
+
+    def test_resumenes_incluyen_archivados(self):
+        """Recalcular los resúmenes después de archivar da los mismos totales"""
+        self.crear_pedido('entregado', self.hace_dos_anios, cantidad=3)
+        dia = timezone.localtime(self.hace_dos_anios).date()
+        recalcular_historial(dia, dia + timedelta(days=1))
+        antes = list(VentaCategoriaDia.objects.values('fecha', 'categoria_id', 'unidades', 'ingresos'))
+
+        archivar_pedidos(restar_meses(timezone.now(), 12))
+        recalcular_historial(dia, dia + timedelta(days=1))
+        self.assertEqual(list(VentaCategoriaDia.objects.values('fecha', 'categoria_id', 'unidades', 'ingresos')), antes)
+        self.assertEqual(VentaDia.objects.get().pedidos, 1)
+
+    def test_panel_y_admin_leen_ambas_tablas(self):
+        """El cliente ve sus pedidos archivados y los enlaces antiguos del admin siguen funcionando"""
+        viejo = self.crear_pedido('entregado', self.hace_dos_anios)
+        reciente = self.crear_pedido('pagado', timezone.now())
+        archivar_pedidos(restar_meses(timezone.now(), 12))
+
+        self.client.force_login(self.cliente)
+        respuesta = self.client.get(reverse('SkateApp:panel_usuario'))
+        self.assertEqual([p.id for p in respuesta.context['pedidos']], [reciente.id, viejo.id])
+        self.assertEqual(self.client.get(reverse('SkateApp:compra_exitosa', args=[viejo.id])).status_code, 200)
+
+        admin = User.objects.create_superuser('admin_archivo', 'a@a.cl', None)
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('admin:SkateApp_pedido_change', args=[viejo.id]))
+        self.assertRedirects(respuesta, reverse('admin:SkateApp_pedidohistorico_change', args=[viejo.id]))
+        self.assertContains(self.client.get(respuesta.url), 'Tabla Element')
+        self.assertEqual(self.client.get(reverse('admin:SkateApp_pedidohistorico_changelist')).status_code, 200)
+
+
+class CategoriasTests(TestCase):
+    def setUp(self):
+        Categoria.objects.create(nombre='Tablas', slug='tablas')
+        Categoria.objects.create(nombre='Tablas pro', slug='tablas-1')
+
+    def test_slug_con_una_consulta(self):
+        """El slug libre se calcula con una sola lectura, sin importar las colisiones"""
+        categoria = Categoria(nombre='Tablas!')
+        with self.assertNumQueries(2):  # slugs existentes + INSERT
+            categoria.save()
+        self.assertEqual(categoria.slug, 'tablas-2')
+
+    def test_nombre_unico_sin_mayusculas(self):
+        """La base de datos rechaza el duplicado y el formulario lo informa"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Categoria.objects.create(nombre='TABLAS')
+        form = CategoriaForm({'nombre': 'tablas'})
+        self.assertFalse(form.is_valid())
+        self.assertIn("Ya existe una categoría con ese nombre.", str(form.errors))
+
+    def test_migracion_renombra_sin_chocar_ni_exceder_el_largo(self):
+        """El sufijo de los duplicados salta los nombres ocupados y respeta max_length"""
+        migracion = importlib.import_module('SkateApp.migrations.0016_categoria_nombre_unico_ci')
+        self.assertEqual(migracion.nombre_libre('Tablas', {'tablas', 'tablas (2)'}), 'Tablas (3)')
+        largo = 'x' * 100
+        ocupados = {f"{'x' * (100 - len(f' ({n})'))} ({n})" for n in range(2, 100)}
+        nombre = migracion.nombre_libre(largo, ocupados)
+        self.assertEqual(nombre, 'x' * 94 + ' (100)')
+        self.assertEqual(len(nombre), Categoria._meta.get_field('nombre').max_length)
+
+    def test_alta_masiva(self):
+        """El lote se valida completo y se inserta con un número fijo de consultas"""
+        with self.assertNumQueries(7):  # SAVEPOINT, existentes, slugs, SAVEPOINT, INSERT, RELEASE x2
+            creadas, errores = crear_categorias([f'Ruedas {i}' for i in range(50)])
+        self.assertEqual(len(creadas), 50)
+        self.assertEqual(errores, [])
+
+        creadas, errores = crear_categorias(['Lijas', 'LIJAS', ' ', 'tablas', 'Tablas?'])
+        self.assertEqual([(c.nombre, c.slug) for c in creadas], [('Lijas', 'lijas'), ('Tablas?', 'tablas-2')])
+        self.assertEqual([posicion for posicion, _ in errores], [2, 3, 4])
+
+    def test_choque_al_insertar_se_informa_por_fila(self):
+        """Un nombre que la lectura no detectó vuelve como error de su fila, sin abortar el lote"""
+        from . import categorias
+
+        def slugs_con_carrera(nombres, **kwargs):
+            # Otra petición crea 'LIJAS' entre la lectura de existentes y el INSERT
+            Categoria.objects.create(nombre='LIJAS')
+            return slugs_unicos(nombres, **kwargs)
+
+        with mock.patch.object(categorias, 'slugs_unicos', slugs_con_carrera):
+            creadas, errores = crear_categorias(['Rodamientos', 'Lijas'])
+        self.assertEqual([c.nombre for c in creadas], ['Rodamientos'])
+        self.assertIsNotNone(creadas[0].pk)
+        self.assertEqual(errores, [(2, 'Ya existe una categoría llamada "Lijas".')])
+
+    def test_api(self):
+        """La API crea el lote y devuelve los errores por fila"""
+        admin = User.objects.create_superuser('admin_categorias', 'a@a.cl', None)
+        self.client.force_login(admin)
+        url = reverse('SkateApp:api_crear_categorias')
+        respuesta = self.client.post(url, {'categorias': ['Bujes', 'Tablas']}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['creadas'][0]['slug'], 'bujes')
+        self.assertEqual(respuesta.json()['errores'][0]['fila'], 2)
+        self.assertEqual(self.client.post(url, {'categorias': 'Bujes'}, content_type='application/json').status_code, 400)
+
+
+@override_settings(PAGINAS_CACHE_SEGUNDOS=300, PAGINAS_MAX_AGE=60)
+class PaginasCompartidasTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.producto = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=5, descripcion='-')
+        self.producto.categorias.add(Categoria.objects.create(nombre='Tablas', slug='tablas'))
+
+    def test_anonimo_desde_cache(self):
+        """La segunda visita anónima no toca la base de datos y el proxy puede guardarla"""
+        for url in (reverse('SkateApp:catalogo'), reverse('SkateApp:detalle_producto', args=[self.producto.id])):
+            primera = self.client.get(url)
+            self.assertContains(primera, 'data-fragmento=')
+            self.assertNotContains(primera, 'csrfmiddlewaretoken')
+            with self.assertNumQueries(0):
+                segunda = self.client.get(url)
+            self.assertEqual(segunda.content, primera.content)
+            self.assertIn('public', segunda['Cache-Control'])
+            self.assertIn('max-age=60', segunda['Cache-Control'])
+            self.assertIn('Cookie', segunda['Vary'])
+
+    def test_clave_solo_con_parametros_de_la_vista(self):
+        """Los parámetros que la vista no lee no crean páginas nuevas; `q` sí"""
+        url = reverse('SkateApp:catalogo')
+        self.client.get(url, {'q': 'Element'})
+        with self.assertNumQueries(0):
+            self.client.get(url, {'utm_source': 'correo', 'q': 'Element'})
+        Producto.objects.create(nombre='Ruedas Spitfire', precio=30000, stock=5, descripcion='-')
+        self.assertNotContains(self.client.get(url, {'q': 'Spitfire', 'pagina': '1'}), 'Tabla Element')
+
+    def test_cambio_de_catalogo_invalida(self):
+        """Un cambio en el catálogo genera páginas nuevas"""
+        self.client.get(reverse('SkateApp:catalogo'))
+        Producto.objects.create(nombre='Ruedas Spitfire', precio=30000, stock=5, descripcion='-')
+        invalidar_catalogo()
+        self.assertContains(self.client.get(reverse('SkateApp:catalogo')), 'Ruedas Spitfire')
+
+    def test_autenticado_sin_cache_compartida(self):
+        """Con sesión iniciada la página se genera para el usuario y es privada"""
+        self.client.get(reverse('SkateApp:catalogo'))
+        usuario = User.objects.create_superuser('admin_paginas', 'a@a.cl', None)
+        self.client.force_login(usuario)
+        respuesta = self.client.get(reverse('SkateApp:catalogo'))
+        self.assertContains(respuesta, 'Gestionar Tienda')
+        self.assertNotContains(respuesta, 'data-fragmento=')
+        self.assertIn('private', respuesta['Cache-Control'])
+
+    def test_fragmento_usuario(self):
+        """El fragmento trae la barra del usuario, el carrito y consume los mensajes"""
+        self.client.get(reverse('SkateApp:gestionar_carrito', args=[self.producto.id]))
+        self.client.get(reverse('SkateApp:gestionar_carrito', args=[self.producto.id]))
+        datos = self.client.get(reverse('SkateApp:fragmento_usuario')).json()
+        self.assertEqual(datos['carrito'], 2)
+        self.assertIn('agregado al carrito', datos['huecos']['mensajes'])
+        self.assertIn('Login', datos['huecos']['cuenta'])
+        self.assertEqual(datos['huecos']['admin'].strip(), '')
+        self.assertNotIn('agregado al carrito', self.client.get(reverse('SkateApp:fragmento_usuario')).json()['huecos']['mensajes'])
+
+
+class GetCondicionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.producto = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=5, descripcion='-')
+        self.producto.categorias.add(Categoria.objects.create(nombre='Tablas', slug='tablas'))
+        self.url = reverse('SkateApp:detalle_producto', args=[self.producto.id])
+
+    def test_304_con_etag(self):
+        """Con el mismo ETag responde 304 sin consultar la base de datos"""
+        for url in (reverse('SkateApp:catalogo'), self.url):
+            primera = self.client.get(url)
+            self.assertTrue(primera['ETag'].startswith('W/"catalogo-'))
+            self.assertIn('Last-Modified', primera)
+            with self.assertNumQueries(0):
+                respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+            self.assertEqual(respuesta.status_code, 304)
+
+    def test_cambio_de_producto(self):
+        """Editar el producto cambia el ETag y su Last-Modified"""
+        Producto.objects.filter(pk=self.producto.pk).update(actualizado=timezone.now() - timedelta(days=1))
+        primera = self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=primera['Last-Modified']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.producto.precio = 35000
+            self.producto.save()
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=primera['Last-Modified']).status_code, 200)
+
+    def test_resena_actualiza_producto(self):
+        """Una reseña nueva o borrada cuenta como modificación del producto"""
+        ayer = timezone.now() - timedelta(days=1)
+        Producto.objects.filter(pk=self.producto.pk).update(actualizado=ayer)
+        usuario = User.objects.create_user('cliente_condicional', 'c@c.cl', None)
+        resena = Reseña.objects.create(producto=self.producto, usuario=usuario, texto='Buena', calificacion=5)
+        self.producto.refresh_from_db()
+        self.assertGreater(self.producto.actualizado, ayer)
+
+        Producto.objects.filter(pk=self.producto.pk).update(actualizado=ayer)
+        resena.delete()
+        self.producto.refresh_from_db()
+        self.assertGreater(self.producto.actualizado, ayer)
+
+    def test_autenticado_sin_etag(self):
+        """Con sesión iniciada no hay ETag: la página depende del usuario"""
+        self.client.force_login(User.objects.create_user('cliente_etag', 'e@e.cl', None))
+        respuesta = self.client.get(reverse('SkateApp:catalogo'))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('ETag', respuesta)
+
+
+class InstantaneaCatalogoTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        ajustes = override_settings(INSTANTANEA_DIRECTORIO=self.directorio)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        tablas = Categoria.objects.create(nombre='Tablas', slug='tablas')
+        self.producto = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=5, descripcion='-')
+        self.producto.categorias.add(tablas)
+        Producto.objects.create(nombre='Ruedas Spitfire', precio=30000, stock=0, descripcion='-')
+        self.url = reverse('SkateApp:instantanea_catalogo', args=[version_catalogo()])
+
+    def test_se_genera_y_sirve_comprimida(self):
+        """La primera petición la genera; con gzip aceptado se sirve el .gz inmutable"""
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', respuesta['Cache-Control'])
+        self.assertIn('Accept-Encoding', respuesta['Vary'])
+        datos = json.loads(gzip.decompress(b''.join(respuesta.streaming_content)))
+        self.assertEqual(datos['categorias'], [{'slug': 'tablas', 'nombre': 'Tablas'}])
+        tabla, ruedas = sorted(datos['productos'], key=lambda p: p['nombre'], reverse=True)
+        self.assertEqual(tabla['categorias'], ['tablas'])
+        self.assertTrue(tabla['en_stock'])
+        self.assertFalse(ruedas['en_stock'])
+
+        with self.assertNumQueries(0):
+            plano = self.client.get(self.url)
+        self.assertNotIn('Content-Encoding', plano)
+        self.assertEqual(json.loads(b''.join(plano.streaming_content)), datos)
+
+    def test_busqueda_coincide_con_la_de_la_vista(self):
+        """Filtrar la instantánea como catalogo.html da los mismos productos que ?q= en el servidor"""
+        Producto.objects.create(nombre='Rodamientos Bones', precio=20000, stock=3, descripcion='Para tablas de calle')
+        Producto.objects.create(nombre='Lija Mob', precio=8000, stock=4, descripcion='Grip negro')
+        datos = instantanea.datos_catalogo(version_catalogo())
+        for q in ('tabla', 'GRIP', 'bones', 'spitfire'):
+            with self.subTest(q=q):
+                servidor = {p.id for p in self.client.get(reverse('SkateApp:catalogo'), {'q': q}).context['productos']}
+                navegador = {
+                    p['id'] for p in datos['productos']
+                    if p['en_stock'] and (q.lower() in p['nombre'].lower() or q.lower() in p['descripcion'].lower())
+                }
+                self.assertEqual(navegador, servidor)
+
+    def test_version_vieja_y_enlace_en_catalogo(self):
+        """El catálogo enlaza la versión actual; las pasadas que no existen dan 404"""
+        self.assertContains(self.client.get(reverse('SkateApp:catalogo')), f'data-instantanea="{self.url}"')
+        with mock.patch('SkateApp.instantanea.programar_instantanea'):
+            invalidar_catalogo()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_solo_quedan_las_ultimas_versiones(self):
+        """Al escribir una versión nueva se borran las más antiguas"""
+        with mock.patch('SkateApp.instantanea.programar_instantanea'):
+            for _ in range(instantanea.VERSIONES_GUARDADAS + 2):
+                instantanea.generar_instantanea()
+                invalidar_catalogo()
+        versiones = {nombre.split('.')[0] for nombre in os.listdir(self.directorio)}
+        self.assertEqual(len(versiones), instantanea.VERSIONES_GUARDADAS)
+
+
+class WarmCachesTests(TransactionTestCase):
+    # Las páginas se generan en otros hilos: necesitan ver datos ya confirmados
+    def setUp(self):
+        cache.clear()
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio, ignore_errors=True)
+        self.producto = Producto.objects.create(nombre='Tabla Element', precio=40000, stock=5, descripcion='-')
+        self.producto.categorias.add(Categoria.objects.create(nombre='Tablas', slug='tablas'))
+
+    @override_settings(PAGINAS_CACHE_SEGUNDOS=300)
+    def test_deja_paginas_en_cache(self):
+        """Tras el comando la portada, el catálogo y el detalle salen de la caché"""
+        salida = io.StringIO()
+        with override_settings(INSTANTANEA_DIRECTORIO=self.directorio):
+            call_command('warm_caches', hilos=2, stdout=salida, stderr=io.StringIO())
+        self.assertIn('5 tareas', salida.getvalue())
+        self.assertTrue(os.listdir(self.directorio))
+        for url in (
+            reverse('SkateApp:home'), reverse('SkateApp:catalogo'),
+            reverse('SkateApp:productos_por_categoria', args=['tablas']),
+            reverse('SkateApp:detalle_producto', args=[self.producto.id]),
+        ):
+            with self.subTest(url=url), self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_no_cuenta_en_metricas(self):
+        """El calentamiento no suma peticiones ni deja archivo de métricas"""
+        antes = metricas.registro.agregar(None).get('skateshop_peticiones_total', {})
+        with override_settings(METRICAS_DIRECTORIO=self.directorio, METRICAS_INTERVALO=0):
+            call_command('warm_caches', hilos=2, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(metricas.registro.agregar(None).get('skateshop_peticiones_total', {}), antes)
+        self.assertEqual(os.listdir(self.directorio), [])
+
+    def test_host_aceptado_por_la_aplicacion(self):
+        """Las peticiones internas usan un host de ALLOWED_HOSTS, no el 'testserver' de los tests"""
+        with override_settings(ALLOWED_HOSTS=['.skateshop.cl', 'www.skateshop.cl']):
+            self.assertEqual(host_por_defecto(), 'skateshop.cl')
+        with override_settings(ALLOWED_HOSTS=['*']):
+            self.assertEqual(host_por_defecto(), 'localhost')
+        with override_settings(ALLOWED_HOSTS=['tienda.local'], PAGINAS_CACHE_SEGUNDOS=300):
+            call_command('warm_caches', hilos=1, productos=0, categorias=0, stdout=io.StringIO(), stderr=io.StringIO())
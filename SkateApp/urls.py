@@ -9,11 +9,13 @@ urlpatterns = [
     
     # --- CATÁLOGO Y PRODUCTOS ---
     path('catalogo/', views.catalogo, name='catalogo'),
+    path('catalogo/instantanea/<int:version>.json', views.instantanea_catalogo, name='instantanea_catalogo'),
     path('catalogo/<slug:categoria_slug>/', views.catalogo, name='productos_por_categoria'),
     path('producto/<int:producto_id>/', views.detalle_producto, name='detalle_producto'),
 
     # --- CARRITO Y CHECKOUT ---
     path('carrito/', views.ver_carrito, name='ver_carrito'),
+    path('fragmento/usuario/', views.fragmento_usuario, name='fragmento_usuario'),
     path('carrito/add/<int:producto_id>/', views.gestionar_carrito, name='gestionar_carrito'),
     path('carrito/actualizar/<int:producto_id>/', views.actualizar_cantidad, name='actualizar_cantidad'),
     path('carrito/remove/<int:producto_id>/', views.eliminar_item_carrito, name='eliminar_item_carrito'),
@@ -46,6 +48,9 @@ urlpatterns = [
     path('administracion/gestionar-categorias/eliminar/<int:categoria_id>/', views.eliminar_categoria, name="eliminar_categoria"),
     path('administracion/agregar-producto/', views.agregar_producto, name='agregar_producto'),
     path('administracion/gestionar-procuctos/', views.gestionar_productos, name='gestionar_productos'),
+    path('administracion/ajuste-masivo/', views.ajuste_masivo, name='ajuste_masivo'),
+    path('administracion/api/ajuste-masivo/', views.api_ajuste_masivo, name='api_ajuste_masivo'),
+    path('administracion/api/categorias/', views.api_crear_categorias, name='api_crear_categorias'),
     path('producto/<int:producto_id>/editar/', views.editar_producto, name='editar_producto'),
     path('producto/<int:producto_id>/eliminar/', views.eliminar_producto, name='eliminar_producto'),
     path('comunidad/eliminar/<int:post_id>/', views.eliminar_post, name='eliminar_post'),
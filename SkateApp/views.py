@@ -1,14 +1,23 @@
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.urls import reverse
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
+from django.core.paginator import Paginator
 from django.views.decorators.csrf import csrf_exempt
-from django.db.models import Q, Avg
-from django.db import transaction
+from django.views.decorators.http import condition
+from django.db.models import Q, Avg, Count, Prefetch, Sum
+from django.utils import timezone
+from django.db import IntegrityError, connections, transaction
 from django.http import HttpRequest
+import json
+import os
 import random 
+from datetime import datetime, time, timedelta
 
 from transbank.webpay.webpay_plus.transaction import Transaction
 from transbank.common.options import WebpayOptions
@@ -16,16 +25,41 @@ from transbank.common.integration_type import IntegrationType
 from transbank.common.integration_commerce_codes import IntegrationCommerceCodes
 from transbank.common.integration_api_keys import IntegrationApiKeys
 
-from .models import Categoria, Producto, Post, Comentario, Pedido, DetallePedido, Reseña, Direccion, Usuario
+from .models import (
+    Categoria, Producto, Post, Comentario, Pedido, DetallePedido, Reseña, Direccion, Usuario,
+    VentaDia, VentaHora, VentaProductoDia, VentaCategoriaDia, normalizar_texto
+)
 from .forms import (
     CustomUserCreationForm, CustomUserChangeForm, ProductoForm, PostForm, 
     ComentarioForm, DireccionEnvioForm, ResenaForm, CategoriaForm
 )
+from .archivo import obtener_pedido, pedidos_de_usuario
+from .ajustes import ErrorAjuste, aplicar_ajustes, interpretar_lineas
+from .categorias import ErrorCategorias, crear_categorias
+from .cache_catalogo import version_catalogo
+from .instantanea import archivo_para, generar_instantanea, ruta_instantanea
+from .cache_paginas import (
+    HUECOS, cache_anonima, cantidad_carrito, etag_catalogo, modificado_catalogo, modificado_producto,
+)
+from .limites import login_exitoso, permitir_intento_login
+from .presupuestos import presupuesto_consultas
+from AppSkate import metricas
+from AppSkate.replicas import lee_de_replica
+
+CARRITO_AGREGADOS = metricas.contador('skateshop_carrito_agregados_total', 'Productos agregados al carrito.')
+PEDIDOS_CREADOS = metricas.contador('skateshop_pedidos_creados_total', 'Pedidos creados en el checkout.')
+PAGOS = metricas.contador('skateshop_pagos_total', 'Confirmaciones de pago Webpay por resultado.', etiquetas=('resultado',))
+LATENCIA_WEBPAY = metricas.histograma(
+    'skateshop_webpay_segundos', 'Duración de las llamadas a Webpay.', etiquetas=('operacion',),
+)
 
 # ======================================================================
 # VISTAS PÚBLICAS Y CATÁLOGO
 # ======================================================================
 
+@presupuesto_consultas(8)
+@cache_anonima(60)
+@lee_de_replica
 def home(request):
     categorias_con_productos = Producto.objects.filter(stock__gt=0).values_list('categorias',flat=True).distinct()
     categorias_destacadas = Categoria.objects.filter(id__in=categorias_con_productos).order_by('nombre')[:2]
@@ -38,7 +72,10 @@ def home(request):
             categorias_para_front.append({
                 'nombre': categoria.nombre,
                 'slug': categoria.slug,
-                'imagen_url':primer_producto.imagen.url if primer_producto.imagen else None
+                'imagen_url':primer_producto.imagen.url if primer_producto.imagen else None,
+                'imagen_ancho': primer_producto.imagen_ancho,
+                'imagen_alto': primer_producto.imagen_alto,
+                'imagen_placeholder': primer_producto.imagen_placeholder,
             })
     
     posts_destacados = Post.objects.filter(estado='publicado').order_by('-fecha')[:3]
@@ -50,6 +87,10 @@ def home(request):
     }
     return render(request, 'SkateApp/home.html', context)
 
+@presupuesto_consultas(4)
+@condition(etag_func=etag_catalogo, last_modified_func=modificado_catalogo)
+@cache_anonima(parametros=('q',))
+@lee_de_replica
 def catalogo(request, categoria_slug=None):
     categorias = Categoria.objects.all()
     productos = Producto.objects.filter(stock__gt=0).order_by('nombre') 
@@ -65,7 +106,10 @@ def catalogo(request, categoria_slug=None):
             Q(nombre__icontains=query) | Q(descripcion__icontains=query)
         ).distinct()
 
-    productos = productos.annotate(avg_calificacion=Avg('reseñas__calificacion'))
+    productos = productos.annotate(
+        avg_calificacion=Avg('reseñas__calificacion'),
+        num_resenas=Count('reseñas', distinct=True),
+    )
 
     context = {
         'categoria_actual': categoria_actual,
@@ -73,12 +117,41 @@ def catalogo(request, categoria_slug=None):
         'productos': productos,
         'page_title': 'Catálogo',
         'query': query,
+        'url_instantanea': (
+            reverse('SkateApp:instantanea_catalogo', args=[version_catalogo()])
+            if settings.INSTANTANEA_DIRECTORIO else None
+        ),
     }
     return render(request, 'SkateApp/catalogo.html', context)
 
+@presupuesto_consultas(3)
+def instantanea_catalogo(request, version):
+    """JSON del catálogo para catalogo.html, precomprimido e inmutable (ver instantanea.py)."""
+    if not settings.INSTANTANEA_DIRECTORIO:
+        raise Http404("La instantánea del catálogo está desactivada.")
+    ruta = ruta_instantanea(version)
+    if not os.path.exists(ruta):
+        # Aún no la escribió el hilo de fondo; las versiones pasadas ya no se generan
+        if version != version_catalogo():
+            raise Http404("Esa versión del catálogo ya no existe.")
+        generar_instantanea()
+
+    aceptadas = {parte.split(';')[0].strip() for parte in request.headers.get('Accept-Encoding', '').split(',')}
+    ruta, codificacion = archivo_para(ruta, aceptadas)
+    response = FileResponse(open(ruta, 'rb'), content_type='application/json')
+    if codificacion:
+        response['Content-Encoding'] = codificacion
+    patch_cache_control(response, public=True, max_age=365 * 24 * 60 * 60, immutable=True)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
+
+@presupuesto_consultas(7)
+@condition(etag_func=etag_catalogo, last_modified_func=modificado_producto)
+@cache_anonima()
+@lee_de_replica
 def detalle_producto(request, producto_id):
     producto = get_object_or_404(Producto, id=producto_id)
-    reseñas = producto.reseñas.all().order_by('-fecha')
+    reseñas = producto.reseñas.select_related('usuario').order_by('-fecha')
     promedio_calificacion = reseñas.aggregate(Avg('calificacion'))['calificacion__avg']
     
     if request.method == 'POST':
@@ -95,8 +168,14 @@ def detalle_producto(request, producto_id):
                 nueva_resena = form.save(commit=False)
                 nueva_resena.usuario = request.user
                 nueva_resena.producto = producto
-                nueva_resena.save()
-                messages.success(request, "¡Gracias por tu valoración!")
+                try:
+                    with transaction.atomic():
+                        nueva_resena.save()
+                except IntegrityError:
+                    # Dos envíos simultáneos: la restricción única deja pasar solo uno
+                    messages.warning(request, "Ya has dejado una opinión para este producto.")
+                else:
+                    messages.success(request, "¡Gracias por tu valoración!")
             
             return redirect('SkateApp:detalle_producto', producto_id=producto.id)
     else:
@@ -114,6 +193,7 @@ def detalle_producto(request, producto_id):
 # VISTAS DE AUTENTICACIÓN
 # ======================================================================
 
+@presupuesto_consultas(1)
 def registro(request):
     if request.method == 'POST':
         form = CustomUserCreationForm(request.POST)
@@ -128,6 +208,7 @@ def registro(request):
         form = CustomUserCreationForm()
     return render(request, 'SkateApp/registro.html', {'form': form})
 
+@presupuesto_consultas(1)
 def iniciar_sesion(request):
     if request.user.is_authenticated:
         return redirect('SkateApp:home') 
@@ -135,9 +216,19 @@ def iniciar_sesion(request):
     if request.method == 'POST':
         username = request.POST.get('username')
         password = request.POST.get('password')
+
+        # Se revisa antes de authenticate(): un intento rechazado no calcula ningún hash
+        espera = permitir_intento_login(request, username)
+        if espera:
+            messages.error(request, f'Demasiados intentos. Espera {espera} segundos antes de volver a intentarlo.')
+            response = render(request, 'SkateApp/login.html', status=429)
+            response['Retry-After'] = str(espera)
+            return response
+
         user = authenticate(request, username=username, password=password)
         
         if user is not None:
+            login_exitoso(username)
             login(request, user)
             return redirect('SkateApp:home')
         else:
@@ -145,6 +236,7 @@ def iniciar_sesion(request):
             
     return render(request, 'SkateApp/login.html')
 
+@presupuesto_consultas(3)
 @login_required 
 def cerrar_sesion(request):
     logout(request)
@@ -155,15 +247,17 @@ def cerrar_sesion(request):
 # VISTAS DE PANEL DE USUARIO
 # ======================================================================
 
+@presupuesto_consultas(4)
 @login_required
 def panel_usuario(request):
-    pedidos = Pedido.objects.filter(usuario=request.user).order_by('-fecha')
+    pedidos = pedidos_de_usuario(request.user)
     context = {
         'pedidos': pedidos,
         'page_title': 'Mi Panel'
     }
     return render(request, 'SkateApp/panel_usuario.html', context)
 
+@presupuesto_consultas(1)
 @login_required
 def editar_perfil(request):
     if request.method == 'POST':
@@ -176,6 +270,7 @@ def editar_perfil(request):
         form = CustomUserChangeForm(instance=request.user)
     return render(request, 'SkateApp/editar_perfil.html', {'form': form})
 
+@presupuesto_consultas(2)
 @login_required
 def gestionar_direcciones(request):
     try:
@@ -207,6 +302,20 @@ def gestionar_direcciones(request):
 # VISTAS DE CARRITO Y CHECKOUT
 # ======================================================================
 
+@presupuesto_consultas(1)
+def fragmento_usuario(request):
+    """Barra de usuario, carrito y mensajes para las páginas compartidas (ver cache_paginas.py)."""
+    response = JsonResponse({
+        'huecos': {
+            hueco: render_to_string(f'SkateApp/fragmentos/{hueco}.html', request=request)
+            for hueco in HUECOS
+        },
+        'carrito': cantidad_carrito(request),
+    })
+    patch_cache_control(response, private=True, no_store=True)
+    return response
+
+@presupuesto_consultas(5)
 def gestionar_carrito(request, producto_id):
     producto = get_object_or_404(Producto, id=producto_id)
     carrito = request.session.get('carrito', {})
@@ -225,10 +334,12 @@ def gestionar_carrito(request, producto_id):
 
     request.session['carrito'] = carrito
     request.session.modified = True
+    CARRITO_AGREGADOS.inc()
 
     messages.success(request, f'¡{producto.nombre} agregado al carrito!')
     return redirect('SkateApp:ver_carrito')
 
+@presupuesto_consultas(0)
 def actualizar_cantidad(request, producto_id):
     if request.method == "POST":
         carrito = request.session.get('carrito', {})
@@ -246,15 +357,16 @@ def actualizar_cantidad(request, producto_id):
 
     return redirect('SkateApp:ver_carrito')
 
+@presupuesto_consultas(2)
 def ver_carrito(request):
     carrito = request.session.get('carrito', {})
     items_carrito = []
     subtotal = 0
 
+    productos = Producto.objects.in_bulk([int(item_id) for item_id in carrito])
     for item_id, item_data in carrito.items():
-        try:
-            producto = Producto.objects.get(id=int(item_id))
-        except Producto.DoesNotExist:
+        producto = productos.get(int(item_id))
+        if producto is None:
             continue
 
         cantidad = item_data['cantidad']
@@ -277,6 +389,7 @@ def ver_carrito(request):
         'total_general': subtotal
     })
 
+@presupuesto_consultas(3)
 def eliminar_item_carrito(request, producto_id):
     carrito = request.session.get('carrito', {})
     if str(producto_id) in carrito:
@@ -286,6 +399,7 @@ def eliminar_item_carrito(request, producto_id):
     return redirect('SkateApp:ver_carrito')
 
  
+@presupuesto_consultas(4)
 @transaction.atomic 
 def checkout(request):
 
@@ -344,6 +458,7 @@ def checkout(request):
                 producto.stock -= item_data['cantidad']
                 producto.save()
 
+            transaction.on_commit(PEDIDOS_CREADOS.inc)
             return redirect('SkateApp:iniciar_pago_webpay', pedido_id=nuevo_pedido.id)
             
     else:
@@ -357,15 +472,17 @@ def checkout(request):
         'form': form
     } 
     return render(request, 'SkateApp/checkout.html', context)
+@presupuesto_consultas(3)
 @login_required
 def compra_exitosa(request, pedido_id):
-    pedido = get_object_or_404(Pedido, id=pedido_id, usuario=request.user)
+    pedido = obtener_pedido(pedido_id, usuario=request.user)
     return render(request, 'SkateApp/compra_exitosa.html', {'pedido': pedido})
 
 # ======================================================================
 # INTEGRACIÓN WEBPAY PLUS (TRANSBANK)
 # ======================================================================
 
+@presupuesto_consultas(2)
 @login_required
 def iniciar_pago_webpay(request, pedido_id):
     pedido = get_object_or_404(Pedido, id=pedido_id)
@@ -382,7 +499,8 @@ def iniciar_pago_webpay(request, pedido_id):
     return_url = request.build_absolute_uri(reverse('SkateApp:confirmar_pago_webpay'))
     
     try:
-        response = tx.create(buy_order, session_id, amount, return_url)
+        with LATENCIA_WEBPAY.medir(operacion='create'):
+            response = tx.create(buy_order, session_id, amount, return_url)
         
         return render(request, 'SkateApp/redireccion_webpay.html', {
             'url': response['url'],
@@ -393,6 +511,7 @@ def iniciar_pago_webpay(request, pedido_id):
         messages.error(request, f"Error al conectar con Webpay: {str(e)}")
         return redirect('SkateApp:panel_usuario')
 
+@presupuesto_consultas(2)
 @csrf_exempt 
 def confirmar_pago_webpay(request):
     token = request.GET.get('token_ws') or request.POST.get('token_ws')
@@ -408,9 +527,11 @@ def confirmar_pago_webpay(request):
     ))
 
     try:
-        response = tx.commit(token)
+        with LATENCIA_WEBPAY.medir(operacion='commit'):
+            response = tx.commit(token)
         
         if response['status'] == 'AUTHORIZED':
+            PAGOS.inc(resultado='aprobado')
             pedido_id = response['buy_order']
             pedido = Pedido.objects.get(id=pedido_id)
             
@@ -422,10 +543,12 @@ def confirmar_pago_webpay(request):
             messages.success(request, "¡Pago Aprobado! Gracias por tu compra.")
             return redirect('SkateApp:panel_usuario')
         else:
+            PAGOS.inc(resultado='rechazado')
             messages.error(request, "El pago fue rechazado por el banco.")
             return redirect('SkateApp:panel_usuario')
             
     except Exception as e:
+        PAGOS.inc(resultado='error')
         messages.error(request, f"Hubo un error al confirmar: {str(e)}")
         return redirect('SkateApp:panel_usuario')
 
@@ -433,8 +556,12 @@ def confirmar_pago_webpay(request):
 # ZONA DE COMUNIDAD
 # ======================================================================
 
+@presupuesto_consultas(3)
+@lee_de_replica
 def comunidad(request):
-    posts = Post.objects.all().order_by('-fecha')
+    posts = Post.objects.select_related('usuario').prefetch_related(
+        Prefetch('comentarios', queryset=Comentario.objects.select_related('usuario').order_by('fecha'))
+    ).order_by('-fecha')
     form = PostForm()
     comentario_form = ComentarioForm()
 
@@ -458,6 +585,7 @@ def comunidad(request):
     }
     return render(request, 'SkateApp/comunidad.html', context)
 
+@presupuesto_consultas(1)
 def agregar_comentario(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     
@@ -476,6 +604,7 @@ def agregar_comentario(request, post_id):
             
     return redirect('SkateApp:comunidad')
 
+@presupuesto_consultas(1)
 @user_passes_test(lambda u: u.is_superuser)
 def eliminar_post(request: HttpRequest, post_id: int):
     if request.method == 'POST':
@@ -494,11 +623,62 @@ def eliminar_post(request: HttpRequest, post_id: int):
 # ======================================================================
 # ZONA DE ADMINISTRADOR (Gestión de Productos)
 # ======================================================================
+
+DIAS_PANEL = 30
+
+PRODUCTOS_POR_PAGINA = 25
+
+# Solo columnas con índice (ver Producto.Meta.indexes)
+ORDENES_PRODUCTOS = ("nombre", "-nombre", "precio", "-precio", "stock", "-stock")
+
+UMBRAL_STOCK_BAJO = 5
+
+FILTROS_STOCK = {
+    "agotado": Q(stock__lte=0),
+    "bajo": Q(stock__gt=0, stock__lte=UMBRAL_STOCK_BAJO),
+    "disponible": Q(stock__gt=UMBRAL_STOCK_BAJO),
+}
+
+@presupuesto_consultas(5)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def gestion_administrador(request):
-    return render(request, "SkateApp/gestion_administrador.html")
+    # Solo lee tablas de resumen: el costo no depende del tamaño del historial
+    hoy = timezone.localdate()
+    desde = hoy - timedelta(days=DIAS_PANEL - 1)
+    inicio_hoy = timezone.make_aware(datetime.combine(hoy, time.min))
+
+    ventas_dias = list(VentaDia.objects.filter(fecha__gte=desde).order_by("fecha"))
+    totales = {
+        "pedidos": sum(d.pedidos for d in ventas_dias),
+        "ingresos": sum(d.ingresos for d in ventas_dias),
+        "unidades": sum(d.unidades for d in ventas_dias),
+    }
+    ventas_hoy = VentaHora.objects.filter(hora__gte=inicio_hoy).order_by("hora")
+
+    top_productos = (
+        VentaProductoDia.objects.filter(fecha__gte=desde)
+        .values("producto_id", "producto__nombre")
+        .annotate(total_unidades=Sum("unidades"), total_ingresos=Sum("ingresos"))
+        .order_by("-total_unidades")[:10]
+    )
+    top_categorias = (
+        VentaCategoriaDia.objects.filter(fecha__gte=desde)
+        .values("categoria_id", "categoria__nombre")
+        .annotate(total_unidades=Sum("unidades"), total_ingresos=Sum("ingresos"))
+        .order_by("-total_unidades")[:5]
+    )
+
+    return render(request, "SkateApp/gestion_administrador.html", {
+        "dias_panel": DIAS_PANEL,
+        "totales": totales,
+        "ventas_dias": ventas_dias,
+        "ventas_hoy": ventas_hoy,
+        "top_productos": top_productos,
+        "top_categorias": top_categorias,
+    })
 
+@presupuesto_consultas(1)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def agregar_categoria(request):
@@ -512,6 +692,7 @@ def agregar_categoria(request):
         form = CategoriaForm()
     return render(request, 'SkateApp/agregar_categoria.html', {'form': form, 'titulo': 'Nueva Categoría'})
 
+@presupuesto_consultas(2)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def gestionar_categorias(request):
@@ -529,21 +710,128 @@ def gestionar_categorias(request):
     }
     return render(request, 'SkateApp/gestionar_categorias.html', data)
 
+@presupuesto_consultas(5)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def gestionar_productos(request):
     buscar = request.GET.get("buscar", "")
+    categoria_id = request.GET.get("categoria", "")
+    nivel_stock = request.GET.get("stock", "")
+    orden = request.GET.get("orden", "nombre")
+
+    if orden not in ORDENES_PRODUCTOS:
+        orden = "nombre"
 
-    productos = Producto.objects.all()
+    productos = (
+        Producto.objects.defer("imagen_placeholder")
+        .prefetch_related("categorias")
+        .order_by(orden, "id")
+    )
 
     if buscar:
         productos = productos.filter(
             nombre__icontains=buscar
         )
 
-    return render(request, "SkateApp/gestionar_productos.html", {"productos": productos,"titulo": "Gestión de Productos"})
+    if categoria_id.isdigit():
+        productos = productos.filter(categorias__id=categoria_id)
+
+    if nivel_stock in FILTROS_STOCK:
+        productos = productos.filter(FILTROS_STOCK[nivel_stock])
 
+    paginador = Paginator(productos, PRODUCTOS_POR_PAGINA)
+    pagina = paginador.get_page(request.GET.get("pagina"))
 
+    return render(request, "SkateApp/gestionar_productos.html", {
+        "productos": pagina,
+        "pagina": pagina,
+        "categorias": Categoria.objects.order_by("nombre").only("id", "nombre"),
+        "buscar": buscar,
+        "categoria_id": categoria_id,
+        "nivel_stock": nivel_stock,
+        "orden": orden,
+        "titulo": "Gestión de Productos",
+    })
+
+
+@presupuesto_consultas(1)
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def ajuste_masivo(request):
+    texto = ""
+    errores = []
+
+    if request.method == "POST":
+        texto = request.POST.get("ajustes", "")
+        datos, errores = interpretar_lineas(texto)
+        try:
+            registro, errores_lote = aplicar_ajustes(datos, usuario=request.user)
+        except ErrorAjuste as e:
+            registro, errores_lote = None, [("-", str(e))]
+        errores += errores_lote
+
+        if registro:
+            messages.success(request, f"Ajuste #{registro.id}: {registro.productos_actualizados} productos actualizados.")
+        if not errores:
+            return redirect("SkateApp:ajuste_masivo")
+
+    return render(request, "SkateApp/ajuste_masivo.html", {
+        "texto": texto,
+        # Primero los errores generales ("-"), luego por número de línea
+        "errores": sorted(errores, key=lambda e: (isinstance(e[0], int), e[0])),
+        "titulo": "Ajuste masivo de precios y stock",
+    })
+
+@presupuesto_consultas(1)
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def api_ajuste_masivo(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    try:
+        datos = json.loads(request.body)["ajustes"]
+        if not isinstance(datos, list) or not all(isinstance(d, dict) for d in datos):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": 'Se esperaba {"ajustes": [{"producto_id": ..., ...}]}'}, status=400)
+
+    try:
+        registro, errores = aplicar_ajustes(datos, usuario=request.user)
+    except ErrorAjuste as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "lote": registro.id if registro else None,
+        "actualizados": registro.productos_actualizados if registro else 0,
+        "errores": [{"fila": ref, "error": msg} for ref, msg in errores],
+    }, status=200 if registro else 400)
+
+@presupuesto_consultas(1)
+@login_required
+@user_passes_test(lambda u: u.is_superuser)
+def api_crear_categorias(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Método no permitido"}, status=405)
+
+    try:
+        nombres = json.loads(request.body)["categorias"]
+        if not isinstance(nombres, list):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": 'Se esperaba {"categorias": ["nombre", ...]}'}, status=400)
+
+    try:
+        creadas, errores = crear_categorias(nombres)
+    except ErrorCategorias as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "creadas": [{"id": c.id, "nombre": c.nombre, "slug": c.slug} for c in creadas],
+        "errores": [{"fila": posicion, "error": msg} for posicion, msg in errores],
+    }, status=201 if creadas else 400)
+
+@presupuesto_consultas(2)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def editar_categoria(request, categoria_id):
@@ -560,6 +848,7 @@ def editar_categoria(request, categoria_id):
 
     return render(request, "SkateApp/editar_categoria.html", {"categoria": categoria,"form": form})
 
+@presupuesto_consultas(2)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def eliminar_categoria(request, categoria_id):
@@ -571,8 +860,10 @@ def eliminar_categoria(request, categoria_id):
         messages.warning(request, f'Categoria "{nombre_categoria}" ha sido eliminado.')
         return redirect("SkateApp:gestionar_categorias")
 
-    return render(request, "SkateApp/eliminar_categoria.html", {"categoria": categoria})
+    # La confirmación es un modal en gestionar_categorias
+    return redirect("SkateApp:gestionar_categorias")
 
+@presupuesto_consultas(3)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def agregar_producto(request):
@@ -586,6 +877,7 @@ def agregar_producto(request):
         form = ProductoForm()
     return render(request, 'SkateApp/agregar_producto.html', {'form': form, 'page_title': 'Agregar Producto'})
 
+@presupuesto_consultas(5)
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def editar_producto(request, producto_id):
@@ -602,6 +894,7 @@ def editar_producto(request, producto_id):
         
     return render(request, 'SkateApp/editar_producto.html', {'form': form, 'producto': producto})
 
+@presupuesto_consultas(2)
 @login_required
 @user_passes_test(lambda u: u.is_staff)
 def eliminar_producto(request, producto_id):
@@ -615,12 +908,13 @@ def eliminar_producto(request, producto_id):
     
     return redirect('SkateApp:detalle_producto', producto_id=producto.id)
 
+@presupuesto_consultas(2)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def gestionar_posts(request):
     query = request.GET.get("buscar", "")
 
-    posts = Post.objects.all().order_by("-fecha")
+    posts = Post.objects.select_related("usuario").order_by("-fecha")
 
     if query:
         posts = posts.filter(
@@ -634,26 +928,74 @@ def gestionar_posts(request):
         "query": query
     })
 
+USUARIOS_POR_PAGINA = 25
+
+def buscar_usuarios(termino):
+    """
+    Búsqueda de clientes sobre las columnas normalizadas e indexadas:
+    - "#123" o solo dígitos: dueño del pedido con ese id
+    - texto con "@": email exacto
+    - resto: prefijo de usuario, email, nombre o apellido
+    """
+    termino = normalizar_texto(termino)
+    usuarios = Usuario.objects.all()
+    # Columnas y término ya están normalizados: basta un prefijo que distinga mayúsculas.
+    # En PostgreSQL startswith es LIKE 'x%' y lo sirve el índice varchar_pattern_ops
+    # (_like) que Django crea junto al de db_index; istartswith sería UPPER(col) LIKE
+    # y recorrería la tabla. En MySQL startswith es LIKE BINARY, que no usa el índice
+    # de una collation ci, así que ahí se usa istartswith (un LIKE simple).
+    prefijo = 'istartswith' if connections[usuarios.db].vendor == 'mysql' else 'startswith'
+
+    if not termino:
+        return usuarios
+
+    id_pedido = termino.lstrip("#")
+    if id_pedido.isdigit() and len(id_pedido) <= 18:
+        dueno_id = Pedido.objects.filter(id=int(id_pedido)).values_list("usuario_id", flat=True).first()
+        if termino.startswith("#"):
+            return usuarios.filter(id=dueno_id) if dueno_id else usuarios.none()
+        return usuarios.filter(Q(id=dueno_id) | Q(**{f'username_normalizado__{prefijo}': termino}))
+
+    if "@" in termino:
+        return usuarios.filter(email_normalizado=termino)
+
+    return usuarios.filter(
+        Q(**{f'username_normalizado__{prefijo}': termino}) |
+        Q(**{f'email_normalizado__{prefijo}': termino}) |
+        Q(**{f'nombre_normalizado__{prefijo}': termino}) |
+        Q(**{f'apellido_normalizado__{prefijo}': termino})
+    )
+
+@presupuesto_consultas(4)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def gestionar_usuarios(request):
     buscar = request.GET.get("buscar", "")
 
-    usuarios = Usuario.objects.all().order_by("username")
+    usuarios = buscar_usuarios(buscar).only(
+        "id", "username", "first_name", "last_name", "email", "rol"
+    ).order_by("username_normalizado", "id")
 
-    if buscar:
-        usuarios = usuarios.filter(
-            Q(username__icontains=buscar) |
-            Q(email__icontains=buscar) |
-            Q(first_name__icontains=buscar) |
-            Q(last_name__icontains=buscar)
-        )
+    paginador = Paginator(usuarios, USUARIOS_POR_PAGINA)
+    pagina = paginador.get_page(request.GET.get("pagina"))
+
+    # Pedidos por usuario de la página en una sola consulta agregada
+    conteos = dict(
+        Pedido.objects.filter(usuario_id__in=[u.id for u in pagina])
+        .values_list("usuario_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for u in pagina:
+        u.cantidad_pedidos = conteos.get(u.id, 0)
 
     return render(request, "SkateApp/gestionar_usuarios.html", {
-        "usuarios": usuarios,
+        "usuarios": pagina,
+        "pagina": pagina,
         "buscar": buscar
     })
 
+@presupuesto_consultas(2)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def editar_usuario(request, user_id):
@@ -670,6 +1012,7 @@ def editar_usuario(request, user_id):
 
     return render(request, "SkateApp/editar_usuario.html", {"form": form, "usuario": usuario})
 
+@presupuesto_consultas(1)
 @login_required
 @user_passes_test(lambda u: u.is_superuser)
 def eliminar_usuario(request, user_id):
@@ -688,6 +1031,7 @@ def eliminar_usuario(request, user_id):
 # VISTA API (Asistente)
 # ======================================================================
 
+@presupuesto_consultas(0)
 @csrf_exempt
 def asistente_ia(request):
     if request.method == 'POST':